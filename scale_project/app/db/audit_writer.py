@@ -0,0 +1,302 @@
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from sqlalchemy import insert
+from .models import AuditLog
+from .database import SessionLocal
+
+# What survives a crash of entries accepted but not yet written to the database
+DURABILITY_NONE = 'none'       # Nothing: up to the queue's contents are lost
+DURABILITY_JOURNAL = 'journal' # Entries are appended to a journal file first; survives the process dying
+DURABILITY_FSYNC = 'fsync'     # Journal fsync'd per entry; also survives a power cut
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_JOURNAL, DURABILITY_FSYNC)
+AUDIT_JOURNAL_FILE = "./audit_journal.jsonl"
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Write-behind sink for audit entries: a daemon thread inserts them in batches.
+
+    submit() only captures the entry and queues it; the writer thread takes up to
+    batch_size entries at a time and inserts them with one multi-row INSERT and one
+    commit. The queue holds at most max_queue entries; when it is full submit()
+    blocks until the writer catches up, so memory stays bounded and nothing is lost.
+    A batch that still fails after max_retries attempts is set aside as a dead letter
+    (logged, and kept in the journal if there is one) so the writer keeps going.
+
+    With a journal (DURABILITY_JOURNAL/FSYNC) each entry is also appended to
+    journal_path before it is queued. Committed batches are marked in the journal,
+    which is truncated whenever everything in it is committed. Entries left unmarked
+    by a crash, and dead letters, are written on the next start(). Delivery is
+    at-least-once: a crash between a commit and its mark repeats that batch.
+    """
+    def __init__(self, session_factory=SessionLocal, max_queue: int = 10000, batch_size: int = 500,
+                 durability: str = DURABILITY_NONE, journal_path: str = AUDIT_JOURNAL_FILE, max_retries: int = 5):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability '{durability}'. Expected one of {DURABILITY_MODES}.")
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.durability = durability
+        self.journal_path = journal_path if durability != DURABILITY_NONE else None
+        self.max_retries = max_retries
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_letters = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._journal = None
+        self._journal_lock = threading.Lock()
+        self._seq = 0 # Journal sequence number of the last submitted entry
+        self._unwritten: set[int] = set() # Journaled seqs not yet committed or dead-lettered
+        self._dead: list[dict] = []       # Dead-letter journal records, kept across truncation
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def start(self):
+        if self.is_running:
+            return
+        leftover = self._open_journal() if self.journal_path else []
+        # The thread must be consuming before the replay, which may hold more than max_queue entries
+        self._thread = threading.Thread(target=self._run, name="AuditWriter", daemon=True)
+        self._thread.start()
+        if leftover:
+            print(f"AuditWriter: replaying {len(leftover)} audit entries not written before the last shutdown.")
+        for entry in leftover:
+            self._queue.put(entry)
+
+    def submit(self, table_name: str, record_id: int, action: str, changed_by: str = None,
+               old_values: dict | None = None, new_values: dict | None = None,
+               changed_at: datetime.datetime | None = None):
+        self._enqueue({"table_name": table_name, "record_id": record_id, "action": action, "changed_by": changed_by or None,
+                       "changed_at": changed_at or datetime.datetime.utcnow(), "old_values": old_values, "new_values": new_values})
+
+    def _enqueue(self, entry: dict):
+        with self._journal_lock: # stop() and _replace_journal() close and swap the file under it
+            if self._journal is not None:
+                self._seq += 1
+                entry["seq"] = self._seq
+                self._unwritten.add(self._seq)
+                self._journal_write({**entry, "changed_at": entry["changed_at"].isoformat()})
+        self._queue.put(entry) # Blocks while the queue is full
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until everything submitted so far is committed. Returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not self.is_running:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Writes out what is queued, then stops the thread and closes the journal."""
+        if not self.is_running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Still writing: leave the journal open for it; what it doesn't finish is replayed next start
+            print(f"AuditWriter: still writing after {timeout:.0f} s, {self.pending} audit entries unwritten.")
+            return
+        self._thread = None
+        if self._journal is not None:
+            with self._journal_lock:
+                self._journal.close()
+                self._journal = None
+            if not self._unwritten and not self._dead:
+                os.remove(self.journal_path) # Everything committed; nothing to replay
+        print(f"AuditWriter stopped: {self.written} entries in {self.batches} batches, "
+              f"{self.dead_letters} dead letters, {self.pending} unwritten.")
+
+    # --- Journal ---
+    def _journal_write(self, record: dict):
+        self._journal.write(json.dumps(record, default=str) + "\n")
+        self._journal.flush()
+        if self.durability == DURABILITY_FSYNC:
+            os.fsync(self._journal.fileno())
+
+    def _open_journal(self) -> list[dict]:
+        """Starts a fresh journal holding the entries the last run left unwritten, and returns them."""
+        leftover, committed = [], set()
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # Torn last line from a crash mid-write
+                    if "committed" in record:
+                        committed.update(record["committed"])
+                    else:
+                        leftover.append(record)
+        entries = []
+        with self._journal_lock:
+            for record in leftover:
+                if record["seq"] in committed:
+                    continue
+                self._seq += 1
+                record["seq"] = self._seq
+                self._unwritten.add(self._seq)
+                entries.append(record)
+            self._replace_journal(entries)
+        return [{**r, "changed_at": datetime.datetime.fromisoformat(r["changed_at"])} for r in entries]
+
+    def _replace_journal(self, records: list[dict]):
+        # Swapped in whole, so a crash while rewriting loses nothing
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._journal is not None:
+            self._journal.close()
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _compact_journal(self):
+        # Called with the journal lock held once nothing journaled is waiting to be written
+        if self._dead:
+            self._replace_journal(self._dead)
+            return
+        self._journal.seek(0)
+        self._journal.truncate()
+        if self.durability == DURABILITY_FSYNC:
+            os.fsync(self._journal.fileno())
+
+    # --- Writer thread ---
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch: list[dict]):
+        rows = [{k: v for k, v in entry.items() if k != "seq"} for entry in batch]
+        committed = False
+        delay = 0.1
+        for attempt in range(1, self.max_retries + 1):
+            session = self.session_factory()
+            try:
+                session.execute(insert(AuditLog), rows) # executemany: one statement, one commit per batch
+                session.commit()
+                committed = True
+                break
+            except Exception as e:
+                session.rollback()
+                self.failures += 1
+                if attempt == self.max_retries:
+                    print(f"AuditWriter: giving up on {len(rows)} audit entries after {attempt} attempts, "
+                          f"kept as dead letters: {e}")
+                else:
+                    print(f"AuditWriter: error writing {len(rows)} audit entries, retrying in {delay:.1f} s: {e}")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 5.0)
+            finally:
+                session.close()
+        if committed:
+            self.written += len(batch)
+            self.batches += 1
+        else:
+            self.dead_letters += len(batch)
+            if self._journal is None:
+                for row in rows:
+                    print(f"AuditWriter: dropped audit entry {row}")
+        if self._journal is not None:
+            seqs = [entry["seq"] for entry in batch]
+            with self._journal_lock:
+                if not committed:
+                    self._dead.extend({**entry, "changed_at": entry["changed_at"].isoformat()} for entry in batch)
+                self._unwritten.difference_update(seqs)
+                if self._unwritten:
+                    self._journal_write({"committed": seqs}) # Dead letters stay as plain entries: replayed next start
+                else:
+                    self._compact_journal()
+        for _ in batch:
+            self._queue.task_done()
+
+
+if __name__ == '__main__':
+    import tempfile
+    from sqlalchemy import create_engine, func
+    from sqlalchemy.orm import sessionmaker
+    from .models import Base
+
+    directory = tempfile.mkdtemp()
+    bench_engine = create_engine(f"sqlite:///{os.path.join(directory, 'audit.db')}")
+    Base.metadata.create_all(bind=bench_engine)
+    Session = sessionmaker(bind=bench_engine)
+    values = {"unit_id": "T-100", "company_name": "Bench Haulage", "tare_weight": 12000.0, "max_allowed_weight": 44000.0}
+
+    session = Session()
+    start = time.perf_counter()
+    for i in range(500): # What a bulk import did before: one commit per audit row, on the caller's thread
+        session.add(AuditLog(table_name="Trucks", record_id=i, action="INSERT", new_values=values))
+        session.commit()
+    print(f"Synchronous: 500 entries block the caller for {(time.perf_counter() - start) * 1000:.0f} ms")
+    session.close()
+
+    for durability in DURABILITY_MODES:
+        writer = AuditWriter(Session, durability=durability, journal_path=os.path.join(directory, "audit_journal.jsonl"))
+        writer.start()
+        start = time.perf_counter()
+        for i in range(500):
+            writer.submit("Trucks", i, "INSERT", new_values=values)
+        submitted = time.perf_counter() - start
+        writer.flush()
+        print(f"Write-behind ({durability}): submit took {submitted * 1000:.0f} ms, all committed after "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms in {writer.batches} batches")
+        writer.stop()
+
+    # A batch that can't be written (NOT NULL table_name) becomes a dead letter; the writer carries on
+    writer = AuditWriter(Session, durability=DURABILITY_JOURNAL, journal_path=os.path.join(directory, "audit_journal.jsonl"),
+                         max_retries=2)
+    writer.start()
+    writer.submit(None, 1, "INSERT")
+    writer.flush()
+    writer.submit("Trucks", 1, "UPDATE", changed_by="after-dead-letter")
+    writer.flush()
+    writer.stop()
+    with open(writer.journal_path, encoding='utf-8') as f:
+        print(f"Journal keeps {len(f.readlines())} dead letter(s) for the next start")
+    os.remove(writer.journal_path)
+
+    # Crash before the writer ran: the journal brings the entries back on the next start
+    writer = AuditWriter(Session, durability=DURABILITY_JOURNAL, journal_path=os.path.join(directory, "audit_journal.jsonl"))
+    writer._open_journal()
+    for i in range(3):
+        writer.submit("Trucks", i, "UPDATE", changed_by="crash-test")
+    writer._journal.close() # Simulated crash: the thread never started
+    writer = AuditWriter(Session, durability=DURABILITY_JOURNAL, journal_path=os.path.join(directory, "audit_journal.jsonl"))
+    writer.start()
+    writer.flush()
+    writer.stop()
+    session = Session()
+    print(f"Recovered rows: {session.query(func.count(AuditLog.id)).filter(AuditLog.changed_by == 'crash-test').scalar()}")
+    session.close()
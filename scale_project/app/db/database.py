@@ -1,33 +1,30 @@
 import json
 import datetime # Required for datetime.datetime.utcnow
-from sqlalchemy import create_engine, inspect, text, or_ 
+from contextlib import contextmanager
+from sqlalchemy import or_, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import IntegrityError
-from .models import Base, Truck, AggregateType, DeliveryLocation, WeightTicket, AuditLog
+from .models import Base, Truck, AggregateType, DeliveryLocation, WeightTicket, WeightTicketTrace, WeightTicketAxle, AuditLog
+from .weight_trace import pack_weight_trace, unpack_weight_trace, DecodedTrace
+from .sqlite_profile import create_sqlite_engine, SQLITE_PROFILE
+from .migrations import migrate
 
 DATABASE_URL = "sqlite:///./scale_project.db"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_sqlite_engine(DATABASE_URL, SQLITE_PROFILE) # PRAGMA profile per deployment, see sqlite_profile
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def migrate_and_create_db_and_tables():
-    inspector = inspect(engine)
-    if 'trucks' in inspector.get_table_names():
-        columns = inspector.get_columns('trucks')
-        if not any(c['name'] == 'last_used_timestamp' for c in columns):
-            print("Migrating 'trucks' table: Adding 'last_used_timestamp' column.")
-            try:
-                with engine.connect() as connection:
-                    connection.execute(text('ALTER TABLE trucks ADD COLUMN last_used_timestamp DATETIME'))
-                    connection.commit()
-                print("'last_used_timestamp' column added successfully.")
-            except Exception as e:
-                print(f"Error adding 'last_used_timestamp' column: {e}")
-    else:
-        print("'trucks' table not found, will be created.")
+# Optional write-behind sink for audit rows (an audit_writer.AuditWriter); None writes them inline
+_audit_sink = None
 
-    Base.metadata.create_all(bind=engine)
-    print("Database tables ensured/created.")
+def set_audit_sink(sink):
+    """Routes audit rows to sink.submit() after their change commits, or back inline with None."""
+    global _audit_sink
+    _audit_sink = sink
+
+def migrate_and_create_db_and_tables():
+    # Runs pending numbered migrations (see migrations.py); one PRAGMA read when up to date
+    migrate(engine)
 
 create_db_and_tables = migrate_and_create_db_and_tables
 
@@ -38,6 +35,50 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def unit_of_work(db_session: Session):
+    """Runs a block as one transaction: a single commit on success, rollback (and re-raise) on error.
+
+    Write helpers flush inside it to get generated ids and add their audit row, so a
+    change and its audit entry are committed (and synced to disk) together or not at
+    all. Nothing is refreshed afterwards; expired attributes reload only if read.
+    With an audit sink set, the audit rows go to the sink after the commit instead.
+    """
+    try:
+        yield db_session
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+
+def _audit(db_session: Session, table_name: str, record_id: int, action: str, changed_by: str = None,
+           old_values: dict | None = None, new_values: dict | None = None) -> AuditLog:
+    # Adds the audit row to the caller's unit of work; committed with it. With an audit sink
+    # the row is held on the session instead and handed to the sink once the change commits.
+    entry = AuditLog(table_name=table_name, record_id=record_id, action=action, changed_by=changed_by or None,
+                     old_values=old_values, new_values=new_values)
+    if _audit_sink is None:
+        db_session.add(entry)
+    else:
+        entry.changed_at = datetime.datetime.utcnow() # Time of the change, not of the write
+        db_session.info.setdefault('pending_audit', []).append(entry)
+    return entry
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending_audit(db_session: Session):
+    pending = db_session.info.pop('pending_audit', ())
+    if _audit_sink is None: # Sink removed (shutdown) after these were recorded
+        if pending:
+            print(f"Warning: audit sink removed, {len(pending)} audit entries not written.")
+        return
+    for entry in pending:
+        _audit_sink.submit(entry.table_name, entry.record_id, entry.action, entry.changed_by,
+                           entry.old_values, entry.new_values, entry.changed_at)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_audit(db_session: Session):
+    db_session.info.pop('pending_audit', None) # The change didn't happen, so neither did its audit
+
 # --- Generic Model to Dict ---
 # Though models have to_dict(), a generic one might be useful if to_dict() isn't on all models
 # For now, relying on individual to_dict() methods.
@@ -51,8 +92,9 @@ def add_truck(db_session: Session, unit_id: str, company_name: str, tare_weight:
             unit_id=unit_id, company_name=company_name, tare_weight=tare_weight,
             max_allowed_weight=max_allowed_weight, asga_id=asga_id if asga_id else None
         )
-        db_session.add(new_truck); db_session.commit(); db_session.refresh(new_truck)
-        add_audit_log_entry(db_session, "Trucks", new_truck.id, "INSERT", new_values=new_truck.to_dict())
+        with unit_of_work(db_session):
+            db_session.add(new_truck); db_session.flush() # Assigns the id for the audit row
+            _audit(db_session, "Trucks", new_truck.id, "INSERT", new_values=new_truck.to_dict())
         return new_truck
     except IntegrityError:
         db_session.rollback(); print(f"Error: Truck with Unit ID '{unit_id}' or ASGA ID '{asga_id}' already exists."); return None
@@ -61,27 +103,26 @@ def add_truck(db_session: Session, unit_id: str, company_name: str, tare_weight:
 
 def update_truck(db_session: Session, truck_id: int, **kwargs) -> Truck | None:
     try:
-        truck_to_update = db_session.query(Truck).filter(Truck.id == truck_id).first()
-        if not truck_to_update:
-            print(f"Error: Truck with ID {truck_id} not found for update."); return None
-
-        old_values = truck_to_update.to_dict() # Capture state before update
-
-        for key, value in kwargs.items():
-            if hasattr(truck_to_update, key):
-                # Ensure None for optional fields if empty string is passed from UI
-                if key == 'asga_id' and value == '':
-                    value = None
-                setattr(truck_to_update, key, value)
-            else:
-                print(f"Warning: Attribute {key} not found on Truck model.")
-        
-        # updated_at should be handled by SQLAlchemy's onupdate
-        db_session.commit()
-        db_session.refresh(truck_to_update)
+        with unit_of_work(db_session):
+            truck_to_update = db_session.get(Truck, truck_id)
+            if not truck_to_update:
+                print(f"Error: Truck with ID {truck_id} not found for update."); return None
+
+            old_values = truck_to_update.to_dict() # Capture state before update
 
-        add_audit_log_entry(db_session, "Trucks", truck_to_update.id, "UPDATE", 
-                            old_values=old_values, new_values=truck_to_update.to_dict())
+            for key, value in kwargs.items():
+                if hasattr(truck_to_update, key):
+                    # Ensure None for optional fields if empty string is passed from UI
+                    if key == 'asga_id' and value == '':
+                        value = None
+                    setattr(truck_to_update, key, value)
+                else:
+                    print(f"Warning: Attribute {key} not found on Truck model.")
+
+            # updated_at is set by SQLAlchemy's onupdate during the flush
+            db_session.flush()
+            _audit(db_session, "Trucks", truck_to_update.id, "UPDATE",
+                   old_values=old_values, new_values=truck_to_update.to_dict())
         return truck_to_update
     except IntegrityError: # Catch issues like unique constraint violation on unit_id or asga_id
         db_session.rollback()
@@ -119,8 +160,9 @@ def add_aggregate_type(db_session: Session, name: str, description: str = None)
     if not name: print("Error: Aggregate Type name cannot be empty."); return None
     try:
         new_aggregate = AggregateType(name=name, description=description if description else None)
-        db_session.add(new_aggregate); db_session.commit(); db_session.refresh(new_aggregate)
-        add_audit_log_entry(db_session, "AggregateTypes", new_aggregate.id, "INSERT", new_values=new_aggregate.to_dict())
+        with unit_of_work(db_session):
+            db_session.add(new_aggregate); db_session.flush()
+            _audit(db_session, "AggregateTypes", new_aggregate.id, "INSERT", new_values=new_aggregate.to_dict())
         return new_aggregate
     except IntegrityError:
         db_session.rollback(); print(f"Error: Aggregate Type with name '{name}' already exists."); return None
@@ -129,19 +171,20 @@ def add_aggregate_type(db_session: Session, name: str, description: str = None)
 
 def update_aggregate_type(db_session: Session, aggregate_type_id: int, **kwargs) -> AggregateType | None:
     try:
-        agg_type_to_update = db_session.query(AggregateType).filter(AggregateType.id == aggregate_type_id).first()
-        if not agg_type_to_update:
-            print(f"Error: AggregateType ID {aggregate_type_id} not found."); return None
-        
-        old_values = agg_type_to_update.to_dict()
-        for key, value in kwargs.items():
-            if hasattr(agg_type_to_update, key):
-                setattr(agg_type_to_update, key, value if value else None) # Ensure empty strings become None for description
-            else: print(f"Warning: Attribute {key} not found on AggregateType.")
-        
-        db_session.commit(); db_session.refresh(agg_type_to_update)
-        add_audit_log_entry(db_session, "AggregateTypes", agg_type_to_update.id, "UPDATE",
-                            old_values=old_values, new_values=agg_type_to_update.to_dict())
+        with unit_of_work(db_session):
+            agg_type_to_update = db_session.get(AggregateType, aggregate_type_id)
+            if not agg_type_to_update:
+                print(f"Error: AggregateType ID {aggregate_type_id} not found."); return None
+
+            old_values = agg_type_to_update.to_dict()
+            for key, value in kwargs.items():
+                if hasattr(agg_type_to_update, key):
+                    setattr(agg_type_to_update, key, value if value else None) # Ensure empty strings become None for description
+                else: print(f"Warning: Attribute {key} not found on AggregateType.")
+
+            db_session.flush()
+            _audit(db_session, "AggregateTypes", agg_type_to_update.id, "UPDATE",
+                   old_values=old_values, new_values=agg_type_to_update.to_dict())
         return agg_type_to_update
     except IntegrityError: # Unique name constraint
         db_session.rollback(); print(f"Error updating AggregateType ID {aggregate_type_id}: Name may already exist."); return None
@@ -157,8 +200,9 @@ def add_delivery_location(db_session: Session, name: str, address: str = None) -
     if not name: print("Error: Delivery Location name cannot be empty."); return None
     try:
         new_location = DeliveryLocation(name=name, address=address if address else None)
-        db_session.add(new_location); db_session.commit(); db_session.refresh(new_location)
-        add_audit_log_entry(db_session, "DeliveryLocations", new_location.id, "INSERT", new_values=new_location.to_dict())
+        with unit_of_work(db_session):
+            db_session.add(new_location); db_session.flush()
+            _audit(db_session, "DeliveryLocations", new_location.id, "INSERT", new_values=new_location.to_dict())
         return new_location
     except IntegrityError:
         db_session.rollback(); print(f"Error: Delivery Location with name '{name}' already exists."); return None
@@ -167,19 +211,20 @@ def add_delivery_location(db_session: Session, name: str, address: str = None) -
 
 def update_delivery_location(db_session: Session, delivery_location_id: int, **kwargs) -> DeliveryLocation | None:
     try:
-        loc_to_update = db_session.query(DeliveryLocation).filter(DeliveryLocation.id == delivery_location_id).first()
-        if not loc_to_update:
-            print(f"Error: DeliveryLocation ID {delivery_location_id} not found."); return None
-        
-        old_values = loc_to_update.to_dict()
-        for key, value in kwargs.items():
-            if hasattr(loc_to_update, key):
-                setattr(loc_to_update, key, value if value else None) # Ensure empty strings become None for address
-            else: print(f"Warning: Attribute {key} not found on DeliveryLocation.")
-
-        db_session.commit(); db_session.refresh(loc_to_update)
-        add_audit_log_entry(db_session, "DeliveryLocations", loc_to_update.id, "UPDATE",
-                            old_values=old_values, new_values=loc_to_update.to_dict())
+        with unit_of_work(db_session):
+            loc_to_update = db_session.get(DeliveryLocation, delivery_location_id)
+            if not loc_to_update:
+                print(f"Error: DeliveryLocation ID {delivery_location_id} not found."); return None
+
+            old_values = loc_to_update.to_dict()
+            for key, value in kwargs.items():
+                if hasattr(loc_to_update, key):
+                    setattr(loc_to_update, key, value if value else None) # Ensure empty strings become None for address
+                else: print(f"Warning: Attribute {key} not found on DeliveryLocation.")
+
+            db_session.flush()
+            _audit(db_session, "DeliveryLocations", loc_to_update.id, "UPDATE",
+                   old_values=old_values, new_values=loc_to_update.to_dict())
         return loc_to_update
     except IntegrityError: # Unique name constraint
         db_session.rollback(); print(f"Error updating DeliveryLocation ID {delivery_location_id}: Name may already exist."); return None
@@ -195,34 +240,57 @@ def get_all_delivery_locations(db_session: Session) -> list[DeliveryLocation]:
 def add_weight_ticket(db_session: Session, truck_id: int, aggregate_type_id: int, 
                       delivery_location_id: int, gross_weight: float, 
                       tare_weight_at_weighing: float, net_weight: float, 
-                      operator_name: str = None, ticket_printed: bool = False) -> WeightTicket | None:
+                      operator_name: str = None, ticket_printed: bool = False,
+                      trace: list | None = None, axles: list | None = None,
+                      weight_seq: int | None = None, weight_age_ms: float | None = None) -> WeightTicket | None:
+    # trace: optional (timestamp, weight, status) samples from drive-on to capture,
+    # e.g. ScaleReader.buffer.last(n); samples without a weight are skipped.
+    # axles: optional per-axle loads from weigh-in-motion (WIMResult.axles)
+    # weight_seq/weight_age_ms: which scale sample the gross weight came from and its age at capture
+    # The ticket, the truck's MRU timestamp and the ticket's audit row are committed together.
+    samples = [s for s in trace if s[1] is not None] if trace else []
+    packed_trace = pack_weight_trace([s[0] for s in samples], [s[1] for s in samples],
+                                     [s[2] for s in samples]) if samples else None # Outside the transaction
     try:
-        # Validations...
-        truck_to_update = db_session.query(Truck).filter(Truck.id == truck_id).first() # Query for truck
-        if not truck_to_update:
-            print(f"Error: Truck with ID {truck_id} not found for ticket."); return None
-        truck_to_update.last_used_timestamp = datetime.datetime.utcnow()
-        db_session.add(truck_to_update)
-
-        new_ticket = WeightTicket(
-            truck_id=truck_id, aggregate_type_id=aggregate_type_id, delivery_location_id=delivery_location_id,
-            gross_weight=gross_weight, tare_weight_at_weighing=tare_weight_at_weighing, net_weight=net_weight,
-            operator_name=operator_name if operator_name else None, ticket_printed=ticket_printed
-        )
-        db_session.add(new_ticket)
-        db_session.commit() 
-        db_session.refresh(new_ticket); db_session.refresh(truck_to_update)
-        # Audit log for weight ticket creation is done in WeighingWindow or similar UI logic
+        with unit_of_work(db_session):
+            truck_to_update = db_session.get(Truck, truck_id)
+            if not truck_to_update:
+                print(f"Error: Truck with ID {truck_id} not found for ticket."); return None
+            truck_to_update.last_used_timestamp = datetime.datetime.utcnow()
+
+            new_ticket = WeightTicket(
+                truck_id=truck_id, aggregate_type_id=aggregate_type_id, delivery_location_id=delivery_location_id,
+                gross_weight=gross_weight, tare_weight_at_weighing=tare_weight_at_weighing, net_weight=net_weight,
+                operator_name=operator_name if operator_name else None, ticket_printed=ticket_printed,
+                weight_seq=weight_seq, weight_age_ms=weight_age_ms
+            )
+            db_session.add(new_ticket)
+            if packed_trace is not None:
+                new_ticket.trace = WeightTicketTrace(sample_count=len(samples), duration_s=samples[-1][0] - samples[0][0],
+                                                     data=packed_trace)
+            if axles:
+                new_ticket.axles = [WeightTicketAxle(axle_index=i, axle_group=axle.group, load_kg=axle.load_kg)
+                                    for i, axle in enumerate(axles)]
+            db_session.flush()
+            _audit(db_session, "WeightTickets", new_ticket.id, "INSERT", changed_by=operator_name,
+                   new_values=new_ticket.to_dict())
         return new_ticket
     except IntegrityError: 
         db_session.rollback(); print(f"Error adding weight ticket: FK constraint failed."); return None
     except Exception as e:
         db_session.rollback(); print(f"Unexpected error adding weight ticket: {e}"); return None
 
+def get_weight_ticket_trace(db_session: Session, ticket_id: int) -> DecodedTrace | None:
+    trace = db_session.query(WeightTicketTrace).filter(WeightTicketTrace.weight_ticket_id == ticket_id).first()
+    return unpack_weight_trace(trace.data) if trace else None
+
 # --- AuditLog ---
 def add_audit_log_entry(db_session: Session, table_name: str, record_id: int, action: str,
                         changed_by: str = None, old_values: dict | None = None, 
-                        new_values: dict | WeightTicket | Truck | AggregateType | DeliveryLocation | None = None) -> AuditLog | None:
+                        new_values: dict | WeightTicket | Truck | AggregateType | DeliveryLocation | None = None,
+                        commit: bool = True) -> AuditLog | None:
+    # For changes made outside the helpers above (which audit themselves). With commit=False the
+    # entry joins the caller's transaction, e.g. inside a unit_of_work() block.
     try:
         new_values_json = None
         if isinstance(new_values, (Truck, AggregateType, DeliveryLocation, WeightTicket)):
@@ -232,20 +300,9 @@ def add_audit_log_entry(db_session: Session, table_name: str, record_id: int, ac
         
         old_values_json = old_values if isinstance(old_values, dict) else None
 
-        entry = AuditLog(
-            table_name=table_name, record_id=record_id, action=action, 
-            changed_by=changed_by if changed_by else None,
-            old_values=old_values_json, new_values=new_values_json
-        )
-        db_session.add(entry)
-        # This commit is separate. If called from within another function that commits,
-        # it might lead to nested transaction issues or commit prematurely.
-        # Consider if audit log should be part of the same transaction as the main operation.
-        # For now, let's assume it's fine or the calling function manages the overall session.
-        # However, for update functions above, the audit log is called *before* the main commit,
-        # so it's part of the same transaction. If add_weight_ticket calls this, it needs session.
-        db_session.commit() 
-        db_session.refresh(entry)
+        entry = _audit(db_session, table_name, record_id, action, changed_by, old_values_json, new_values_json)
+        if commit:
+            db_session.commit()
         return entry
     except Exception as e:
         db_session.rollback() # Rollback this specific audit log commit if it fails
@@ -0,0 +1,134 @@
+from typing import Callable, NamedTuple
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from .models import Base
+
+# The schema version lives in the SQLite header (PRAGMA user_version), so checking
+# whether anything needs doing at startup is one read of the already-open file.
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Registers the decorated function(connection) as schema migration number version."""
+    def register(func):
+        if version != len(MIGRATIONS) + 1:
+            raise ValueError(f"Migration {version} registered out of order; expected {len(MIGRATIONS) + 1}.")
+        MIGRATIONS.append(Migration(version, description, func))
+        return func
+    return register
+
+
+def _add_missing_column(connection: Connection, table: str, column: str, ddl_type: str):
+    if not any(c['name'] == column for c in inspect(connection).get_columns(table)):
+        print(f"Migrating '{table}' table: Adding '{column}' column.")
+        connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}')
+
+
+# --- Migrations ---
+# Append new ones at the end with the next number; never edit or renumber a released one.
+# A new database is created from the models and stamped with the latest version, so
+# anything a migration adds must also be declared on the models.
+
+@migration(1, "Baseline: bring databases from before versioning up to the current models")
+def _baseline(connection: Connection):
+    # The columns the old startup check used to add, then any missing tables
+    tables = inspect(connection).get_table_names()
+    if 'trucks' in tables:
+        _add_missing_column(connection, 'trucks', 'last_used_timestamp', 'DATETIME')
+    if 'weight_tickets' in tables:
+        _add_missing_column(connection, 'weight_tickets', 'weight_seq', 'INTEGER')
+        _add_missing_column(connection, 'weight_tickets', 'weight_age_ms', 'FLOAT')
+    Base.metadata.create_all(bind=connection)
+
+
+@migration(2, "Secondary indexes for truck MRU listing, ticket reporting and audit history")
+def _secondary_indexes(connection: Connection):
+    # Builds once over the existing rows; on a large ticket table this takes a few seconds
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS ix_trucks_mru ON trucks (last_used_timestamp DESC, company_name, unit_id)",
+        "CREATE INDEX IF NOT EXISTS ix_weight_tickets_timestamp ON weight_tickets (timestamp, net_weight)",
+        "CREATE INDEX IF NOT EXISTS ix_weight_tickets_truck ON weight_tickets (truck_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_weight_tickets_aggregate ON weight_tickets (aggregate_type_id, timestamp, net_weight)",
+        "CREATE INDEX IF NOT EXISTS ix_weight_tickets_location ON weight_tickets (delivery_location_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_audit_log_record ON audit_log (table_name, record_id, changed_at)",
+    ):
+        connection.exec_driver_sql(ddl)
+    connection.exec_driver_sql("ANALYZE") # Statistics so the planner picks between them well
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def get_schema_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine: Engine) -> int:
+    """Brings the database up to latest_version() and returns the version it was at.
+
+    Each pending migration runs in its own transaction together with the version bump,
+    so a failure leaves the database at the last completed version. BEGIN IMMEDIATE
+    takes the write lock first, so two instances starting at once migrate only once.
+    """
+    target = latest_version()
+    with engine.connect() as connection:
+        version = get_schema_version(connection)
+        if version == target:
+            return version # Normal startup: nothing else is touched
+        if version > target:
+            raise RuntimeError(f"Database schema version {version} is newer than this application ({target}).")
+        connection.rollback()
+        start_version = version
+        while version < target:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                version = get_schema_version(connection) # Another instance may have got here first
+                if version == 0 and not inspect(connection).get_table_names():
+                    print("Creating database tables.")
+                    Base.metadata.create_all(bind=connection)
+                    version = target
+                elif version < target:
+                    step = MIGRATIONS[version]
+                    print(f"Applying database migration {step.version}: {step.description}")
+                    step.apply(connection)
+                    version = step.version
+                connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        print(f"Database schema at version {version} (was {start_version}).")
+        return start_version
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    import time
+    from sqlalchemy import create_engine
+
+    directory = tempfile.mkdtemp()
+    bench_engine = create_engine(f"sqlite:///{os.path.join(directory, 'migrate.db')}")
+    # A database from before versioning: tickets without the sample columns
+    with bench_engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE trucks (id INTEGER PRIMARY KEY, unit_id VARCHAR NOT NULL UNIQUE, "
+                                   "company_name VARCHAR NOT NULL, asga_id VARCHAR UNIQUE, tare_weight FLOAT NOT NULL, "
+                                   "max_allowed_weight FLOAT NOT NULL, created_at DATETIME, updated_at DATETIME)")
+    migrate(bench_engine)
+    with bench_engine.connect() as connection:
+        print(f"trucks columns: {[c['name'] for c in inspect(connection).get_columns('trucks')]}")
+
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        migrate(bench_engine)
+    print(f"Up-to-date startup check: {(time.perf_counter() - start) / runs * 1000:.2f} ms")
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,6 +18,9 @@ class Truck(Base):
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     last_used_timestamp = Column(DateTime, nullable=True) 
 
+    # Index order matches get_all_trucks_mru_ordered(), so the list is read in order without a sort
+    __table_args__ = (Index('ix_trucks_mru', last_used_timestamp.desc(), company_name, unit_id),)
+
     weight_tickets = relationship("WeightTicket", back_populates="truck")
 
     def to_dict(self): 
@@ -84,10 +87,23 @@ class WeightTicket(Base):
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     operator_name = Column(String, nullable=True)
     ticket_printed = Column(Boolean, default=False)
+    weight_seq = Column(Integer, nullable=True)    # Scale reader sequence number of the captured sample
+    weight_age_ms = Column(Float, nullable=True)   # How old that sample was when it was captured (None = typed in)
+
+    # Date-range listing and reports; net_weight is included so totals are read from the index alone.
+    # Each foreign key leads a (key, timestamp) index for per truck/aggregate/location history.
+    __table_args__ = (
+        Index('ix_weight_tickets_timestamp', timestamp, net_weight),
+        Index('ix_weight_tickets_truck', truck_id, timestamp),
+        Index('ix_weight_tickets_aggregate', aggregate_type_id, timestamp, net_weight),
+        Index('ix_weight_tickets_location', delivery_location_id, timestamp),
+    )
 
     truck = relationship("Truck", back_populates="weight_tickets")
     aggregate_type = relationship("AggregateType", back_populates="weight_tickets")
     delivery_location = relationship("DeliveryLocation", back_populates="weight_tickets")
+    trace = relationship("WeightTicketTrace", back_populates="weight_ticket", uselist=False)
+    axles = relationship("WeightTicketAxle", back_populates="weight_ticket", order_by="WeightTicketAxle.axle_index")
 
     def to_dict(self): # Also useful for WeighTicket if it were to be audited directly for updates
         return {
@@ -100,7 +116,51 @@ class WeightTicket(Base):
             "net_weight": self.net_weight,
             "timestamp": self.timestamp.isoformat() if self.timestamp else None,
             "operator_name": self.operator_name,
-            "ticket_printed": self.ticket_printed
+            "ticket_printed": self.ticket_printed,
+            "weight_seq": self.weight_seq,
+            "weight_age_ms": self.weight_age_ms
+        }
+
+
+class WeightTicketTrace(Base):
+    # Kept out of weight_tickets so listing tickets never reads the blobs
+    __tablename__ = 'weight_ticket_traces'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    weight_ticket_id = Column(Integer, ForeignKey('weight_tickets.id'), nullable=False, unique=True)
+    sample_count = Column(Integer, nullable=False)
+    duration_s = Column(Float, nullable=False)
+    data = Column(LargeBinary, nullable=False) # See app.db.weight_trace for the encoding
+
+    weight_ticket = relationship("WeightTicket", back_populates="trace")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "weight_ticket_id": self.weight_ticket_id,
+            "sample_count": self.sample_count,
+            "duration_s": self.duration_s,
+            "size_bytes": len(self.data) if self.data is not None else 0,
+        }
+
+
+class WeightTicketAxle(Base):
+    # Per-axle breakdown of a weigh-in-motion ticket
+    __tablename__ = 'weight_ticket_axles'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    weight_ticket_id = Column(Integer, ForeignKey('weight_tickets.id'), nullable=False, index=True)
+    axle_index = Column(Integer, nullable=False) # 0 = front axle
+    axle_group = Column(Integer, nullable=False) # Axles sharing a group form a tandem/tridem
+    load_kg = Column(Float, nullable=False)
+
+    weight_ticket = relationship("WeightTicket", back_populates="axles")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "weight_ticket_id": self.weight_ticket_id,
+            "axle_index": self.axle_index,
+            "axle_group": self.axle_group,
+            "load_kg": self.load_kg,
         }
 
 
@@ -114,3 +174,6 @@ class AuditLog(Base):
     changed_at = Column(DateTime, default=datetime.datetime.utcnow)
     old_values = Column(JSON, nullable=True)
     new_values = Column(JSON, nullable=True)
+
+    # History of one record, in order
+    __table_args__ = (Index('ix_audit_log_record', table_name, record_id, changed_at),)
@@ -0,0 +1,90 @@
+import datetime
+from typing import NamedTuple
+from sqlalchemy import select, func
+from sqlalchemy.engine import Connection, Engine
+from .models import Truck, WeightTicket, AuditLog
+
+# The queries that run against large tables, with the index each is expected to use.
+# check_query_plans() fails if any of them falls back to a full table scan or a sort.
+_DAY = datetime.datetime(2024, 1, 1)
+_RANGE = (_DAY, _DAY + datetime.timedelta(days=31))
+HOT_QUERIES = {
+    "trucks_mru": select(Truck).order_by(Truck.last_used_timestamp.desc().nullslast(), Truck.company_name, Truck.unit_id),
+    "tickets_in_range": select(WeightTicket).where(WeightTicket.timestamp.between(*_RANGE))
+                        .order_by(WeightTicket.timestamp.desc()),
+    "tickets_range_totals": select(func.count(), func.sum(WeightTicket.net_weight))
+                            .where(WeightTicket.timestamp.between(*_RANGE)),
+    "tickets_for_truck": select(WeightTicket).where(WeightTicket.truck_id == 1, WeightTicket.timestamp >= _RANGE[0])
+                         .order_by(WeightTicket.timestamp),
+    "aggregate_range_totals": select(func.sum(WeightTicket.net_weight))
+                              .where(WeightTicket.aggregate_type_id == 1, WeightTicket.timestamp.between(*_RANGE)),
+    "tickets_for_location": select(WeightTicket).where(WeightTicket.delivery_location_id == 1)
+                            .order_by(WeightTicket.timestamp.desc()),
+    "audit_history": select(AuditLog).where(AuditLog.table_name == "Trucks", AuditLog.record_id == 1)
+                     .order_by(AuditLog.changed_at),
+}
+# Queries that list a whole (small) table by design: walking an index in order is fine for these
+FULL_LISTINGS = {"trucks_mru"}
+
+
+class PlanProblem(NamedTuple):
+    query: str
+    detail: str # The offending EXPLAIN QUERY PLAN line
+
+
+def explain_query_plan(connection: Connection, statement) -> list[str]:
+    compiled = statement.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+
+
+def check_query_plans(engine: Engine, queries: dict | None = None) -> list[PlanProblem]:
+    """Returns the hot queries whose plan scans a table or sorts in a temp b-tree (empty = all good).
+
+    A scan of a whole index counts too (it still reads every row), except for FULL_LISTINGS.
+    """
+    problems = []
+    with engine.connect() as connection:
+        for name, statement in (queries or HOT_QUERIES).items():
+            for detail in explain_query_plan(connection, statement):
+                scan = detail.startswith("SCAN ") and not (name in FULL_LISTINGS and " INDEX " in detail)
+                if scan or "TEMP B-TREE" in detail:
+                    problems.append(PlanProblem(name, detail))
+    return problems
+
+
+def seed_plan_data(connection: Connection, trucks: int = 300, tickets: int = 50000):
+    """Fills an empty database with enough rows (and statistics) for the planner to choose as on a site database."""
+    connection.exec_driver_sql("INSERT INTO trucks (unit_id, company_name, tare_weight, max_allowed_weight, last_used_timestamp) "
+                               f"WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {trucks}) "
+                               "SELECT 'T-' || i, 'Haulier ' || (i % 40), 12000, 44000, "
+                               "CASE WHEN i % 3 THEN datetime('2024-01-01', '+' || i || ' hours') END FROM n")
+    connection.exec_driver_sql("INSERT INTO weight_tickets (truck_id, aggregate_type_id, delivery_location_id, gross_weight, "
+                               "tare_weight_at_weighing, net_weight, timestamp) "
+                               f"WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {tickets}) "
+                               f"SELECT 1 + i % {trucks}, 1 + i % 12, 1 + i % 25, 40000, 12000, 28000, "
+                               "datetime('2023-01-01', '+' || (i * 10) || ' minutes') FROM n")
+    connection.exec_driver_sql("INSERT INTO audit_log (table_name, record_id, action, changed_at) "
+                               "SELECT 'WeightTickets', id, 'INSERT', timestamp FROM weight_tickets")
+    connection.exec_driver_sql("ANALYZE")
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    import tempfile
+    from sqlalchemy import create_engine
+    from .migrations import migrate
+
+    plan_engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}")
+    migrate(plan_engine)
+    with plan_engine.begin() as connection:
+        seed_plan_data(connection)
+        for name, statement in HOT_QUERIES.items():
+            print(f"{name}: {' | '.join(explain_query_plan(connection, statement))}")
+
+    problems = check_query_plans(plan_engine)
+    for problem in problems:
+        print(f"REGRESSION {problem.query}: {problem.detail}")
+    print("Query plans OK." if not problems else f"{len(problems)} query plan regressions.")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,130 @@
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+# PRAGMAs applied to every new SQLite connection. journal_mode is stored in the database
+# file; the others are per connection, which is why they go on the connect event.
+SQLITE_PROFILES: dict[str, dict[str, object]] = {
+    # What create_engine() gives by default (rollback journal, fsync on every commit);
+    # only the busy timeout is added so a reader never makes a write fail outright
+    'legacy': {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000},
+    # WAL: readers and the writer don't block each other. synchronous=NORMAL syncs the
+    # WAL at checkpoints rather than every commit: a power cut may lose the last commits,
+    # but never corrupts the database.
+    'balanced': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000,
+                 'cache_size': -16000, 'mmap_size': 64 * 1024 * 1024, 'temp_store': 'MEMORY'},
+    # WAL with an fsync per commit: a ticket reported as saved survives a power cut
+    'durable': {'journal_mode': 'WAL', 'synchronous': 'FULL', 'busy_timeout': 5000,
+                'cache_size': -16000, 'mmap_size': 64 * 1024 * 1024, 'temp_store': 'MEMORY'},
+}
+DEFAULT_SQLITE_PROFILE = 'balanced'
+# Per deployment: export SCALE_DB_PROFILE=durable on a site with no UPS, for example
+SQLITE_PROFILE = os.environ.get('SCALE_DB_PROFILE', DEFAULT_SQLITE_PROFILE)
+
+
+def get_sqlite_profile(name: str) -> dict[str, object]:
+    try:
+        return SQLITE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile '{name}'. Expected one of {', '.join(SQLITE_PROFILES)}.") from None
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict[str, object]):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(url: str, profile: str | dict[str, object] = SQLITE_PROFILE, **engine_kwargs) -> Engine:
+    """create_engine() for a SQLite URL with a PRAGMA profile applied on every connect.
+
+    profile is a SQLITE_PROFILES name or a dict of PRAGMAs. Other keyword arguments
+    go to create_engine().
+    """
+    pragmas = get_sqlite_profile(profile) if isinstance(profile, str) else dict(profile)
+    connect_args = {"check_same_thread": False, **engine_kwargs.pop("connect_args", {})}
+    engine = create_engine(url, connect_args=connect_args, **engine_kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    engine.sqlite_profile = profile if isinstance(profile, str) else 'custom'
+    return engine
+
+
+if __name__ == '__main__':
+    import shutil
+    import tempfile
+    import threading
+    import time
+    from sqlalchemy import func
+    from sqlalchemy.orm import sessionmaker
+    from .models import Base, WeightTicket
+    from .database import add_truck, add_aggregate_type, add_delivery_location, add_weight_ticket
+
+    def run_benchmark(profile: str, inserts: int = 300, concurrent_s: float = 2.0) -> dict:
+        path = os.path.join(directory, f"bench_{profile}.db")
+        bench_engine = create_sqlite_engine(f"sqlite:///{path}", profile)
+        Base.metadata.create_all(bind=bench_engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=bench_engine)
+        setup = Session()
+        ids = (add_truck(setup, "B-1", "Bench Haulage", 12000.0, 44000.0).id,
+               add_aggregate_type(setup, "Gravel").id, add_delivery_location(setup, "Yard").id)
+        setup.close()
+
+        def insert_ticket(session):
+            return add_weight_ticket(session, *ids, gross_weight=30000.0, tare_weight_at_weighing=12000.0, net_weight=18000.0)
+
+        session = Session()
+        start = time.perf_counter()
+        for _ in range(inserts):
+            insert_ticket(session)
+        insert_rate = inserts / (time.perf_counter() - start)
+        session.close()
+
+        # A report scanning tickets in a loop while the lane keeps saving them
+        stop = threading.Event()
+        result = {"reports": 0, "writes": 0, "write_failures": 0, "max_write_ms": 0.0}
+
+        def report():
+            reader = Session()
+            while not stop.is_set():
+                reader.query(func.count(WeightTicket.id), func.sum(WeightTicket.net_weight)).one()
+                reader.query(WeightTicket).order_by(WeightTicket.timestamp.desc()).limit(200).all()
+                reader.rollback() # End the read transaction like a report refresh would
+                result["reports"] += 1
+            reader.close()
+
+        def write():
+            writer = Session()
+            while not stop.is_set():
+                start = time.perf_counter()
+                if insert_ticket(writer) is None:
+                    result["write_failures"] += 1
+                else:
+                    result["writes"] += 1
+                result["max_write_ms"] = max(result["max_write_ms"], (time.perf_counter() - start) * 1000)
+            writer.close()
+
+        threads = [threading.Thread(target=report), threading.Thread(target=report), threading.Thread(target=write)]
+        for t in threads:
+            t.start()
+        time.sleep(concurrent_s)
+        stop.set()
+        for t in threads:
+            t.join()
+        bench_engine.dispose()
+        return {"insert_rate": insert_rate, **result, "concurrent_s": concurrent_s}
+
+    # Next to the real database, so fsync costs are those of the deployment's disk (not /tmp)
+    directory = tempfile.mkdtemp(prefix="sqlite-bench-", dir=".")
+    for profile in SQLITE_PROFILES:
+        r = run_benchmark(profile)
+        print(f"{profile:>8}: {r['insert_rate']:7.0f} tickets/s alone | with 2 report loops: "
+              f"{r['writes'] / r['concurrent_s']:6.0f} tickets/s ({r['write_failures']} failed, slowest {r['max_write_ms']:.0f} ms), "
+              f"{r['reports'] / r['concurrent_s']:6.0f} reports/s")
+    shutil.rmtree(directory)
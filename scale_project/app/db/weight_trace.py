@@ -0,0 +1,126 @@
+import struct
+import zlib
+from typing import NamedTuple
+import numpy as np
+
+# Blob layout: header, then one zlib stream holding the byte-shuffled time deltas,
+# weight deltas and (optionally) status bytes. Times are whole milliseconds from the
+# first sample, weights are integers in units of `resolution` kg.
+TRACE_VERSION = 1
+_HEADER = struct.Struct('<BBBBIqd') # version, time width, weight width, has status, count, first weight, resolution
+_WIDTHS = {1: np.int8, 2: np.int16, 4: np.int32, 8: np.int64}
+
+
+class DecodedTrace(NamedTuple):
+    timestamps: np.ndarray # Seconds from the first sample
+    weights: np.ndarray    # kg
+    status: np.ndarray | None # Sample status bits (see app.scale_reader.ring_buffer), if stored
+
+
+def _narrowest(values: np.ndarray) -> int:
+    if not len(values):
+        return 1
+    lo, hi = int(values.min()), int(values.max())
+    for width, dtype in _WIDTHS.items():
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return width
+    raise ValueError("Trace value out of range.")
+
+
+def _shuffle(values: np.ndarray, width: int) -> bytes:
+    # Grouping the n-th byte of every value together leaves long runs of 0x00/0xff
+    # in the high bytes, which zlib compresses far better than interleaved integers.
+    return values.astype(_WIDTHS[width]).view(np.uint8).reshape(-1, width).T.tobytes()
+
+
+def _unshuffle(data: bytes, count: int, width: int) -> np.ndarray:
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(width, count)
+    return np.ascontiguousarray(planes.T).view(_WIDTHS[width]).reshape(count)
+
+
+def pack_weight_trace(timestamps, weights, status=None, resolution: float = 0.01, level: int = 9) -> bytes:
+    """Encodes a weight trace as delta-encoded fixed-point samples, zlib-compressed.
+
+    timestamps are seconds (any origin, e.g. time.monotonic()); weights must all be
+    valid numbers, so drop error samples first (the gap stays in the timestamps).
+    Weights are rounded to resolution kg.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(timestamps) != len(weights) or not len(weights):
+        raise ValueError("A trace needs the same, non-zero number of timestamps and weights.")
+    if not (np.isfinite(weights).all() and np.isfinite(timestamps).all()):
+        raise ValueError("A trace can't store NaN or infinite values; drop samples without a weight first.")
+    millis = np.rint((timestamps - timestamps[0]) * 1000).astype(np.int64)
+    fixed = np.rint(weights / resolution).astype(np.int64)
+    time_deltas, weight_deltas = np.diff(millis), np.diff(fixed)
+    time_width, weight_width = _narrowest(time_deltas), _narrowest(weight_deltas)
+
+    payload = _shuffle(time_deltas, time_width) + _shuffle(weight_deltas, weight_width)
+    if status is not None:
+        payload += np.asarray(status, dtype=np.uint8).tobytes()
+    header = _HEADER.pack(TRACE_VERSION, time_width, weight_width, status is not None, len(weights), int(fixed[0]), resolution)
+    return header + zlib.compress(payload, level)
+
+
+def unpack_weight_trace(blob: bytes) -> DecodedTrace:
+    """Decodes a pack_weight_trace() blob. Raises ValueError if it is corrupt or from an unknown version."""
+    if len(blob) < _HEADER.size:
+        raise ValueError("Weight trace is truncated.")
+    version, time_width, weight_width, has_status, count, first, resolution = _HEADER.unpack_from(blob, 0)
+    if version != TRACE_VERSION:
+        raise ValueError(f"Unsupported weight trace version {version}.")
+    if time_width not in _WIDTHS or weight_width not in _WIDTHS or has_status > 1 or not count or not resolution > 0:
+        raise ValueError("Corrupt weight trace header.")
+    try:
+        payload = zlib.decompress(memoryview(blob)[_HEADER.size:])
+    except zlib.error as e:
+        raise ValueError(f"Corrupt weight trace data: {e}") from e
+    n = count - 1
+    time_end = n * time_width
+    weight_end = time_end + n * weight_width
+    if len(payload) != weight_end + (count if has_status else 0):
+        raise ValueError("Weight trace data does not match its header.")
+
+    millis = np.zeros(count, dtype=np.int64)
+    np.cumsum(_unshuffle(payload[:time_end], n, time_width), out=millis[1:])
+    fixed = np.full(count, first, dtype=np.int64)
+    fixed[1:] += np.cumsum(_unshuffle(payload[time_end:weight_end], n, weight_width))
+    status = np.frombuffer(payload, dtype=np.uint8, count=count, offset=weight_end) if has_status else None
+    return DecodedTrace(millis / 1000.0, fixed * resolution, status)
+
+
+def trace_preview(trace: DecodedTrace, points: int = 200) -> tuple[np.ndarray, np.ndarray]:
+    """Downsamples a trace for display, keeping each bucket's min and max so spikes survive.
+
+    Returns (timestamps, weights) with at most 2 * points samples.
+    """
+    count = len(trace.weights)
+    if count <= 2 * points:
+        return trace.timestamps, trace.weights
+    edges = np.linspace(0, count, points + 1).astype(np.int64)
+    lo_idx = np.array([edges[i] + np.argmin(trace.weights[edges[i]:edges[i + 1]]) for i in range(points)])
+    hi_idx = np.array([edges[i] + np.argmax(trace.weights[edges[i]:edges[i + 1]]) for i in range(points)])
+    idx = np.sort(np.concatenate([lo_idx, hi_idx]))
+    return trace.timestamps[idx], trace.weights[idx]
+
+
+if __name__ == '__main__':
+    import time
+    from app.scale_reader import Scenario, TruckVisit, CompiledScenario
+
+    visit = TruckVisit("T-101", tare=12000.0, gross=38000.0, gap_s=2.0, dwell_s=10.0, drive_off_s=0.0)
+    compiled = CompiledScenario(Scenario([visit], resolution=0.01))
+    for rate in (10.0, 50.0):
+        rendered = compiled.render(sample_rate=rate, seed=1)
+        status = np.where(rendered.stable, 0x40, 0x08)
+        blob = pack_weight_trace(rendered.timestamps, rendered.weights, status)
+        start = time.perf_counter()
+        decoded = unpack_weight_trace(blob)
+        decode_us = (time.perf_counter() - start) * 1e6
+        exact = np.allclose(decoded.weights, rendered.weights, atol=0.005) and np.array_equal(decoded.status, status)
+        preview_t, preview_w = trace_preview(decoded)
+        print(f"{rate:.0f} Hz, {len(rendered.weights)} samples over {rendered.timestamps[-1]:.0f} s: "
+              f"{len(blob)} bytes ({len(blob) / len(rendered.weights):.2f} B/sample, raw {len(rendered.weights) * 17} B), "
+              f"decode {decode_us:.0f} us, lossless={exact}, preview {len(preview_w)} points")
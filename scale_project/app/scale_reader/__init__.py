@@ -1,4 +1,34 @@
 from .serial_reader import ScaleReader
-from .scale_emulator import ScaleEmulator
+from .scale_emulator import ScaleEmulator, VirtualSerialPort, SimulatedTrace, encode_trace
+from .ring_buffer import SampleRingBuffer, WeightSample
+from .protocols import ScaleReading, ScaleProtocol, ScaleCommand, PROTOCOLS, register_protocol, get_protocol
+from .weight_stream import WeightStream, Subscription, POLICY_LATEST, POLICY_EVERY, POLICY_DECIMATE
+from .stability import StabilityDetector, StabilityStats, EVENT_STABLE, EVENT_MOTION
+from .async_reader import AsyncScaleReader, MultiScaleReader
+from .tk_bridge import TkStreamBridge
+from .scenario import Scenario, TruckVisit, CompiledScenario, measure_lane_throughput
+from .filters import WeightFilter, MovingMedian, ExponentialFilter, KalmanFilter1D, FilterPipeline, FILTERS, register_filter, create_filter
+from .weigh_in_motion import WeighInMotion, WIMResult, AxleLoad, segment_axles
+from .metrics import ScaleMetrics, LatencyHistogram, MetricsExporter, render_prometheus
+from .broadcast import WeightBroadcastServer, iter_broadcast, encode_sample, FORMAT_TEXT, FORMAT_BINARY
+from .process_reader import ProcessScaleReader, SharedSampleRing
+from .commands import CommandChannel, CommandResponse, ScaleCommandError, CommandTimeout
+from .autodetect import DetectedConfig, AutodetectCache, detect_port, autodetect_reader, score_capture, infer_framing, COMMON_BAUDRATES
+from .recorder import FrameRecorder, RecordingFile, ReplayPort, replay_port_factory
 
-__all__ = ['ScaleReader', 'ScaleEmulator']
+__all__ = ['ScaleReader', 'ScaleEmulator', 'VirtualSerialPort', 'SimulatedTrace', 'encode_trace', 'SampleRingBuffer', 'WeightSample',
+           'ScaleReading', 'ScaleProtocol', 'ScaleCommand', 'PROTOCOLS', 'register_protocol', 'get_protocol',
+           'WeightStream', 'Subscription', 'POLICY_LATEST', 'POLICY_EVERY', 'POLICY_DECIMATE',
+           'StabilityDetector', 'StabilityStats', 'EVENT_STABLE', 'EVENT_MOTION',
+           'AsyncScaleReader', 'MultiScaleReader', 'TkStreamBridge',
+           'Scenario', 'TruckVisit', 'CompiledScenario', 'measure_lane_throughput',
+           'WeightFilter', 'MovingMedian', 'ExponentialFilter', 'KalmanFilter1D', 'FilterPipeline', 'FILTERS',
+           'register_filter', 'create_filter',
+           'WeighInMotion', 'WIMResult', 'AxleLoad', 'segment_axles',
+           'ScaleMetrics', 'LatencyHistogram', 'MetricsExporter', 'render_prometheus',
+           'WeightBroadcastServer', 'iter_broadcast', 'encode_sample', 'FORMAT_TEXT', 'FORMAT_BINARY',
+           'ProcessScaleReader', 'SharedSampleRing',
+           'CommandChannel', 'CommandResponse', 'ScaleCommandError', 'CommandTimeout',
+           'DetectedConfig', 'AutodetectCache', 'detect_port', 'autodetect_reader', 'score_capture', 'infer_framing',
+           'COMMON_BAUDRATES',
+           'FrameRecorder', 'RecordingFile', 'ReplayPort', 'replay_port_factory']
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import threading
+import time
+import serial
+from .ring_buffer import SampleRingBuffer, WeightSample, STATUS_IO_ERROR
+from .protocols import get_protocol, cached_parser, DEFAULT_PROTOCOL
+from .framing import FrameSplitter
+from .weight_stream import WeightStream
+from .stability import StabilityDetector
+from .metrics import LatencyHistogram
+from .connection import backoff_delay, STATE_DISCONNECTED, STATE_CONNECTING, STATE_CONNECTED, STATE_BACKOFF, STATE_STOPPED
+from .serial_reader import reading_to_sample
+
+
+class AsyncScaleReader:
+    """One serial scale serviced by an asyncio loop through loop.add_reader() (POSIX only).
+
+    The port is opened non-blocking; whenever its fd is readable everything available
+    is read with one os.read(), split into frames, parsed with the scale's protocol and
+    published to self.stream. Exposes the same latest()/read_weight()/stream/stability
+    surface as ScaleReader, so UI code can consume either.
+    """
+    def __init__(self, name: str, port: str, baudrate: int = 9600, protocol: str = DEFAULT_PROTOCOL,
+                 buffer_size: int = 256, base_delay: float = 0.5, max_delay: float = 30.0, jitter: float = 0.2,
+                 recorder=None):
+        self.name = name
+        self.port = port
+        self.baudrate = baudrate
+        self.protocol = get_protocol(protocol)
+        self._parse = cached_parser(self.protocol.parse)
+        self.buffer = SampleRingBuffer(buffer_size)
+        self.stream = WeightStream()
+        self.stability = StabilityDetector()
+        self.stability.attach(self.stream)
+        self.base_delay, self.max_delay, self.jitter = base_delay, max_delay, jitter
+        self.recorder = recorder # Optional FrameRecorder for raw frames
+
+        self.ser = None
+        self.state = STATE_STOPPED
+        self.last_error: str | None = None
+        self.reconnect_count = 0
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.read_to_publish = LatencyHistogram() # fd readable -> samples published, as ScaleMetrics.read_to_publish
+        self.frame_interval = LatencyHistogram() # Time between successive frames
+        self._splitter = FrameSplitter(self.protocol.terminator)
+        self._seq = 0 # Sequence number of the last recorded sample
+        self._last_frame_at: float | None = None
+        self._lost: asyncio.Future | None = None
+
+    # --- Same read surface as ScaleReader ---
+    def latest(self) -> WeightSample | None:
+        return self.buffer.latest()
+
+    def read_weight(self) -> float | None:
+        sample = self.buffer.latest()
+        return sample.weight if sample is not None and sample.ok else None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.state == STATE_CONNECTED
+
+    def _record_sample(self, sample: WeightSample):
+        self._seq += 1
+        sample = WeightSample(sample.timestamp, sample.weight, sample.status, self._seq)
+        self.buffer.append(*sample)
+        self.stream.publish(sample)
+
+    def _record_samples(self, samples: list[WeightSample]):
+        # One bulk read: published together so subscriber filters can process the batch at once
+        recorded = []
+        for sample in samples:
+            self._seq += 1
+            sample = WeightSample(sample.timestamp, sample.weight, sample.status, self._seq)
+            self.buffer.append(*sample)
+            recorded.append(sample)
+        self.stream.publish_batch(recorded)
+
+    # --- Event loop side ---
+    async def run(self):
+        """Keeps the port open until cancelled, reconnecting with backoff."""
+        loop = asyncio.get_running_loop()
+        failed_attempts = 0
+        ever_connected = False
+        try:
+            while True:
+                self.state = STATE_CONNECTING
+                try:
+                    self._open(loop)
+                except (serial.SerialException, OSError) as e:
+                    failed_attempts += 1
+                    self.last_error = str(e)
+                    if failed_attempts == 1:
+                        print(f"[{self.name}] Error connecting to {self.port}: {e}. Retrying with backoff.")
+                    self.state = STATE_BACKOFF
+                    await asyncio.sleep(backoff_delay(failed_attempts, self.base_delay, self.max_delay, self.jitter))
+                    continue
+                if ever_connected:
+                    self.reconnect_count += 1
+                ever_connected = True
+                failed_attempts = 0
+                self.last_error = None
+                self.state = STATE_CONNECTED
+                print(f"[{self.name}] Connected to {self.port}")
+                self._lost = loop.create_future()
+                error = await self._lost
+                self._close(loop)
+                self.last_error = str(error)
+                self.state = STATE_DISCONNECTED
+                self._record_sample(WeightSample(time.monotonic(), None, STATUS_IO_ERROR))
+                print(f"[{self.name}] Lost connection to {self.port}: {error}")
+        finally:
+            self._close(loop)
+            if self.recorder is not None:
+                self.recorder.flush()
+            self.state = STATE_STOPPED
+
+    def _open(self, loop: asyncio.AbstractEventLoop):
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0) # timeout=0: non-blocking fd
+        self._splitter.clear()
+        loop.add_reader(self.ser.fileno(), self._on_readable)
+
+    def _close(self, loop: asyncio.AbstractEventLoop):
+        ser, self.ser = self.ser, None
+        if ser is None:
+            return
+        try:
+            loop.remove_reader(ser.fileno())
+        except Exception:
+            pass
+        try:
+            ser.close()
+        except Exception:
+            pass
+
+    def _connection_lost(self, error: Exception | str):
+        if self._lost is not None and not self._lost.done():
+            self._lost.set_result(error)
+
+    def _on_readable(self):
+        arrived = time.monotonic()
+        try:
+            data = os.read(self.ser.fileno(), 65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._connection_lost(e)
+            return
+        if not data: # Readable with no data: the device went away
+            self._connection_lost("device disconnected")
+            return
+        self.bytes_received += len(data)
+        self._splitter.feed(data)
+        frames = self._splitter.frames()
+        recorder = self.recorder
+        if recorder is not None:
+            for frame in frames:
+                recorder.record(frame, arrived)
+        parse = self._parse
+        self._record_samples([reading_to_sample(parse(frame), arrived) for frame in frames])
+        if frames:
+            self.frames_received += len(frames)
+            if self._last_frame_at is not None:
+                self.frame_interval.observe(arrived - self._last_frame_at)
+            self._last_frame_at = arrived
+            self.read_to_publish.observe(time.monotonic() - arrived)
+
+    def metrics(self) -> dict:
+        return {
+            "state": self.state,
+            "last_error": self.last_error,
+            "reconnect_count": self.reconnect_count,
+            "frames_received": self.frames_received,
+            "bytes_received": self.bytes_received,
+            "read_to_publish": self.read_to_publish.snapshot(),
+            "frame_interval": self.frame_interval.snapshot(),
+        }
+
+
+class MultiScaleReader:
+    """Runs many AsyncScaleReaders on one asyncio event loop in one background thread."""
+    def __init__(self):
+        self.readers: dict[str, AsyncScaleReader] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._tasks: dict[str, asyncio.Future] = {}
+
+    def add_scale(self, name: str, port: str, baudrate: int = 9600, protocol: str = DEFAULT_PROTOCOL, **kwargs) -> AsyncScaleReader:
+        if name in self.readers:
+            raise ValueError(f"Scale '{name}' is already registered.")
+        reader = AsyncScaleReader(name, port, baudrate=baudrate, protocol=protocol, **kwargs)
+        self.readers[name] = reader
+        if self.is_running:
+            self._tasks[name] = asyncio.run_coroutine_threadsafe(reader.run(), self.loop)
+        return reader
+
+    def remove_scale(self, name: str):
+        self.readers.pop(name)
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    def __getitem__(self, name: str) -> AsyncScaleReader:
+        return self.readers[name]
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="MultiScaleReader", daemon=True)
+        self._thread.start()
+        for name, reader in self.readers.items():
+            self._tasks[name] = asyncio.run_coroutine_threadsafe(reader.run(), self.loop)
+
+    def stop(self, timeout: float = 2.0):
+        if not self.is_running:
+            return
+
+        async def _cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_cancel_all(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.loop.close()
+        self._thread = None
+        self._tasks.clear()
+
+    def metrics(self) -> dict[str, dict]:
+        return {name: reader.metrics() for name, reader in self.readers.items()}
+
+
+if __name__ == '__main__':
+    import pty, tty
+    print("Testing MultiScaleReader with three pseudo-terminal scales...")
+    multi = MultiScaleReader()
+    masters = []
+    for lane in range(3):
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        masters.append(master)
+        multi.add_scale(f"lane{lane + 1}", os.ttyname(slave))
+    multi.start()
+    time.sleep(0.2)
+    for i in range(200):
+        for lane, master in enumerate(masters):
+            os.write(master, f"ST,GS,{1000 * (lane + 1) + i:0=+10.2f}kg\r\n".encode('ascii'))
+        time.sleep(0.005)
+    time.sleep(0.2)
+    for name, reader in multi.readers.items():
+        m = reader.metrics()
+        print(f"{name}: {reader.read_weight()} kg, frames={m['frames_received']}, "
+              f"read->publish avg {m['read_to_publish']['avg_ms']:.3f} ms p99 <= {m['read_to_publish']['p99_ms']} ms "
+              f"max {m['read_to_publish']['max_ms']:.3f} ms")
+    multi.stop()
+    print("MultiScaleReader Test Finished.")
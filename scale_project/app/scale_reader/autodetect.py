@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+import serial
+from .protocols import PROTOCOLS, ScaleProtocol, CMD_POLL, cached_parser
+from .framing import FrameSplitter
+
+# Most common indicator speeds first, so typical lanes settle after one or two tries
+COMMON_BAUDRATES = (9600, 19200, 4800, 2400, 38400, 57600, 115200, 1200)
+AUTODETECT_CACHE_FILE = "./scale_autodetect.json"
+
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_ODD_PARITY = bytes(bin(i).count('1') & 1 for i in range(256)) # 1 where a byte has an odd number of set bits
+_STRIP_HIGH_BIT = bytes(i & 0x7F for i in range(256))
+
+
+class DetectedConfig(NamedTuple):
+    port: str
+    baudrate: int
+    protocol: str
+    bytesize: int = serial.EIGHTBITS
+    parity: str = serial.PARITY_NONE
+    stopbits: float = serial.STOPBITS_ONE
+    polled: bool = False  # The indicator only answers its poll command
+    score: float = 1.0    # Share of captured frames the protocol parsed
+    elapsed_s: float = 0.0
+
+    def reader_kwargs(self) -> dict:
+        """Keyword arguments that open a ScaleReader with this configuration."""
+        kwargs = {"port": self.port, "baudrate": self.baudrate, "protocol": self.protocol}
+        if (self.bytesize, self.parity, self.stopbits) != (serial.EIGHTBITS, serial.PARITY_NONE, serial.STOPBITS_ONE):
+            kwargs["serial_options"] = {"bytesize": self.bytesize, "parity": self.parity, "stopbits": self.stopbits}
+        return kwargs
+
+
+def infer_framing(data: bytes) -> tuple[int, str, bytes]:
+    """Works out 7-bit framing from bytes captured as 8N1.
+
+    7E1/7O1 take as many bit times as 8N1, so at the right speed the parity bit
+    simply shows up as bit 7: if every byte has even (odd) parity and some have
+    bit 7 set, the line is 7E1 (7O1). Returns (bytesize, parity, data with the
+    parity bits stripped). 8E1/7N1 and other bit counts need their own sweep.
+    """
+    if not data or not len(data) - len(data.translate(None, _HIGH_BYTES)):
+        return serial.EIGHTBITS, serial.PARITY_NONE, data
+    odd = data.translate(_ODD_PARITY).count(1)
+    if odd == 0:
+        return serial.SEVENBITS, serial.PARITY_EVEN, data.translate(_STRIP_HIGH_BIT)
+    if odd == len(data):
+        return serial.SEVENBITS, serial.PARITY_ODD, data.translate(_STRIP_HIGH_BIT)
+    return serial.EIGHTBITS, serial.PARITY_NONE, data
+
+
+def score_capture(data: bytes, protocols: list[ScaleProtocol] | None = None,
+                  min_frames: int = 2) -> list[tuple[float, ScaleProtocol]]:
+    """Scores captured bytes against each protocol's framing and parser, best first.
+
+    The score is the share of complete frames the parser accepts; the first frame is
+    ignored because the capture may have started mid-frame. Protocols with fewer
+    than min_frames parsed frames score 0.
+    """
+    scores = []
+    for protocol in protocols or list(PROTOCOLS.values()):
+        splitter = FrameSplitter(protocol.terminator, max_buffer=max(len(data), 4096))
+        splitter.feed(data)
+        frames = splitter.frames()[1:]
+        parse = cached_parser(protocol.parse)
+        parsed = sum(1 for frame in frames if parse(frame) is not None)
+        scores.append((parsed / len(frames) if parsed >= min_frames else 0.0, protocol))
+    scores.sort(key=lambda item: item[0], reverse=True)
+    return scores
+
+
+class AutodetectCache:
+    """Detected configurations per port, kept in a small JSON file.
+
+    Cached settings are tried first on the next detection, so reconnecting a known
+    lane costs one short capture; after an indicator swap they fail to parse and a
+    full sweep runs and replaces them.
+    """
+    def __init__(self, path: str = AUTODETECT_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, port: str) -> DetectedConfig | None:
+        with self._lock:
+            entry = self._load().get(port)
+        if entry is None or entry.get("protocol") not in PROTOCOLS:
+            return None
+        return DetectedConfig(port=port, **{k: v for k, v in entry.items() if k in DetectedConfig._fields})
+
+    def put(self, config: DetectedConfig):
+        with self._lock:
+            entries = self._load()
+            entries[config.port] = {k: v for k, v in config._asdict().items() if k not in ("port", "score", "elapsed_s")}
+            self._save(entries)
+
+    def forget(self, port: str):
+        with self._lock:
+            if self._load().pop(port, None) is not None:
+                self._save(self._entries)
+
+    def _save(self, entries: dict[str, dict]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving autodetect cache {self.path}: {e}")
+
+
+def _capture(ser, duration_s: float, min_terminators: int) -> bytes:
+    """Reads for up to duration_s, returning early once min_terminators line ends arrived."""
+    data = bytearray()
+    deadline = time.monotonic() + duration_s
+    while time.monotonic() < deadline:
+        chunk = ser.read(ser.in_waiting or 1)
+        if chunk:
+            data += chunk
+            if data.count(b'\r') >= min_terminators or data.count(b'\n') >= min_terminators:
+                break
+    return bytes(data)
+
+
+def _match(data: bytes, protocols: list[ScaleProtocol], min_frames: int) -> tuple[float, ScaleProtocol, int, str] | None:
+    bytesize, parity, data = infer_framing(data)
+    score, protocol = score_capture(data, protocols, min_frames)[0]
+    return (score, protocol, bytesize, parity) if score > 0 else None
+
+
+def _try_config(ser, baudrate: int, protocols: list[ScaleProtocol], polled: bool,
+                dwell_s: float, min_frames: int) -> tuple[tuple[float, ScaleProtocol, int, str] | None, bool]:
+    """Returns (best match or None, whether any bytes arrived at all)."""
+    ser.baudrate = baudrate
+    ser.reset_input_buffer()
+    if not polled:
+        data = _capture(ser, dwell_s, min_frames + 1)
+        return _match(data, protocols, min_frames), bool(data)
+    # Every protocol's poll in one burst: the indicator ignores (or errors on) the foreign ones
+    polls = list(dict.fromkeys(p.commands[CMD_POLL].request for p in protocols if CMD_POLL in p.commands))
+    if not polls:
+        return None, False
+    ser.write(b''.join(polls) * (min_frames + 1))
+    data = _capture(ser, dwell_s, min_frames + 1)
+    return _match(data, protocols, min_frames - 1), bool(data)
+
+
+def detect_port(port: str, baudrates: tuple[int, ...] = COMMON_BAUDRATES, protocols: list[str] | None = None,
+                cache: AutodetectCache | None = None, dwell_s: float = 0.5, min_frames: int = 2,
+                accept_score: float = 0.8, port_factory=None) -> DetectedConfig | None:
+    """Sniffs port for the indicator's baud rate, framing and protocol.
+
+    The port is opened once and the speed changed in place for each candidate. The
+    first capture also decides how to probe: an indicator that sends nothing at all
+    (not even line noise from a wrong speed) is treated as polled, and every later
+    candidate is probed with each protocol's poll command instead of listened to.
+    A candidate is taken as soon as accept_score of its frames parse; otherwise the
+    best one seen wins. dwell_s must cover min_frames + 1 frames of the slowest
+    indicator (0.5 s suits 10 Hz output). Returns None if nothing parsed at any speed.
+    """
+    started = time.monotonic()
+    candidates = [PROTOCOLS[name] for name in protocols] if protocols else list(PROTOCOLS.values())
+    cached = cache.get(port) if cache is not None else None
+    order = list(baudrates)
+    if cached is not None and cached.baudrate in order:
+        order.remove(cached.baudrate)
+    if cached is not None:
+        order.insert(0, cached.baudrate)
+    polled = cached.polled if cached is not None else False
+
+    factory = port_factory or serial.Serial
+    ser = factory(port, order[0], timeout=min(0.05, dwell_s))
+    best = None
+    try:
+        for i, baudrate in enumerate(order):
+            match, heard = _try_config(ser, baudrate, candidates, polled, dwell_s, min_frames)
+            if match is None and i == 0 and not polled and not heard:
+                # Silence rather than noise: retry this speed as a polled indicator
+                polled = True
+                match, heard = _try_config(ser, baudrate, candidates, polled, dwell_s, min_frames)
+            if match is not None and (best is None or match[0] > best[1][0]):
+                best = (baudrate, match)
+            if best is not None and best[1][0] >= accept_score:
+                break
+    finally:
+        ser.close()
+
+    if best is None:
+        print(f"Autodetect: no known protocol on {port} at {', '.join(map(str, order))} baud")
+        return None
+    baudrate, (score, protocol, bytesize, parity) = best
+    config = DetectedConfig(port, baudrate, protocol.name, bytesize, parity, serial.STOPBITS_ONE, polled,
+                            score, time.monotonic() - started)
+    if cache is not None:
+        cache.put(config)
+    print(f"Autodetect: {port} is {protocol.name} at {baudrate} {bytesize}{parity}1"
+          f"{' (polled)' if polled else ''}, {score:.0%} of frames parsed, {config.elapsed_s:.2f} s")
+    return config
+
+
+def autodetect_reader(port: str, cache: AutodetectCache | None = None, poll_rate_hz: float = 10.0,
+                      detect_options: dict | None = None, **reader_kwargs):
+    """Detects the port's settings (see detect_port) and returns a ScaleReader for them, or None."""
+    from .serial_reader import ScaleReader
+    config = detect_port(port, cache=cache, **(detect_options or {}))
+    if config is None:
+        return None
+    kwargs = {**config.reader_kwargs(), **reader_kwargs}
+    if config.polled:
+        kwargs.setdefault("poll_rate_hz", poll_rate_hz)
+    return ScaleReader(**kwargs)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from .scale_emulator import ScaleEmulator
+
+    cache = AutodetectCache(os.path.join(tempfile.mkdtemp(), "scale_autodetect.json"))
+    emulator = ScaleEmulator()
+    port = emulator.open_pty(frame_rate=10.0, baudrate=38400, enforce_baudrate=True)
+    print("Continuous indicator at 38400 baud, nothing cached:")
+    detect_port(port.port, cache=cache)
+    print("Same port again, from the cache:")
+    detect_port(port.port, cache=cache)
+    port.stop()
+
+    print("Indicator swapped for a polled one at 4800 baud:")
+    polled_port = emulator.open_pty(polled=True, baudrate=4800, response_delay_s=0.02, enforce_baudrate=True,
+                                    link_path=port.port)
+    reader = autodetect_reader(polled_port.port, cache=cache, timeout=0.5)
+    reader.connect()
+    print(f"Reader polling at {reader.poll_rate_hz} Hz reads {reader.read_weight()} kg")
+    reader.disconnect()
+    polled_port.stop()
+
+    # 7E1 framing read as 8N1: the parity bit arrives as bit 7
+    frame = b"S S     123.45 kg\r\n" * 3
+    seven_e_one = bytes(b | (bin(b).count('1') & 1) << 7 for b in frame)
+    bytesize, parity, stripped = infer_framing(seven_e_one)
+    print(f"7E1 capture: inferred {bytesize}{parity}1, best protocol {score_capture(stripped)[0][1].name}")
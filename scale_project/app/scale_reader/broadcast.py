@@ -0,0 +1,269 @@
+import asyncio
+import os
+import socket
+import struct
+import threading
+from collections import deque
+from .ring_buffer import WeightSample
+from .weight_stream import WeightStream, Subscription
+
+# Wire formats, one record per sample:
+#   text:   b"<seq>,<weight kg with 2 decimals or empty>,<status>\n"
+#   binary: little-endian uint64 seq, float64 weight (NaN = no weight), uint8 status (17 bytes)
+# seq is the reader's WeightSample.seq (a ticket's weight_seq), so a gap means samples this client missed.
+FORMAT_TEXT = 'text'
+FORMAT_BINARY = 'binary'
+BINARY_RECORD = struct.Struct('<QdB')
+
+
+def encode_sample(sample: WeightSample, wire_format: str = FORMAT_TEXT) -> bytes:
+    if wire_format == FORMAT_BINARY:
+        return BINARY_RECORD.pack(sample.seq, sample.weight if sample.weight is not None else float('nan'), sample.status)
+    weight = f"{sample.weight:.2f}" if sample.weight is not None else ""
+    return f"{sample.seq},{weight},{sample.status}\n".encode('ascii')
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter, queue_len: int):
+        self.writer = writer
+        self.queue: deque[bytes] = deque(maxlen=queue_len)
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.current_task()
+        self.sent = 0
+        self.dropped = 0 # Samples overwritten before this client could take them
+
+
+class WeightBroadcastServer:
+    """Fans one WeightStream out to many local clients over TCP and/or a Unix socket.
+
+    Runs its own asyncio loop on a daemon thread. Samples are encoded once and then
+    queued per client in a deque of queue_len: a client that reads slower than the
+    scale emits loses the oldest queued samples and always gets the newest (with
+    queue_len=1 it only ever sees the latest value). Each client's socket buffer is
+    capped at write_buffer_bytes, and a client that accepts nothing for
+    stall_timeout_s is disconnected, so a dead scoreboard can't grow memory.
+    Clients only listen; anything they send is ignored.
+    """
+    def __init__(self, stream: WeightStream, host: str = '127.0.0.1', port: int | None = 0,
+                 unix_path: str | None = None, wire_format: str = FORMAT_TEXT, queue_len: int = 16,
+                 write_buffer_bytes: int = 4096, stall_timeout_s: float = 10.0):
+        if wire_format not in (FORMAT_TEXT, FORMAT_BINARY):
+            raise ValueError(f"Unknown wire format '{wire_format}'.")
+        self.stream = stream
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.wire_format = wire_format
+        self.queue_len = queue_len
+        self.write_buffer_bytes = write_buffer_bytes
+        self.stall_timeout_s = stall_timeout_s
+        self.samples_published = 0
+        self.clients_served = 0
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._servers: list[asyncio.AbstractServer] = []
+        self._clients: set[_Client] = set()
+        self._inbox: deque[WeightSample] = deque(maxlen=4096) # Producer thread -> loop thread
+        self._dispatch_scheduled = False
+        self._subscription: Subscription | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def start(self):
+        if self.is_running:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="WeightBroadcastServer", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_servers(), self.loop).result(5.0)
+        self._subscription = self.stream.subscribe(callback=self._on_sample)
+        where = [f"tcp://{self.host}:{self.port}"] if self.port is not None else []
+        where += [f"unix:{self.unix_path}"] if self.unix_path else []
+        print(f"Weight broadcast listening on {', '.join(where)}")
+
+    async def _start_servers(self):
+        if self.port is not None:
+            server = await asyncio.start_server(self._serve_client, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1] # Resolves port 0
+            self._servers.append(server)
+        if self.unix_path:
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path) # Stale socket from a previous run
+            self._servers.append(await asyncio.start_unix_server(self._serve_client, self.unix_path))
+
+    def stop(self, timeout: float = 2.0):
+        if not self.is_running:
+            return
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+        async def _shutdown():
+            for server in self._servers:
+                server.close()
+            clients = list(self._clients)
+            for client in clients:
+                client.writer.close()
+                client.wakeup.set()
+            await asyncio.gather(*(c.task for c in clients), return_exceptions=True)
+            for server in self._servers:
+                await server.wait_closed()
+            self._servers.clear()
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.loop.close()
+        self._thread = None
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+    # --- Producer thread ---
+    def _on_sample(self, sample: WeightSample):
+        self._inbox.append(sample)
+        if not self._dispatch_scheduled: # One loop wakeup per burst, not per sample
+            self._dispatch_scheduled = True
+            try:
+                self.loop.call_soon_threadsafe(self._dispatch)
+            except RuntimeError: # Loop already closed during shutdown
+                pass
+
+    # --- Loop thread ---
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        inbox = self._inbox
+        while inbox:
+            data = encode_sample(inbox.popleft(), self.wire_format)
+            self.samples_published += 1
+            for client in self._clients:
+                if len(client.queue) == client.queue.maxlen:
+                    client.dropped += 1
+                client.queue.append(data)
+                client.wakeup.set()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.transport.set_write_buffer_limits(high=self.write_buffer_bytes)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # Keep the kernel from buffering megabytes for a client that stopped reading
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.write_buffer_bytes)
+            if sock.family in (socket.AF_INET, socket.AF_INET6):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Small records, latency matters
+        client = _Client(writer, self.queue_len)
+        self._clients.add(client)
+        self.clients_served += 1
+        peer = writer.get_extra_info('peername') or 'unix client'
+        drain_input = asyncio.ensure_future(self._discard_input(reader, client))
+        try:
+            while not writer.is_closing():
+                await client.wakeup.wait()
+                client.wakeup.clear()
+                while client.queue:
+                    chunk = b''.join(client.queue)
+                    client.sent += len(client.queue)
+                    client.queue.clear()
+                    writer.write(chunk)
+                    # Blocks only while the socket buffer is over write_buffer_bytes; meanwhile
+                    # new samples keep replacing the oldest ones in client.queue
+                    await asyncio.wait_for(writer.drain(), self.stall_timeout_s)
+        except asyncio.TimeoutError:
+            print(f"Weight broadcast: dropping stalled client {peer}")
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._clients.discard(client)
+            drain_input.cancel()
+            writer.close()
+
+    async def _discard_input(self, reader: asyncio.StreamReader, client: _Client):
+        while await reader.read(1024): # EOF: the client hung up
+            pass
+        client.writer.close()
+        client.wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "clients": self.client_count,
+            "clients_served": self.clients_served,
+            "samples_published": self.samples_published,
+            "dropped_per_client": [c.dropped for c in list(self._clients)],
+        }
+
+
+def iter_broadcast(host: str = '127.0.0.1', port: int | None = None, unix_path: str | None = None,
+                   wire_format: str = FORMAT_TEXT, timeout: float | None = 5.0):
+    """Blocking client for scripts and displays: yields (seq, weight, status) tuples.
+
+    seq is the reader's sample sequence number; a jump means samples were dropped for this client.
+    """
+    if unix_path:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(unix_path)
+    else:
+        sock = socket.create_connection((host, port))
+    sock.settimeout(timeout)
+    buffer = bytearray()
+    try:
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                return
+            buffer += data
+            if wire_format == FORMAT_BINARY:
+                usable = len(buffer) - len(buffer) % BINARY_RECORD.size
+                for seq, weight, status in BINARY_RECORD.iter_unpack(bytes(buffer[:usable])):
+                    yield seq, None if weight != weight else weight, status
+                del buffer[:usable]
+            else:
+                *lines, rest = buffer.split(b'\n')
+                for line in lines:
+                    seq, weight, status = line.decode('ascii').split(',')
+                    yield int(seq), float(weight) if weight else None, int(status)
+                buffer = bytearray(rest)
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+    from .serial_reader import ScaleReader
+
+    reader = ScaleReader(use_emulator=True, background=True, emulator_interval=0.002)
+    unix_path = os.path.join(tempfile.mkdtemp(), "weight.sock")
+    server = WeightBroadcastServer(reader.stream, port=0, unix_path=unix_path)
+    server.start()
+    reader.connect()
+
+    received = {}
+    def listen(name, **kwargs):
+        count = 0
+        for seq, weight, status in iter_broadcast(**kwargs):
+            count += 1
+            received[name] = (count, seq, weight)
+            if kwargs.get('slow'):
+                time.sleep(0.05)
+
+    threads = [threading.Thread(target=listen, args=(f"tcp{i}",), kwargs={"port": server.port}, daemon=True) for i in range(30)]
+    threads += [threading.Thread(target=listen, args=(f"unix{i}",), kwargs={"unix_path": unix_path}, daemon=True) for i in range(10)]
+    slow = socket.socket() # Never reads: must not hold anything up
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+    slow.connect(('127.0.0.1', server.port))
+    for t in threads:
+        t.start()
+    time.sleep(3.0)
+    stats = server.stats()
+    print(f"{stats['clients']} clients, {stats['samples_published']} samples published, "
+          f"dropped for the non-reading client: {max(stats['dropped_per_client'])}")
+    counts = [c for c, _, _ in received.values()]
+    print(f"Reading clients got {min(counts)}-{max(counts)} samples each; "
+          f"last weight seen {next(iter(received.values()))[2]} kg vs reader {reader.read_weight()} kg")
+    slow.close()
+    reader.disconnect()
+    server.stop()
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable
+from .protocols import ScaleProtocol, ScaleCommand, ScaleReading, CMD_POLL
+
+
+class ScaleCommandError(Exception):
+    """The indicator answered a command with an error or refused to execute it."""
+
+
+class CommandTimeout(ScaleCommandError, TimeoutError):
+    """No response matched the command within its timeout."""
+
+
+class CommandResponse:
+    __slots__ = ('name', 'frame', 'reading', 'round_trip_s')
+
+    def __init__(self, name: str, frame: bytes, reading: ScaleReading | None, round_trip_s: float):
+        self.name = name
+        self.frame = frame
+        self.reading = reading # Parsed weight if the response was a weight frame
+        self.round_trip_s = round_trip_s
+
+
+class _Request:
+    __slots__ = ('name', 'command', 'timeout_s', 'sent_at', 'deadline', 'future')
+
+    def __init__(self, name: str, command: ScaleCommand, timeout_s: float):
+        self.name = name
+        self.command = command
+        self.timeout_s = timeout_s
+        self.sent_at = 0.0
+        self.deadline = 0.0
+        self.future: Future = Future()
+
+
+class CommandChannel:
+    """Request/response bookkeeping for indicators that answer commands.
+
+    Up to pipeline_depth requests are on the wire at once; more wait in a queue and
+    are written as responses free slots, so a poller isn't held to one round trip
+    per reading. Indicators answer in order, so every incoming frame is matched
+    against the oldest outstanding request: a frame that fits its expected response
+    completes it, while a request whose deadline passed is failed with CommandTimeout
+    and the frame tried on the next one. Frames that match nothing (continuous
+    output, noise) are left to the caller as ordinary weight frames.
+
+    write is called with the command bytes, on whichever thread submits or
+    services the channel; the reader's acquisition thread calls on_frame().
+    """
+    def __init__(self, protocol: ScaleProtocol, write: Callable[[bytes], object],
+                 pipeline_depth: int = 4, timeout_s: float = 0.5):
+        if pipeline_depth < 1:
+            raise ValueError("Pipeline depth must be at least 1.")
+        self.protocol = protocol
+        self.write = write
+        self.pipeline_depth = pipeline_depth
+        self.timeout_s = timeout_s
+        self.sent = 0
+        self.responses = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._in_flight: deque[_Request] = deque()
+        self._waiting: deque[_Request] = deque()
+        self._lock = threading.Lock()
+
+    def supports(self, name: str) -> bool:
+        return name in self.protocol.commands
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def backlog(self) -> int:
+        """Requests sent or queued and not yet answered."""
+        return len(self._in_flight) + len(self._waiting)
+
+    def submit(self, name: str, timeout_s: float | None = None) -> Future:
+        """Queues command name; the future resolves to a CommandResponse.
+
+        The timeout runs from when the command is written, not from when it is queued.
+        """
+        command = self.protocol.commands.get(name)
+        if command is None:
+            raise ValueError(f"Protocol '{self.protocol.name}' has no '{name}' command. "
+                             f"Available: {', '.join(self.protocol.commands) or 'none (output-only)'}.")
+        request = _Request(name, command, self.timeout_s if timeout_s is None else timeout_s)
+        with self._lock:
+            self._waiting.append(request)
+            self._send_waiting(time.monotonic())
+        return request.future
+
+    def service(self, now: float | None = None):
+        """Times out overdue requests and writes queued ones into free pipeline slots."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            self._send_waiting(now)
+
+    def on_frame(self, frame: bytes, reading: ScaleReading | None, now: float | None = None) -> CommandResponse | None:
+        """Matches a received frame to the oldest outstanding request.
+
+        Returns the CommandResponse if the frame answered a request, else None.
+        """
+        if not self._in_flight: # Continuous output with nothing asked: no lock needed
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if not self._in_flight:
+                return None
+            request = self._in_flight[0]
+            command = request.command
+            if self.protocol.error_prefixes and frame.startswith(self.protocol.error_prefixes):
+                error = ScaleCommandError(f"'{request.name}' answered with error {frame!r}")
+            elif command.refused and frame.startswith(command.refused):
+                error = ScaleCommandError(f"'{request.name}' not executed by the indicator ({frame!r})")
+            elif (reading is not None) if command.expect is None else frame.startswith(command.expect):
+                error = None
+            else:
+                return None
+            self._in_flight.popleft()
+            self._send_waiting(now)
+        if error is not None:
+            self.errors += 1
+            request.future.set_exception(error)
+            return CommandResponse(request.name, frame, None, now - request.sent_at)
+        self.responses += 1
+        response = CommandResponse(request.name, frame, reading, now - request.sent_at)
+        request.future.set_result(response)
+        return response
+
+    def fail_all(self, error: Exception):
+        """Fails every outstanding and queued request, e.g. when the port drops."""
+        with self._lock:
+            requests = list(self._in_flight) + list(self._waiting)
+            self._in_flight.clear()
+            self._waiting.clear()
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    def polls_outstanding(self) -> int:
+        return sum(1 for r in self._in_flight if r.name == CMD_POLL) + sum(1 for r in self._waiting if r.name == CMD_POLL)
+
+    # --- Called with self._lock held ---
+    def _expire(self, now: float):
+        while self._in_flight and self._in_flight[0].deadline <= now:
+            request = self._in_flight.popleft()
+            self.timeouts += 1
+            request.future.set_exception(CommandTimeout(
+                f"No response to '{request.name}' within {request.timeout_s * 1000:.0f} ms"))
+
+    def _send_waiting(self, now: float):
+        while self._waiting and len(self._in_flight) < self.pipeline_depth:
+            request = self._waiting.popleft()
+            request.sent_at = now
+            request.deadline = now + request.timeout_s
+            self._in_flight.append(request)
+            try:
+                self.write(request.command.request)
+            except Exception as e:
+                self._in_flight.pop()
+                request.future.set_exception(e)
+                continue
+            self.sent += 1
+
+
+if __name__ == '__main__':
+    from .scale_emulator import ScaleEmulator
+    from .serial_reader import ScaleReader
+    from .ring_buffer import STATUS_NET
+
+    # A polled indicator at 9600 baud that takes 40 ms to turn each command around
+    for depth in (1, 4):
+        emulator = ScaleEmulator(initial_weight=2500.0, fluctuation=0.2)
+        port = emulator.open_pty(polled=True, baudrate=9600, response_delay_s=0.04)
+        reader = ScaleReader(port=port.port, baudrate=9600, timeout=0.5, background=True,
+                             poll_rate_hz=50.0, pipeline_depth=depth)
+        reader.connect()
+        time.sleep(0.5)
+        before = reader.buffer.total_count
+        time.sleep(2.0)
+        rate = (reader.buffer.total_count - before) / 2.0
+        round_trip = reader.metrics.command_round_trip.snapshot()
+        print(f"pipeline_depth={depth}: {rate:.1f} readings/s at a 50 Hz poll rate, "
+              f"round trip p50 <= {round_trip['p50_ms']} ms, {reader.commands.timeouts} timeouts")
+        if depth == 4:
+            reader.tare()
+            print(f"After tare: {reader.read_weight()} kg (net), print_weight() -> {reader.print_weight()} kg")
+            reader.zero()
+            time.sleep(0.1)
+            print(f"After zero: {reader.read_weight()} kg, net flag cleared: {not reader.latest().status & STATUS_NET}")
+            port.responder = lambda command: b'' # Indicator stops answering
+            try:
+                reader.zero(timeout_s=0.2)
+            except TimeoutError as e: # CommandTimeout (this module runs as __main__ here)
+                print(f"Unanswered zero: {e}")
+        reader.disconnect()
+        port.stop()
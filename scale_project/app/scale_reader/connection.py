@@ -0,0 +1,135 @@
+import random
+import threading
+from typing import Callable
+
+STATE_DISCONNECTED = 'disconnected'
+STATE_CONNECTING = 'connecting'
+STATE_CONNECTED = 'connected'
+STATE_BACKOFF = 'backoff' # Waiting before the next connection attempt
+STATE_STOPPED = 'stopped'
+
+
+def backoff_delay(failed_attempts: int, base_delay: float, max_delay: float, jitter: float) -> float:
+    """Capped exponential backoff with +/- jitter so many lanes don't retry in lockstep."""
+    delay = min(max_delay, base_delay * (2 ** max(failed_attempts - 1, 0)))
+    return delay * random.uniform(1.0 - jitter, 1.0 + jitter)
+
+
+class ConnectionSupervisor:
+    """Owns (re)connecting a port on a background thread with capped exponential backoff.
+
+    open_port() must open the port or raise; the owner calls report_failure() when a
+    read fails so the supervisor starts reconnecting. Nothing here blocks the caller:
+    state, last_error and reconnect_count are plain attributes and listeners are
+    called with (state, error) on every state change, from the supervisor thread.
+    """
+    def __init__(self, open_port: Callable[[], None], name: str = "port",
+                 base_delay: float = 0.5, max_delay: float = 30.0, jitter: float = 0.2):
+        self.open_port = open_port
+        self.name = name
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+        self.state = STATE_STOPPED
+        self.last_error: str | None = None
+        self.reconnect_count = 0 # Successful connections after the first one
+        self.failed_attempts = 0 # Consecutive failed attempts (drives the backoff)
+        self._ever_connected = False
+        self._listeners: list[Callable[[str, str | None], None]] = []
+        self._wake = threading.Event()
+        self._connected = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.state == STATE_CONNECTED
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(self, callback: Callable[[str, str | None], None]):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, str | None], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        for callback in list(self._listeners):
+            try:
+                callback(state, self.last_error)
+            except Exception as e:
+                print(f"Error in connection listener: {e}")
+
+    def start(self):
+        """Starts supervising (idempotent). The first attempt happens immediately."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._wake.set() # Attempt right away
+        self._set_state(STATE_DISCONNECTED)
+        self._thread = threading.Thread(target=self._run, name=f"ConnectionSupervisor({self.name})", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 2.0):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self._connected.clear()
+        self._set_state(STATE_STOPPED)
+
+    def report_failure(self, error: Exception | str):
+        """Called by the port owner when the connection broke (port already closed)."""
+        if self.state != STATE_CONNECTED:
+            return
+        self.last_error = str(error)
+        print(f"Lost connection to {self.name}: {error}")
+        self._connected.clear()
+        self._set_state(STATE_DISCONNECTED)
+        self._wake.set()
+
+    def wait_connected(self, timeout: float | None = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def next_delay(self) -> float:
+        return backoff_delay(self.failed_attempts, self.base_delay, self.max_delay, self.jitter)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            if self.state == STATE_CONNECTED:
+                continue
+            self._set_state(STATE_CONNECTING)
+            try:
+                self.open_port()
+            except Exception as e:
+                self.failed_attempts += 1
+                self.last_error = str(e)
+                delay = self.next_delay()
+                if self.failed_attempts == 1:
+                    print(f"Error connecting to {self.name}: {e}. Retrying with backoff.")
+                self._set_state(STATE_BACKOFF)
+                if self._stop_event.wait(delay):
+                    break
+                self._wake.set()
+                continue
+            if self._ever_connected:
+                self.reconnect_count += 1
+            self._ever_connected = True
+            self.failed_attempts = 0
+            self.last_error = None
+            print(f"Connected to {self.name}")
+            self._set_state(STATE_CONNECTED)
+            self._connected.set()
@@ -0,0 +1,79 @@
+# Only line endings are trimmed: fixed-position formats (SMA, Toledo) use leading/trailing spaces
+_LINE_ENDINGS = frozenset(b'\r\n')
+
+
+class FrameSplitter:
+    """Accumulates raw port bytes in one reusable bytearray and cuts them into frames.
+
+    Frames are located and trimmed by index, so the only allocation per frame is the
+    final bytes() copy of the frame itself. latest_frame() skips straight to the
+    freshest complete frame without copying the stale ones.
+    """
+    def __init__(self, terminator: bytes = b'\n', max_buffer: int = 4096):
+        if not terminator:
+            raise ValueError("Frame terminator must not be empty.")
+        self.terminator = terminator
+        self.max_buffer = max_buffer
+        self.frames_skipped = 0 # Complete frames discarded by latest_frame()
+        self._buf = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def feed(self, data: bytes):
+        if data:
+            self._buf += data
+
+    def clear(self):
+        del self._buf[:]
+
+    def _bounds(self, start: int, stop: int) -> tuple[int, int]:
+        buf = self._buf
+        while start < stop and buf[start] in _LINE_ENDINGS:
+            start += 1
+        while stop > start and buf[stop - 1] in _LINE_ENDINGS:
+            stop -= 1
+        return start, stop
+
+    def _discard_garbage(self):
+        # A buffer this large without a terminator is line noise or the wrong framing
+        if len(self._buf) > self.max_buffer:
+            del self._buf[:-self.max_buffer]
+
+    def frames(self) -> list[bytes]:
+        """Pops every complete frame in the buffer, oldest first."""
+        buf, term = self._buf, self.terminator
+        end = buf.rfind(term)
+        if end < 0:
+            self._discard_garbage()
+            return []
+        frames = []
+        start = 0
+        while start <= end:
+            stop = buf.find(term, start, end + len(term))
+            s, e = self._bounds(start, stop)
+            if e > s:
+                frames.append(bytes(buf[s:e]))
+            start = stop + len(term)
+        del buf[:end + len(term)]
+        return frames
+
+    def latest_frame(self) -> bytes | None:
+        """Pops the freshest complete frame and discards everything before it."""
+        buf, term = self._buf, self.terminator
+        last_end = end = buf.rfind(term)
+        if end < 0:
+            self._discard_garbage()
+            return None
+        frame = None
+        while end >= 0:
+            prev = buf.rfind(term, 0, end)
+            s, e = self._bounds(prev + len(term) if prev >= 0 else 0, end)
+            if e > s:
+                frame = bytes(buf[s:e])
+                if prev >= 0:
+                    self.frames_skipped += buf.count(term, 0, prev + len(term))
+                break
+            end = prev
+        del buf[:last_end + len(term)]
+        return frame
@@ -0,0 +1,258 @@
+import bisect
+import os
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency buckets; one more bucket catches everything above
+LATENCY_BUCKETS_S = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, cheap enough to observe on every read.
+
+    Each histogram has a single writer (the acquisition or Tk thread), so observe()
+    takes no lock; readers copy the counts and may be one observation behind.
+    """
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS_S):
+        self.bounds = bounds
+        self.counts = array('Q', [0]) * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (inf for the overflow bucket)."""
+        counts = self.counts.tolist()
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        running = 0
+        for bound, c in zip(self.bounds + (float('inf'),), counts):
+            running += c
+            if running >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else None,
+            "max_ms": self.maximum * 1000,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p99_ms": _ms(self.quantile(0.99)),
+            "buckets": dict(zip([*self.bounds, float('inf')], self.counts.tolist())),
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return seconds * 1000 if seconds is not None else None
+
+
+class ScaleMetrics:
+    """Counters and latency histograms for one scale's I/O path.
+
+    Counters are plain attributes bumped by the thread that owns them, never locked.
+    snapshot() reports totals plus per-second rates over the last rate_window_s; it
+    may be called from several threads (exporter HTTP and file writer), so the rate
+    marks it moves are locked.
+    """
+    def __init__(self, rate_window_s: float = 10.0):
+        self.rate_window_s = rate_window_s
+        self.started_at = time.monotonic()
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.parse_failures = 0
+        self.io_errors = 0
+        self.read_timeouts = 0
+        self.connections = 0 # Successful connects; reconnects = connections - 1
+        self.connected = False
+        self.command_timeouts = 0 # Commands (polls included) the indicator never answered
+        self.read_to_publish = LatencyHistogram() # Frame arrival -> samples published to the stream
+        self.arrival_to_display = LatencyHistogram() # Frame arrival -> shown in the UI
+        self.command_round_trip = LatencyHistogram() # Command written -> its response received
+        self._mark = (self.started_at, 0, 0, 0) # (time, bytes, frames, parse failures) rates are measured from
+        self._previous_mark = self._mark
+        self._rate_lock = threading.Lock()
+
+    @property
+    def reconnects(self) -> int:
+        return max(self.connections - 1, 0)
+
+    def observe_display(self, arrived_at: float):
+        """Called by a display with the timestamp of the sample it just showed."""
+        self.arrival_to_display.observe(time.monotonic() - arrived_at)
+
+    def _rates(self, now: float) -> tuple[float, float, float]:
+        with self._rate_lock:
+            if now - self._mark[0] >= self.rate_window_s:
+                self._previous_mark, self._mark = self._mark, (now, self.bytes_received, self.frames_received, self.parse_failures)
+            base = self._previous_mark if now - self._mark[0] < 1.0 else self._mark # Don't measure over a tiny interval
+        elapsed = max(now - base[0], 1e-9)
+        return ((self.frames_received - base[2]) / elapsed, (self.bytes_received - base[1]) / elapsed,
+                (self.parse_failures - base[3]) / elapsed)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        frames_per_s, bytes_per_s, failures_per_s = self._rates(now)
+        return {
+            "uptime_s": now - self.started_at,
+            "connected": self.connected,
+            "bytes_received": self.bytes_received,
+            "frames_received": self.frames_received,
+            "parse_failures": self.parse_failures,
+            "parse_failure_ratio": self.parse_failures / self.frames_received if self.frames_received else 0.0,
+            "io_errors": self.io_errors,
+            "read_timeouts": self.read_timeouts,
+            "reconnects": self.reconnects,
+            "command_timeouts": self.command_timeouts,
+            "frames_per_s": frames_per_s,
+            "bytes_per_s": bytes_per_s,
+            "parse_failures_per_s": failures_per_s,
+            "read_to_publish": self.read_to_publish.snapshot(),
+            "arrival_to_display": self.arrival_to_display.snapshot(),
+            "command_round_trip": self.command_round_trip.snapshot(),
+        }
+
+
+def _histogram_lines(name: str, labels: str, histogram: LatencyHistogram) -> list[str]:
+    lines, running = [], 0
+    for bound, count in zip([*histogram.bounds, float('inf')], histogram.counts.tolist()):
+        running += count
+        le = "+Inf" if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {running}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.total}')
+    lines.append(f'{name}_count{{{labels}}} {running}')
+    return lines
+
+
+def render_prometheus(sources: dict[str, ScaleMetrics]) -> str:
+    """Prometheus text exposition format for several scales, labelled scale="<name>"."""
+    counters = (("scale_bytes_received_total", "bytes_received"), ("scale_frames_received_total", "frames_received"),
+                ("scale_parse_failures_total", "parse_failures"), ("scale_io_errors_total", "io_errors"),
+                ("scale_read_timeouts_total", "read_timeouts"), ("scale_reconnects_total", "reconnects"),
+                ("scale_command_timeouts_total", "command_timeouts"))
+    lines = []
+    for metric, attribute in counters:
+        lines.append(f"# TYPE {metric} counter")
+        lines += [f'{metric}{{scale="{name}"}} {getattr(m, attribute)}' for name, m in sources.items()]
+    lines.append("# TYPE scale_connected gauge")
+    lines += [f'scale_connected{{scale="{name}"}} {int(m.connected)}' for name, m in sources.items()]
+    for metric, attribute in (("scale_read_to_publish_seconds", "read_to_publish"),
+                              ("scale_arrival_to_display_seconds", "arrival_to_display"),
+                              ("scale_command_round_trip_seconds", "command_round_trip")):
+        lines.append(f"# TYPE {metric} histogram")
+        for name, m in sources.items():
+            lines += _histogram_lines(metric, f'scale="{name}"', getattr(m, attribute))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Publishes ScaleMetrics periodically to a file and/or over HTTP on localhost.
+
+    The file is rewritten atomically every interval_s in Prometheus text format (so a
+    node_exporter textfile collector can pick it up); with http_port, GET /metrics on
+    127.0.0.1 serves the same text. Both run on daemon threads.
+    """
+    def __init__(self, sources: dict[str, ScaleMetrics], path: str | None = None,
+                 http_port: int | None = None, interval_s: float = 10.0):
+        self.sources = sources
+        self.path = path
+        self.http_port = http_port
+        self.interval_s = interval_s
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._server: ThreadingHTTPServer | None = None
+
+    def render(self) -> str:
+        return render_prometheus(self.sources)
+
+    def write_file(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        if self.path and self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+            self._thread.start()
+        if self.http_port is not None and self._server is None:
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = exporter.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass # Scrapes every few seconds would flood the console
+
+            self._server = ThreadingHTTPServer(('127.0.0.1', self.http_port), Handler)
+            self.http_port = self._server.server_address[1] # Resolves port 0
+            threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True).start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _run(self):
+        while True:
+            try:
+                self.write_file()
+            except OSError as e:
+                print(f"Error writing metrics file {self.path}: {e}")
+            if self._stop_event.wait(self.interval_s):
+                break
+
+
+if __name__ == '__main__':
+    import tempfile
+    import urllib.request
+    from .serial_reader import ScaleReader
+
+    reader = ScaleReader(use_emulator=True, background=True, emulator_interval=0.01)
+    path = os.path.join(tempfile.mkdtemp(), "scale_metrics.prom")
+    exporter = MetricsExporter({"lane1": reader.metrics}, path=path, http_port=0, interval_s=0.5)
+    reader.connect()
+    exporter.start()
+    display = reader.stream.subscribe()
+    for _ in range(50): # A 20 ms "UI" refresh reporting what it showed
+        time.sleep(0.02)
+        sample = display.latest()
+        if sample is not None:
+            reader.metrics.observe_display(sample.timestamp)
+    time.sleep(0.6)
+    snapshot = reader.metrics.snapshot()
+    print(f"frames/s {snapshot['frames_per_s']:.0f}, bytes/s {snapshot['bytes_per_s']:.0f}, "
+          f"parse failures {snapshot['parse_failures']}, read->publish p99 <= {snapshot['read_to_publish']['p99_ms']} ms, "
+          f"arrival->display p50 <= {snapshot['arrival_to_display']['p50_ms']} ms")
+    with urllib.request.urlopen(f"http://127.0.0.1:{exporter.http_port}/metrics") as response:
+        text = response.read().decode()
+    print(f"HTTP /metrics served {len(text.splitlines())} lines; file {path} has {len(open(path).read().splitlines())} lines")
+    print("\n".join(line for line in text.splitlines() if line.startswith("scale_frames") or "display_seconds_count" in line))
+    exporter.stop()
+    reader.disconnect()
@@ -0,0 +1,377 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple
+import numpy as np
+from .ring_buffer import SampleRingBuffer, WeightSample, STATUS_IO_ERROR
+from .weight_stream import WeightStream
+from .stability import StabilityDetector
+from .metrics import ScaleMetrics
+from .connection import STATE_CONNECTED, STATE_CONNECTING, STATE_DISCONNECTED, STATE_STOPPED
+
+# Shared block layout (native byte order, all fields naturally aligned):
+#   [0, 128)    16 x uint64 header: magic, capacity, seqlock, sample count, I/O counters, ...
+#   [128, 160)   4 x float64: heartbeat (time.monotonic() of the writer, system-wide on POSIX)
+#   [160, ...)  ring: capacity x float64 timestamps, capacity x float64 weights, capacity x uint8 status
+MAGIC = 0x53434C5348510001 # "SCLSHQ" + layout version
+H_MAGIC, H_CAPACITY, H_SEQ, H_COUNT = 0, 1, 2, 3
+H_FRAMES, H_BYTES, H_PARSE_FAILURES, H_IO_ERRORS, H_TIMEOUTS, H_CONNECTIONS, H_CONNECTED, H_PID = 4, 5, 6, 7, 8, 9, 10, 11
+_COUNTERS = (H_FRAMES, H_BYTES, H_PARSE_FAILURES, H_IO_ERRORS, H_TIMEOUTS, H_CONNECTIONS)
+F_HEARTBEAT = 0
+_HEADER_BYTES = 160
+
+
+class RingView(NamedTuple):
+    count: int    # Ring count when the view was taken
+    start: int    # Position of the first sample in the view (its sequence number is start + 1)
+    segments: tuple[tuple[np.ndarray, np.ndarray, np.ndarray], ...] # (timestamps, weights, status) slices; 2 if it wraps
+
+
+class SharedSampleRing:
+    """Sample ring in multiprocessing.shared_memory, one writer process, any number of readers.
+
+    Writes are bracketed by a seqlock: the writer makes the sequence odd, writes
+    the slot and count, then makes it even again. view_since() hands readers
+    slices of the shared arrays themselves (no pipes, no pickling, no copy); the
+    writer may overwrite the oldest of them, so a reader checks still_valid()
+    after using the data. read_since() and latest() copy and retry for you.
+    A writer that dies mid-append leaves the sequence odd; readers then raise
+    TimeoutError after stuck_after_s instead of waiting on it forever.
+    """
+    stuck_after_s = 0.1
+    def __init__(self, name: str | None = None, capacity: int = 4096, create: bool = False):
+        size = _HEADER_BYTES + capacity * 17
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Spawned children share the creator's resource tracker, so the block is still
+            # unlinked exactly once, by the creator (or the tracker if the creator crashes)
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        self.header = np.ndarray((16,), dtype=np.uint64, buffer=buf, offset=0)
+        self.floats = np.ndarray((4,), dtype=np.float64, buffer=buf, offset=128)
+        if create:
+            self.header[:] = 0
+            self.header[H_CAPACITY] = capacity
+            self.header[H_MAGIC] = MAGIC
+        elif int(self.header[H_MAGIC]) != MAGIC:
+            raise ValueError(f"Shared memory block '{name}' is not a scale sample ring.")
+        self.capacity = capacity = int(self.header[H_CAPACITY])
+        self.timestamps = np.ndarray((capacity,), dtype=np.float64, buffer=buf, offset=_HEADER_BYTES)
+        self.weights = np.ndarray((capacity,), dtype=np.float64, buffer=buf, offset=_HEADER_BYTES + capacity * 8)
+        self.status = np.ndarray((capacity,), dtype=np.uint8, buffer=buf, offset=_HEADER_BYTES + capacity * 16)
+        self._count = int(self.header[H_COUNT]) # Writer-side mirror, saves reading it back
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # --- Writer (acquisition process) ---
+    def append(self, timestamp: float, weight: float | None, status: int, seq: int = 0):
+        # seq is not stored: a sample's position in the ring (count after appending it) is its sequence number,
+        # which, unlike the child reader's own, keeps counting across child restarts
+        header = self.header
+        idx = self._count % self.capacity
+        header[H_SEQ] += 1 # Odd: write in progress
+        self.timestamps[idx] = timestamp
+        self.weights[idx] = weight if weight is not None else np.nan
+        self.status[idx] = status
+        self._count += 1
+        header[H_COUNT] = self._count
+        header[H_SEQ] += 1 # Even: consistent again
+
+    def heartbeat(self):
+        self.floats[F_HEARTBEAT] = time.monotonic()
+
+    # --- Readers ---
+    @property
+    def count(self) -> int:
+        return int(self.header[H_COUNT])
+
+    @property
+    def heartbeat_age(self) -> float:
+        beat = float(self.floats[F_HEARTBEAT])
+        return time.monotonic() - beat if beat else float('inf')
+
+    def _stable_count(self) -> int:
+        header = self.header
+        deadline = None
+        while True:
+            seq = int(header[H_SEQ])
+            if seq & 1:
+                # Writer mid-append; let it finish, unless it died there
+                if deadline is None:
+                    deadline = time.monotonic() + self.stuck_after_s
+                elif time.monotonic() >= deadline:
+                    raise TimeoutError("Shared ring writer stuck mid-append.")
+                time.sleep(0)
+                continue
+            count = int(header[H_COUNT])
+            if int(header[H_SEQ]) == seq:
+                return count
+
+    def view_since(self, seen: int, max_samples: int | None = None) -> RingView:
+        """Zero-copy views of the samples appended after the first `seen`.
+
+        If the writer lapped the reader, only the newest `capacity - 1` samples are included
+        (the slot the next append writes is never handed out).
+        Check still_valid() after reading the views: if it is False the writer may have
+        overwritten some of them meanwhile, and they must be read again.
+        """
+        count = self._stable_count()
+        start = max(seen, count - self.capacity + 1, count - max_samples if max_samples else 0)
+        if start >= count:
+            return RingView(count, count, ())
+        lo, hi = start % self.capacity, count % self.capacity or self.capacity
+        if lo < hi: # Contiguous
+            return RingView(count, start, ((self.timestamps[lo:hi], self.weights[lo:hi], self.status[lo:hi]),))
+        return RingView(count, start, ((self.timestamps[lo:], self.weights[lo:], self.status[lo:]),
+                                       (self.timestamps[:hi], self.weights[:hi], self.status[:hi])))
+
+    def reset_seqlock(self):
+        """Makes the sequence even again after the writer died mid-append. Only call with no writer running."""
+        seq = int(self.header[H_SEQ])
+        if seq & 1:
+            self.header[H_SEQ] = seq + 1
+
+    def still_valid(self, view: RingView) -> bool:
+        # Slot `start` is rewritten by the append that takes the count past start + capacity;
+        # one slot of margin covers an append that began but hasn't bumped the count yet
+        return int(self.header[H_COUNT]) < view.start + self.capacity
+
+    def read_since(self, seen: int, max_samples: int | None = None) -> tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """Copy of the samples appended after the first `seen`: (new count, timestamps, weights, status)."""
+        while True:
+            view = self.view_since(seen, max_samples)
+            if not view.segments:
+                empty = np.empty(0)
+                return view.count, empty, empty, np.empty(0, dtype=np.uint8)
+            result = (view.count, *(np.concatenate(arrays) for arrays in zip(*view.segments)))
+            if self.still_valid(view):
+                return result
+
+    def latest(self) -> WeightSample | None:
+        while True:
+            view = self.view_since(0, max_samples=1)
+            if not view.segments:
+                return None
+            timestamps, weights, status = view.segments[0]
+            sample = WeightSample(float(timestamps[0]), float(weights[0]), int(status[0]), view.count)
+            if self.still_valid(view):
+                weight = sample.weight
+                return sample if weight == weight else sample._replace(weight=None)
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.header = self.floats = self.timestamps = self.weights = self.status = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _acquisition_main(shm_name: str, reader_kwargs: dict, stop_event, heartbeat_s: float):
+    """Entry point of the acquisition process: a ScaleReader writing into the shared ring."""
+    from .serial_reader import ScaleReader
+    ring = SharedSampleRing(shm_name)
+    reader = ScaleReader(background=True, **reader_kwargs)
+    reader.stream.subscribe(callback=lambda sample: ring.append(*sample))
+    ring.header[H_PID] = multiprocessing.current_process().pid
+    reader.connect(wait_s=0)
+    try:
+        while not stop_event.wait(heartbeat_s):
+            m = reader.metrics
+            header = ring.header
+            header[H_FRAMES], header[H_BYTES] = m.frames_received, m.bytes_received
+            header[H_PARSE_FAILURES], header[H_IO_ERRORS], header[H_TIMEOUTS] = m.parse_failures, m.io_errors, m.read_timeouts
+            header[H_CONNECTIONS], header[H_CONNECTED] = m.connections, reader.is_connected
+            ring.heartbeat()
+    finally:
+        reader.disconnect()
+        ring.close()
+
+
+class ProcessScaleReader:
+    """ScaleReader that does its serial I/O in a separate process.
+
+    The child runs an ordinary ScaleReader (same keyword arguments) and writes every
+    sample into a SharedSampleRing. In this process a light thread reads new samples
+    through zero-copy views of the shared arrays and turns them into the usual
+    buffer/stream/stability objects, so UI code written against ScaleReader works
+    unchanged, and a stalled Tk loop never stalls acquisition. Code that wants the
+    raw arrays without any copy can use self.ring.view_since() directly. If the
+    child dies it is restarted. The child always acquires in the background, so a
+    `background` keyword is ignored.
+    """
+    def __init__(self, capacity: int = 4096, buffer_size: int = 4096, poll_interval_s: float = 0.01,
+                 heartbeat_s: float = 0.05, stale_after_s: float = 1.0, **reader_kwargs):
+        reader_kwargs.pop('background', None) # The child passes background=True itself
+        self.reader_kwargs = reader_kwargs
+        self.capacity = capacity
+        self.poll_interval_s = poll_interval_s
+        self.heartbeat_s = heartbeat_s
+        self.stale_after_s = stale_after_s
+        self.timeout = reader_kwargs.get('timeout', 1)
+        self.buffer = SampleRingBuffer(buffer_size)
+        self.stream = WeightStream()
+        self.stability = StabilityDetector()
+        self.stability.attach(self.stream)
+        self.metrics = ScaleMetrics() # I/O counters mirrored from the child; display latency measured here
+        self.restarts = 0
+        self.ring: SharedSampleRing | None = None
+        self._ctx = multiprocessing.get_context('spawn') # Never fork a process that has Tk running
+        self._process = None
+        self._stop_child = None
+        self._poll_thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._seen = 0
+        self._counter_base = dict.fromkeys(_COUNTERS, 0) # Totals from acquisition processes that have exited
+
+    # --- Same surface as ScaleReader ---
+    def connect(self, wait_s: float | None = None) -> bool:
+        if self._poll_thread is None:
+            self.ring = SharedSampleRing(capacity=self.capacity, create=True)
+            self._start_child()
+            self._stop_event.clear()
+            self._poll_thread = threading.Thread(target=self._poll_loop, name="ProcessScaleReaderPoll", daemon=True)
+            self._poll_thread.start()
+        deadline = time.monotonic() + (self.timeout if wait_s is None else wait_s) + 5.0 # + interpreter start-up
+        while time.monotonic() < deadline and not self.is_connected:
+            time.sleep(0.02)
+        return self.is_connected
+
+    def disconnect(self):
+        if self._poll_thread is None:
+            return
+        self._stop_event.set()
+        self._poll_thread.join(timeout=2.0)
+        self._poll_thread = None
+        self._stop_process()
+        self.ring.close()
+        self.ring.unlink()
+        self.ring = None
+        self.metrics.connected = False
+        print("Acquisition process stopped.")
+
+    @property
+    def is_connected(self) -> bool:
+        ring = self.ring
+        return (ring is not None and bool(ring.header[H_CONNECTED])
+                and ring.heartbeat_age < self.stale_after_s)
+
+    @property
+    def connection_state(self) -> str:
+        if self.ring is None:
+            return STATE_STOPPED
+        if self.is_connected:
+            return STATE_CONNECTED
+        return STATE_CONNECTING if self._process is not None and self._process.is_alive() else STATE_DISCONNECTED
+
+    @property
+    def last_error(self) -> str | None:
+        if self.ring is not None and self.ring.heartbeat_age >= self.stale_after_s:
+            return "acquisition process not responding"
+        return None
+
+    def latest(self) -> WeightSample | None:
+        return self.buffer.latest()
+
+    def read_weight(self) -> float | None:
+        sample = self.buffer.latest()
+        return sample.weight if sample is not None and sample.ok else None
+
+    # --- Child process ---
+    def _start_child(self):
+        self._stop_child = self._ctx.Event()
+        self._process = self._ctx.Process(target=_acquisition_main, name="ScaleAcquisition", daemon=True,
+                                          args=(self.ring.name, self.reader_kwargs, self._stop_child, self.heartbeat_s))
+        self._process.start()
+
+    def _stop_process(self):
+        if self._process is None:
+            return
+        self._stop_child.set()
+        self._process.join(timeout=self.timeout + 2)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._process = None
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval_s):
+            ring = self.ring
+            alive = self._process.is_alive()
+            if not alive:
+                ring.reset_seqlock() # It may have died mid-append; what it finished writing is still read below
+            try:
+                samples = self._read_new(ring)
+            except TimeoutError:
+                continue # Writer stuck mid-append: it is dying, and the next pass finds it dead
+            for sample in samples:
+                self.buffer.append(*sample)
+            self.stream.publish_batch(samples) # The whole shared-ring window goes through subscriber filters at once
+            self._mirror_metrics(ring)
+            if not alive:
+                print(f"Acquisition process exited (code {self._process.exitcode}); restarting it.")
+                self.stream.publish(WeightSample(time.monotonic(), None, STATUS_IO_ERROR))
+                self.restarts += 1
+                for field in _COUNTERS: # A new child counts from zero; keep the exported totals monotonic
+                    self._counter_base[field] += int(ring.header[field])
+                    ring.header[field] = 0
+                ring.header[H_CONNECTED] = 0
+                self._start_child()
+
+    def _read_new(self, ring: SharedSampleRing) -> list[WeightSample]:
+        while True:
+            # Straight off the shared-memory views; tolist() is the only copy, into the objects the stream carries
+            view = ring.view_since(self._seen)
+            samples = []
+            seq = view.start
+            for timestamps, weights, status in view.segments:
+                for t, w, s in zip(timestamps.tolist(), weights.tolist(), status.tolist()):
+                    seq += 1
+                    samples.append(WeightSample(t, None if w != w else w, s, seq))
+            if ring.still_valid(view):
+                self._seen = view.count
+                return samples
+
+    def _mirror_metrics(self, ring: SharedSampleRing):
+        total = {field: self._counter_base[field] + int(ring.header[field]) for field in _COUNTERS}
+        m = self.metrics
+        m.frames_received, m.bytes_received = total[H_FRAMES], total[H_BYTES]
+        m.parse_failures, m.io_errors, m.read_timeouts = total[H_PARSE_FAILURES], total[H_IO_ERRORS], total[H_TIMEOUTS]
+        m.connections = total[H_CONNECTIONS]
+        m.connected = self.is_connected
+
+
+if __name__ == '__main__':
+    print("Starting emulated acquisition in a separate process...")
+    reader = ProcessScaleReader(use_emulator=True, emulator_interval=0.005)
+    print(f"Connected: {reader.connect()}")
+    subscription = reader.stream.subscribe()
+    time.sleep(0.5)
+    print("Blocking this (UI) process for 1 s, like a modal dialog would...")
+    before = reader.ring.count
+    stall_until = time.monotonic() + 1.0
+    while time.monotonic() < stall_until: # Busy loop holding the GIL, as a stuck Tk callback would
+        pass
+    print(f"  child kept acquiring: {reader.ring.count - before} samples arrived during the stall")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        reader.ring.latest()
+    print(f"latest() straight from shared memory: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us")
+    view = reader.ring.view_since(0)
+    window_mean = np.mean(np.concatenate([weights for _, weights, _ in view.segments]))
+    print(f"Zero-copy view of {view.count - view.start} samples (mean {window_mean:.2f} kg), "
+          f"still valid after use: {reader.ring.still_valid(view)}, "
+          f"shares memory: {np.shares_memory(view.segments[0][1], reader.ring.weights)}")
+
+    print(f"Killing the acquisition process (pid {int(reader.ring.header[H_PID])})...")
+    reader._process.kill()
+    time.sleep(3.0)
+    print(f"  restarts={reader.restarts}, connected={reader.is_connected}, latest={subscription.latest()}")
+    m = reader.metrics.snapshot()
+    print(f"frames={m['frames_received']} parse_failures={m['parse_failures']} buffered={len(reader.buffer)}")
+    reader.disconnect()
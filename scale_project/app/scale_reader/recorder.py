@@ -0,0 +1,254 @@
+import datetime
+import glob
+import mmap
+import os
+import re
+import struct
+import time
+
+# File layout (little endian):
+#   header  32 bytes: magic, record size, version, monotonic ns + wall clock at file open,
+#                     frame terminator (so replay can re-frame the stream)
+#   records 64 bytes each: int64 monotonic ns, uint16 frame length, 54 frame bytes (zero padded)
+MAGIC = b'SCLREC01'
+VERSION = 1
+_HEADER = struct.Struct('<8sHHqd4s')
+_RECORD_HEAD = struct.Struct('<qH')
+HEADER_SIZE = _HEADER.size
+RECORD_SIZE = 64
+MAX_FRAME = RECORD_SIZE - _RECORD_HEAD.size
+TRUNCATED = 0x8000 # Set in the length field when a frame was longer than MAX_FRAME
+FILE_SUFFIX = '.srec'
+
+
+class FrameRecorder:
+    """Appends every raw frame with its monotonic arrival time to a daily-rotated file.
+
+    One fixed-width record per frame, written through a preallocated record buffer
+    and a large file buffer, so the per-frame cost on the read path is a pack_into and
+    a buffered write. Files are named <prefix>-YYYYMMDD.srec in directory.
+    """
+    def __init__(self, directory: str, prefix: str = "scale", terminator: bytes = b'\n', buffer_size: int = 1 << 16):
+        if len(terminator) > 4:
+            raise ValueError("Frame terminator must be at most 4 bytes.")
+        self.directory = directory
+        self.prefix = re.sub(r'[^A-Za-z0-9_.-]+', '_', prefix)
+        self.terminator = terminator
+        self.buffer_size = buffer_size
+        self.frames_recorded = 0
+        self.path: str | None = None
+        self._file = None
+        self._rotate_at = 0.0
+        self._record = bytearray(RECORD_SIZE)
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_for_today(self):
+        self.close()
+        today = datetime.date.today()
+        self.path = os.path.join(self.directory, f"{self.prefix}-{today:%Y%m%d}{FILE_SUFFIX}")
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'ab', buffering=self.buffer_size)
+        if new_file:
+            self._file.write(_HEADER.pack(MAGIC, RECORD_SIZE, VERSION, time.monotonic_ns(), time.time(), self.terminator))
+        midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
+        self._rotate_at = midnight.timestamp()
+
+    def record(self, frame: bytes, timestamp: float | None = None):
+        """timestamp is time.monotonic() seconds (defaults to now)."""
+        if self._file is None or time.time() >= self._rotate_at:
+            self._open_for_today()
+        ts_ns = time.monotonic_ns() if timestamp is None else int(timestamp * 1e9)
+        length = len(frame)
+        record = self._record
+        if length > MAX_FRAME:
+            _RECORD_HEAD.pack_into(record, 0, ts_ns, MAX_FRAME | TRUNCATED)
+            record[_RECORD_HEAD.size:] = frame[:MAX_FRAME]
+        else:
+            _RECORD_HEAD.pack_into(record, 0, ts_ns, length)
+            record[_RECORD_HEAD.size:_RECORD_HEAD.size + length] = frame
+            record[_RECORD_HEAD.size + length:] = bytes(MAX_FRAME - length)
+        self._file.write(record)
+        self.frames_recorded += 1
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RecordingFile:
+    """Memory-mapped, random-access view of one recording; nothing is loaded up front."""
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = open(path, 'rb')
+        size = os.fstat(self._fd.fileno()).st_size
+        if size < HEADER_SIZE:
+            self._fd.close()
+            raise ValueError(f"{path} is too small to be a scale recording.")
+        self._map = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, version, self.opened_monotonic_ns, self.opened_wall, terminator = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not a scale recording (bad header).")
+        self.terminator = terminator.rstrip(b'\x00') or b'\n'
+        self.count = (size - HEADER_SIZE) // RECORD_SIZE # A torn last record is ignored
+        self._view = memoryview(self._map)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def timestamp_ns(self, index: int) -> int:
+        return _RECORD_HEAD.unpack_from(self._map, HEADER_SIZE + index * RECORD_SIZE)[0]
+
+    def frame(self, index: int) -> memoryview:
+        offset = HEADER_SIZE + index * RECORD_SIZE
+        length = _RECORD_HEAD.unpack_from(self._map, offset)[1] & ~TRUNCATED
+        start = offset + _RECORD_HEAD.size
+        return self._view[start:start + length]
+
+    def wall_time(self, index: int) -> float:
+        """Wall-clock time of a record, from the monotonic/wall pair stored at file open."""
+        return self.opened_wall + (self.timestamp_ns(index) - self.opened_monotonic_ns) / 1e9
+
+    def close(self):
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        self._map.close()
+        self._fd.close()
+
+
+def recording_paths(path: str) -> list[str]:
+    """A recording file, or every recording in a directory in date order."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, f"*{FILE_SUFFIX}")))
+    return [path]
+
+
+class ReplayPort:
+    """Serial-port stand-in that replays recordings at real (speed=1) or accelerated speed.
+
+    Implements the subset of serial.Serial that ScaleReader uses (in_waiting, read,
+    is_open, close), so a reader can be pointed at recordings with
+    ScaleReader(port=path, port_factory=replay_port_factory(speed=10)).
+    speed=None replays as fast as the reader drains it.
+    """
+    def __init__(self, path: str, baudrate: int = 9600, timeout: float | None = 1.0, speed: float | None = 1.0):
+        self.files = [RecordingFile(p) for p in recording_paths(path)]
+        if not self.files:
+            raise ValueError(f"No scale recordings found at {path}.")
+        self.timeout = timeout
+        self.speed = speed
+        self.is_open = True
+        self._file_idx = 0
+        self._record_idx = 0
+        self._origin_ns = None # Recorded time that maps to _started
+        self._started = time.monotonic()
+
+    def _next_due(self) -> float | None:
+        """Seconds until the next record is due (<= 0: due now), None when exhausted."""
+        while self._file_idx < len(self.files) and self._record_idx >= len(self.files[self._file_idx]):
+            self._file_idx += 1
+            self._record_idx = 0
+        if self._file_idx >= len(self.files):
+            return None
+        if not self.speed:
+            return 0.0
+        ts = self.files[self._file_idx].timestamp_ns(self._record_idx)
+        if self._origin_ns is None:
+            self._origin_ns = ts
+        elif ts < self._origin_ns: # Monotonic clock restarted (reboot between files)
+            self._origin_ns = ts - int((time.monotonic() - self._started) * self.speed * 1e9)
+        return (ts - self._origin_ns) / 1e9 / self.speed - (time.monotonic() - self._started)
+
+    @property
+    def in_waiting(self) -> int:
+        if not self.is_open:
+            raise OSError("Replay port is closed.")
+        due = self._next_due()
+        if due is None or due > 0:
+            return 0
+        current = self.files[self._file_idx]
+        return len(current.frame(self._record_idx)) + len(current.terminator)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise OSError("Replay port is closed.")
+        deadline = time.monotonic() + (self.timeout or 0)
+        out = bytearray()
+        while len(out) < size:
+            due = self._next_due()
+            if due is None:
+                break
+            if due > 0:
+                if out or time.monotonic() + due > deadline:
+                    if not out and self.timeout: # Nothing due within the timeout: wait it out like a port
+                        time.sleep(max(0.0, deadline - time.monotonic()))
+                    break
+                time.sleep(due)
+                continue
+            current = self.files[self._file_idx]
+            out += current.frame(self._record_idx)
+            out += current.terminator
+            self._record_idx += 1
+        return bytes(out)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next_due() is None
+
+    def close(self):
+        if not self.is_open:
+            return
+        self.is_open = False
+        for f in self.files:
+            f.close()
+
+
+def replay_port_factory(speed: float | None = 1.0):
+    """port_factory for ScaleReader that opens recordings instead of a serial port."""
+    def factory(port, baudrate=9600, timeout=None, **serial_options):
+        # Framing options (bytesize, parity, ...) describe the cable; a recording has none to apply
+        return ReplayPort(port, baudrate=baudrate, timeout=timeout, speed=speed)
+    return factory
+
+
+if __name__ == '__main__':
+    import tempfile
+    from .serial_reader import ScaleReader
+
+    directory = tempfile.mkdtemp(prefix="scale-recordings-")
+    print(f"Recording 100000 frames into {directory}...")
+    recorder = FrameRecorder(directory, prefix="lane1", terminator=b'\r\n')
+    frames = [f"ST,GS,{w:0=+10.2f}kg".encode('ascii') for w in range(0, 100000)]
+    start = time.perf_counter()
+    t = time.monotonic()
+    for i, frame in enumerate(frames):
+        recorder.record(frame, t + i * 0.01) # A 100 Hz scale
+    recorder.close()
+    elapsed = time.perf_counter() - start
+    print(f"  {elapsed / len(frames) * 1e6:.2f} us/frame, {os.path.getsize(recorder.path) / 1e6:.1f} MB on disk")
+
+    recording = RecordingFile(recorder.path)
+    print(f"Memory-mapped {len(recording)} records; #50000 = {bytes(recording.frame(50000))!r} "
+          f"at {datetime.datetime.fromtimestamp(recording.wall_time(50000)):%H:%M:%S.%f}")
+    recording.close()
+
+    # 100000 frames recorded at 100 Hz = 1000 s; replay at x1000 through a real ScaleReader
+    reader = ScaleReader(port=recorder.path, timeout=0.1, background=True, buffer_size=1024,
+                         port_factory=replay_port_factory(speed=1000.0))
+    replayed = []
+    reader.stream.subscribe(callback=lambda sample: sample.ok and replayed.append(sample.weight))
+    start = time.perf_counter()
+    reader.connect()
+    while not reader.ser.exhausted:
+        time.sleep(0.05)
+    time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed through ScaleReader at x1000: {len(replayed)} weights in {elapsed:.2f} s, "
+          f"last {replayed[-1] if replayed else None} kg")
+    reader.disconnect()
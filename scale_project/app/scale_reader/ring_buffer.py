@@ -0,0 +1,80 @@
+import threading
+from array import array
+from typing import NamedTuple
+
+# Sample status is a small bit mask so it fits in one byte of the ring buffer.
+STATUS_OK = 0x00
+STATUS_NO_DATA = 0x01      # Read timed out / nothing received
+STATUS_PARSE_ERROR = 0x02  # Something was received but no weight could be parsed
+STATUS_IO_ERROR = 0x04     # Port not connected or read failed
+STATUS_MOTION = 0x08       # Indicator reports the load is moving
+STATUS_NET = 0x10          # Weight is net (tared) rather than gross
+STATUS_OVERLOAD = 0x20     # Over or under range
+STATUS_STABLE = 0x40       # Indicator reports the load is stable
+STATUS_ERROR_MASK = STATUS_NO_DATA | STATUS_PARSE_ERROR | STATUS_IO_ERROR | STATUS_OVERLOAD
+
+
+class WeightSample(NamedTuple):
+    timestamp: float # time.monotonic() when its bytes were read off the port
+    weight: float | None
+    status: int
+    seq: int = 0     # Per-reader sequence number, assigned when recorded (0 = not recorded)
+
+    @property
+    def ok(self) -> bool:
+        return self.weight is not None and not (self.status & STATUS_ERROR_MASK)
+
+
+class SampleRingBuffer:
+    """Fixed-size, array-backed ring of (timestamp, weight, status, seq) samples.
+
+    The acquisition thread appends, any number of readers can ask for the latest
+    sample or the last N samples. Nothing is allocated per append.
+    """
+    def __init__(self, capacity: int = 256):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive.")
+        self.capacity = capacity
+        self._timestamps = array('d', [0.0]) * capacity
+        self._weights = array('d', [0.0]) * capacity
+        self._status = array('B', [0]) * capacity
+        self._seqs = array('Q', [0]) * capacity
+        self._count = 0 # Total number of samples ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def total_count(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, weight: float | None, status: int = STATUS_OK, seq: int = 0):
+        with self._lock:
+            idx = self._count % self.capacity
+            self._timestamps[idx] = timestamp
+            self._weights[idx] = weight if weight is not None else float('nan')
+            self._status[idx] = status
+            self._seqs[idx] = seq
+            self._count += 1
+
+    def _sample_at(self, idx: int) -> WeightSample:
+        weight = self._weights[idx]
+        return WeightSample(self._timestamps[idx], None if weight != weight else weight, self._status[idx], self._seqs[idx])
+
+    def latest(self) -> WeightSample | None:
+        with self._lock:
+            if self._count == 0:
+                return None
+            return self._sample_at((self._count - 1) % self.capacity)
+
+    def last(self, n: int) -> list[WeightSample]:
+        """Returns up to n most recent samples, oldest first."""
+        with self._lock:
+            n = min(n, self._count, self.capacity)
+            start = self._count - n
+            return [self._sample_at(i % self.capacity) for i in range(start, self._count)]
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
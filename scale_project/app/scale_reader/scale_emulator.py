@@ -1,5 +1,38 @@
+import os
 import time
 import random
+import threading
+from collections import deque
+from typing import NamedTuple
+import numpy as np
+
+
+class SimulatedTrace(NamedTuple):
+    timestamps: np.ndarray # float64 seconds from the start of the trace
+    weights: np.ndarray    # float64 kg, quantised to the scale resolution
+    stable: np.ndarray     # bool, False while a truck is driving on/off or the deck is settling
+
+
+# Bulk wire encoding of "ST,GS,+00123.45kg\r\n": fixed 20-byte frames, weights clamped to +/-999999.99
+FRAME_LENGTH = 20
+_FRAME_TEMPLATE = np.frombuffer(b"ST,GS,+000000.00kg\r\n", dtype=np.uint8)
+_DIGIT_COLUMNS = np.array([7, 8, 9, 10, 11, 12, 14, 15])           # Byte offsets of the 8 digits
+_DIGIT_DIVISORS = 10 ** np.arange(7, -1, -1, dtype=np.int64)       # 10^7 .. 10^0 (weight in hundredths)
+
+
+def encode_trace(weights: np.ndarray, stable: np.ndarray | None = None) -> bytes:
+    """Renders weights into one contiguous buffer of wire-format frames, fully vectorised."""
+    weights = np.asarray(weights, dtype=np.float64)
+    hundredths = np.minimum(np.rint(np.abs(weights) * 100), 99999999).astype(np.int64)
+    frames = np.tile(_FRAME_TEMPLATE, (len(weights), 1))
+    frames[:, _DIGIT_COLUMNS] = (hundredths[:, None] // _DIGIT_DIVISORS) % 10 + ord('0')
+    frames[weights < 0, 6] = ord('-')
+    if stable is not None:
+        unstable = ~np.asarray(stable, dtype=bool)
+        frames[unstable, 0] = ord('U') # "US" instead of "ST"
+        frames[unstable, 1] = ord('S')
+    return frames.tobytes()
+
 
 class ScaleEmulator:
     def __init__(self, initial_weight=100.0, fluctuation=1.0, increment_step=0.5):
@@ -7,8 +40,58 @@ class ScaleEmulator:
         self.fluctuation = fluctuation
         self.increment_step = increment_step # For a slightly more predictable change over time
         self.counter = 0
+        self.zero_offset = 0.0 # Set by the zero command
+        self.tare_weight = 0.0 # Set by the tare command; readings are then net ("NT")
+        self.scenario = None # CompiledScenario replacing the built-in trend when loaded
+        self.time_scale = 1.0
+        self.loop_scenario = False
+        self._scenario_started = 0.0
+        self._rng = random.Random()
+
+    def load_scenario(self, scenario, time_scale: float = 1.0, loop: bool = False, seed: int | None = None):
+        """Replays a Scenario (or a path to a scenario JSON file) instead of the built-in trend.
+
+        Scenario time runs time_scale times faster than wall time, so an hour of lane
+        traffic with time_scale=3600 takes one second.
+        """
+        from .scenario import Scenario, CompiledScenario
+        if isinstance(scenario, str):
+            scenario = Scenario.from_file(scenario)
+        self.scenario = CompiledScenario(scenario)
+        self.time_scale = time_scale
+        self.loop_scenario = loop
+        self._rng = random.Random(seed)
+        self.restart_scenario()
+        return self.scenario
+
+    def restart_scenario(self):
+        self._scenario_started = time.monotonic()
+
+    @property
+    def scenario_time(self) -> float:
+        t = (time.monotonic() - self._scenario_started) * self.time_scale
+        if self.loop_scenario and self.scenario is not None and self.scenario.duration > 0:
+            t %= self.scenario.duration
+        return t
+
+    def _scenario_weight(self) -> tuple[float, str]:
+        t = self.scenario_time
+        return self.scenario.weight_at(t, self._rng), "ST" if self.scenario.is_stable(t) else "US"
+
+    def _format_reading(self, weight: float, status: str = "ST") -> str:
+        weight -= self.zero_offset
+        if self.tare_weight:
+            return f"{status},NT,{weight - self.tare_weight:0=+10.2f}kg\r\n"
+        return f"{status},GS,{weight:0=+10.2f}kg\r\n"
 
     def get_simulated_reading(self) -> str:
+        return self._format_reading(*self._next_weight())
+
+    def _next_weight(self) -> tuple[float, str]:
+        """Gross weight (before zero and tare) and status of the next reading."""
+        if self.scenario is not None:
+            return self._scenario_weight()
+
         # Simulate some minor weight fluctuation
         noise = random.uniform(-self.fluctuation, self.fluctuation)
         
@@ -17,8 +100,8 @@ class ScaleEmulator:
         # We'll make it increment for a while, then maybe decrement, or reset.
         if self.counter < 50: # Simulate loading for 50 readings
             self.current_weight += self.increment_step
-        elif self.counter < 70: # Simulate some stabilization or slight decrease
-             self.current_weight -= self.increment_step / 2
+        elif self.counter < 70: # Simulate the load settling (noise only) so stability detection can trigger
+            pass
         else: # Reset or change trend
             self.current_weight = 100.0 + random.uniform(-10,10) # Reset to a new base
             self.counter = 0
@@ -41,7 +124,337 @@ class ScaleEmulator:
         # +: always show the sign
         # 10: total width of 10 characters (including sign, digits, decimal point)
         # .2f: 2 decimal places
-        return f"ST,GS,{effective_weight:0=+10.2f}kg\r\n"
+        return effective_weight, "ST"
+
+    def respond(self, command: bytes) -> bytes:
+        """Answers one 'standard' protocol command (Q/S poll, Z zero, T tare) like a polled indicator.
+
+        Unknown commands get no answer, so the caller sees a timeout.
+        """
+        command = command.strip().upper()
+        if command not in (b'Z', b'T', b'Q', b'S'):
+            return b''
+        weight, status = self._next_weight() # Zero/tare take the weight this very answer reports
+        if command == b'Z':
+            self.zero_offset = weight
+            self.tare_weight = 0.0
+        elif command == b'T':
+            self.tare_weight = weight - self.zero_offset
+        return self._format_reading(weight, status).encode('ascii')
+
+    def generate_trace(self, n_samples: int, sample_rate: float = 10.0, seed: int | None = None,
+                       tare_range: tuple[float, float] = (8000.0, 15000.0),
+                       payload_range: tuple[float, float] = (10000.0, 30000.0),
+                       gap_s: float = 6.0, ramp_s: float = 8.0, settle_s: float = 3.0, hold_s: float = 10.0,
+                       vibration: float = 150.0, settle_tau_s: float = 0.8, vibration_hz: float = 1.5,
+                       noise: float | None = None, resolution: float = 0.01) -> SimulatedTrace:
+        """Generates a whole lane trace at once as NumPy arrays (reproducible with seed).
+
+        Each truck cycle is: empty deck (gap), drive-on ramp to tare+payload, damped
+        vibration while the deck settles, stable hold, drive-off ramp. Cycle phase
+        lengths vary +/-30% per truck and the zero drifts a little between trucks.
+        noise defaults to the emulator's fluctuation (as a standard deviation).
+        """
+        rng = np.random.default_rng(seed)
+        noise = self.fluctuation if noise is None else noise
+        timestamps = np.arange(n_samples, dtype=np.float64) / sample_rate
+        duration = n_samples / sample_rate
+
+        # Enough trucks to cover the trace even if every cycle comes out at its shortest
+        min_cycle = 0.7 * (gap_s + 2 * ramp_s + settle_s + hold_s)
+        trucks = int(duration / min_cycle) + 2
+        phases = np.array([gap_s, ramp_s, settle_s + hold_s, ramp_s])
+        durations = phases * rng.uniform(0.7, 1.3, size=(trucks, 4))
+        gross = rng.uniform(*tare_range, size=trucks) + rng.uniform(*payload_range, size=trucks)
+
+        # Piecewise-linear envelope: breakpoints at the end of each phase
+        ends = np.cumsum(durations.ravel()).reshape(trucks, 4)
+        starts = np.concatenate(([0.0], ends.ravel()[:-1])).reshape(trucks, 4)
+        bp_t = np.concatenate(([0.0], ends.ravel()))
+        bp_w = np.concatenate(([0.0], np.stack([np.zeros(trucks), gross, gross, np.zeros(trucks)], axis=1).ravel()))
+        weights = np.interp(timestamps, bp_t, bp_w)
+
+        # Damped vibration after each truck comes to rest on the deck
+        truck_idx = np.searchsorted(ends[:, 3], timestamps, side='right').clip(max=trucks - 1)
+        since_rest = timestamps - starts[truck_idx, 2]
+        on_deck = (since_rest >= 0) & (timestamps < ends[truck_idx, 2])
+        phase = rng.uniform(0, 2 * np.pi, size=trucks)[truck_idx]
+        weights += np.where(on_deck, vibration * np.exp(-since_rest / settle_tau_s)
+                            * np.sin(2 * np.pi * vibration_hz * since_rest + phase), 0.0)
+
+        zero_drift = rng.normal(0.0, 5 * resolution, size=trucks)[truck_idx]
+        weights += zero_drift + rng.normal(0.0, noise, size=n_samples)
+        weights = np.maximum(weights, 0.0)
+        weights = np.rint(weights / resolution) * resolution
+
+        in_gap = timestamps < ends[truck_idx, 0]
+        settled = on_deck & (since_rest >= settle_s * durations[truck_idx, 2] / (settle_s + hold_s))
+        stable = in_gap | settled
+        return SimulatedTrace(timestamps, weights, stable)
+
+    def generate_wim_pass(self, axle_loads: list[float], axle_positions_m: list[float], speed_kmh: float = 10.0,
+                          sample_rate: float = 500.0, sensor_length_m: float = 0.75, footprint_m: float = 0.25,
+                          lead_s: float = 0.5, noise: float | None = None, resolution: float = 1.0,
+                          seed: int | None = None) -> SimulatedTrace:
+        """One vehicle rolling over a short weigh-in-motion deck, as NumPy arrays.
+
+        axle_positions_m are distances behind the first axle (first entry 0). The deck
+        is shorter than the axle spacing, so it carries one axle at a time; each tyre
+        footprint ramps the load on and off over footprint_m.
+        """
+        rng = np.random.default_rng(seed)
+        noise = self.fluctuation if noise is None else noise
+        speed = speed_kmh / 3.6
+        duration = lead_s * 2 + (max(axle_positions_m) + sensor_length_m + footprint_m) / speed
+        timestamps = np.arange(int(duration * sample_rate), dtype=np.float64) / sample_rate
+        travelled = (timestamps - lead_s) * speed # Position of the first axle's leading edge on the deck
+        weights = np.zeros(len(timestamps))
+        for load, position in zip(axle_loads, axle_positions_m):
+            x = travelled - position
+            on = np.clip(x / footprint_m, 0.0, 1.0) * np.clip((sensor_length_m + footprint_m - x) / footprint_m, 0.0, 1.0)
+            weights += load * on
+        weights += rng.normal(0.0, noise, size=len(timestamps))
+        weights = np.maximum(np.rint(weights / resolution) * resolution, 0.0)
+        return SimulatedTrace(timestamps, weights, np.zeros(len(timestamps), dtype=bool))
+
+    def generate_wire_trace(self, n_samples: int, **kwargs) -> bytes:
+        """generate_trace() rendered straight into the wire format (see encode_trace)."""
+        trace = self.generate_trace(n_samples, **kwargs)
+        return encode_trace(trace.weights, trace.stable)
+
+    def open_pty(self, polled: bool = False, **kwargs) -> 'VirtualSerialPort':
+        """Streams this emulator's readings into a new pseudo-terminal (see VirtualSerialPort).
+
+        With polled=True the port only answers commands (see respond()).
+        """
+        if polled:
+            kwargs.setdefault('responder', self.respond)
+        port = VirtualSerialPort(lambda: self.get_simulated_reading().encode('ascii'), **kwargs)
+        port.start()
+        return port
+
+
+class VirtualSerialPort:
+    """A Linux pseudo-terminal that behaves like a scale on a serial cable.
+
+    A writer thread pushes frames from frame_source() into the PTY master at frame_rate,
+    never faster than baudrate allows (10 bits per byte, 8N1). Open self.port with
+    ScaleReader(port=...) to drive the real pyserial/framing/reconnect path.
+
+    Fault injection (all rates are probabilities per write):
+      burst_size     frames written back-to-back in one write (average rate unchanged)
+      garbage_rate   random line-noise bytes injected before a write
+      partial_rate   a write split in two with a short gap, so frames arrive in pieces
+      disconnect_every_s / disconnect() close the PTY like an unplugged cable; it comes
+                     back after reconnect_delay_s under the same symlinked self.port path
+    Writes that would block (reader not keeping up) are dropped, like a UART overrun.
+
+    With a responder the port acts as a polled indicator instead: it sends nothing on
+    its own, and each command line it receives is answered with responder(command)
+    after response_delay_s, one response at a time at line speed.
+
+    With enforce_baudrate, a reader that opened the port at a different speed gets
+    line noise instead of frames and its commands are ignored, as on a real cable.
+    """
+    def __init__(self, frame_source, frame_rate: float = 10.0, baudrate: int = 9600, burst_size: int = 1,
+                 garbage_rate: float = 0.0, partial_rate: float = 0.0, disconnect_every_s: float | None = None,
+                 reconnect_delay_s: float = 1.0, link_path: str | None = None, seed: int | None = None,
+                 responder=None, response_delay_s: float = 0.0, enforce_baudrate: bool = False):
+        self.frame_source = frame_source
+        self.responder = responder
+        self.response_delay_s = response_delay_s
+        self.enforce_baudrate = enforce_baudrate
+        self.commands_received = 0
+        self.frame_rate = frame_rate
+        self.baudrate = baudrate
+        self.burst_size = max(1, burst_size)
+        self.garbage_rate = garbage_rate
+        self.partial_rate = partial_rate
+        self.disconnect_every_s = disconnect_every_s
+        self.reconnect_delay_s = reconnect_delay_s
+        self.link_path = link_path or f"/tmp/scale-emulator-{os.getpid()}-{id(self):x}"
+        self.random = random.Random(seed)
+
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self.disconnects = 0
+        self.device_path: str | None = None # Current /dev/pts/N behind self.port
+        self._master: int | None = None
+        self._slave: int | None = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> str:
+        """Stable path (a symlink) to pass to ScaleReader; survives simulated disconnects."""
+        return self.link_path
+
+    @property
+    def is_open(self) -> bool:
+        return self._master is not None
+
+    def _open_pty(self):
+        import pty, tty # POSIX only
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+        self.device_path = os.ttyname(slave)
+        tmp_link = f"{self.link_path}.tmp"
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.symlink(self.device_path, tmp_link)
+        os.replace(tmp_link, self.link_path) # Atomic swap so readers never see a missing link
+        with self._lock:
+            self._master, self._slave = master, slave
+
+    def _close_pty(self):
+        with self._lock:
+            master, slave = self._master, self._slave
+            self._master = self._slave = None
+        for fd in (master, slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._open_pty()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="VirtualSerialPort", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._close_pty()
+        if os.path.lexists(self.link_path):
+            os.unlink(self.link_path)
+
+    def disconnect(self):
+        """Simulates pulling the cable; the writer thread plugs it back in after reconnect_delay_s."""
+        self.disconnects += 1
+        self._close_pty()
+
+    def _reader_speed_ratio(self) -> float:
+        """Reader's configured baud rate / ours (1.0 when not enforced or unknown)."""
+        slave = self._slave
+        if not self.enforce_baudrate or slave is None:
+            return 1.0
+        import termios
+        try:
+            speed = termios.tcgetattr(slave)[5] # Output speed the reader set through pyserial
+        except (termios.error, OSError):
+            return 1.0
+        ours = getattr(termios, f"B{self.baudrate}", None)
+        if speed == ours:
+            return 1.0
+        rates = {getattr(termios, f"B{b}"): b for b in (1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200)}
+        return rates.get(speed, 0.0) / self.baudrate
+
+    def _write(self, data: bytes):
+        master = self._master
+        if master is None:
+            return
+        ratio = self._reader_speed_ratio()
+        if ratio != 1.0: # A UART sampling at the wrong rate sees about ratio times as many (wrong) bytes
+            data = bytes(self.random.randrange(256) for _ in range(max(1, int(len(data) * ratio))))
+        try:
+            written = os.write(master, data)
+        except BlockingIOError:
+            written = 0
+        except OSError:
+            return
+        self.bytes_sent += written
+        self.bytes_dropped += len(data) - written
+
+    def _run(self):
+        if self.responder is not None:
+            self._run_responder()
+            return
+        rng = self.random
+        next_write = time.monotonic()
+        next_disconnect = next_write + self.disconnect_every_s if self.disconnect_every_s else None
+        while not self._stop_event.is_set():
+            if next_disconnect is not None and time.monotonic() >= next_disconnect:
+                self.disconnect()
+                next_disconnect = time.monotonic() + self.reconnect_delay_s + self.disconnect_every_s
+            if not self.is_open:
+                if self._stop_event.wait(self.reconnect_delay_s):
+                    break
+                self._open_pty()
+                next_write = time.monotonic()
+                continue
+
+            chunk = bytearray()
+            for _ in range(self.burst_size):
+                chunk += self.frame_source()
+            if self.garbage_rate and rng.random() < self.garbage_rate:
+                chunk[0:0] = bytes(rng.randrange(256) for _ in range(rng.randint(1, 8)))
+            if self.partial_rate and len(chunk) > 1 and rng.random() < self.partial_rate:
+                split = rng.randint(1, len(chunk) - 1)
+                self._write(bytes(chunk[:split]))
+                time.sleep(min(0.005, 0.5 / self.frame_rate))
+                self._write(bytes(chunk[split:]))
+            else:
+                self._write(bytes(chunk))
+            self.frames_sent += self.burst_size
+
+            # Average frame rate, capped by what the line speed can physically carry
+            next_write += max(self.burst_size / self.frame_rate, len(chunk) * 10 / self.baudrate)
+            delay = next_write - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            elif delay < -1.0:
+                next_write = time.monotonic() # Fell far behind (e.g. suspended); don't burst to catch up
+
+    def _run_responder(self):
+        import select
+        received = bytearray()
+        replies: deque[tuple[float, bytes]] = deque() # (due time, response) in command order
+        line_free_at = 0.0
+        while not self._stop_event.is_set():
+            master = self._master
+            if master is None:
+                if self._stop_event.wait(self.reconnect_delay_s):
+                    break
+                self._open_pty()
+                received.clear()
+                replies.clear()
+                continue
+            now = time.monotonic()
+            while replies and replies[0][0] <= now:
+                self._write(replies.popleft()[1])
+            wait = min(replies[0][0] - now, 0.05) if replies else 0.05
+            try:
+                readable, _, _ = select.select([master], [], [], max(wait, 0.0))
+                chunk = os.read(master, 4096) if readable else b''
+            except (OSError, ValueError): # Closed under us by disconnect()
+                continue
+            received += chunk
+            *lines, rest = received.replace(b'\r\n', b'\r').replace(b'\n', b'\r').split(b'\r')
+            received = bytearray(rest)
+            now = time.monotonic()
+            for line in lines:
+                if not line:
+                    continue
+                if self._reader_speed_ratio() != 1.0:
+                    continue # Garbled on the way in; a real indicator would not recognise it
+                self.commands_received += 1
+                response = self.responder(bytes(line))
+                if response:
+                    # The indicator turns each command around in response_delay_s and answers in order
+                    due = max(now + self.response_delay_s, line_free_at)
+                    line_free_at = due + len(response) * 10 / self.baudrate
+                    replies.append((due, response))
+                    self.frames_sent += 1
+
 
 if __name__ == '__main__':
     emulator = ScaleEmulator(initial_weight=500.0, fluctuation=0.5, increment_step=10.0)
@@ -57,4 +470,33 @@ if __name__ == '__main__':
         reading = emulator2.get_simulated_reading()
         print(f"Reading {i+1}: {reading.strip()}")
         time.sleep(0.2)
+
+    print("\nGenerating bulk traces (vectorised)...")
+    emulator_bulk = ScaleEmulator(fluctuation=0.5)
+    start = time.perf_counter()
+    trace = emulator_bulk.generate_trace(2_000_000, sample_rate=100.0, seed=42)
+    generated = time.perf_counter()
+    wire = encode_trace(trace.weights, trace.stable)
+    encoded = time.perf_counter()
+    print(f"2M samples: generate {generated - start:.2f} s, encode {encoded - generated:.2f} s "
+          f"({len(wire) / 1e6:.0f} MB), {np.count_nonzero(trace.stable) / len(trace.stable):.0%} stable")
+    print(f"First frames: {wire[:2 * FRAME_LENGTH]!r}")
+    start = time.perf_counter()
+    for _ in range(100_000):
+        emulator_bulk.get_simulated_reading()
+    print(f"Per-reading path for comparison: {(time.perf_counter() - start) * 20:.2f} s per 2M samples")
+
+    print("\nTesting end-to-end serial path through a pseudo-terminal (POSIX only)...")
+    from app.scale_reader.serial_reader import ScaleReader
+    emulator3 = ScaleEmulator()
+    virtual_port = emulator3.open_pty(frame_rate=200.0, baudrate=115200, burst_size=4,
+                                      garbage_rate=0.02, partial_rate=0.2, seed=1)
+    reader = ScaleReader(port=virtual_port.port, baudrate=115200, timeout=0.1, background=True)
+    reader.connect()
+    time.sleep(2.0)
+    received = reader.buffer.total_count
+    print(f"Sent {virtual_port.frames_sent} frames ({virtual_port.bytes_sent} bytes, {virtual_port.bytes_dropped} dropped), "
+          f"reader recorded {received} samples, latest {reader.read_weight()} kg")
+    reader.disconnect()
+    virtual_port.stop()
     print("\nEmulator Test Finished.")
@@ -0,0 +1,222 @@
+import bisect
+import json
+import math
+import random
+from typing import NamedTuple
+import numpy as np
+
+
+class TruckVisit(NamedTuple):
+    unit_id: str
+    tare: float
+    gross: float
+    arrive_at: float | None = None # Scenario seconds; None = gap_s after the previous truck left
+    gap_s: float = 5.0             # Empty deck before this truck when arrive_at is not given
+    drive_on_s: float = 8.0
+    load_s: float = 0.0            # > 0: arrives empty (tare) and is loaded on the deck up to gross
+    settle_s: float = 3.0          # Deck vibration decays for this long after each movement
+    dwell_s: float = 15.0          # Stable time available for the capture
+    drive_off_s: float = 8.0
+    vibration: float = 150.0       # Peak amplitude (kg) of the damped oscillation after movements
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: dict | None = None) -> 'TruckVisit':
+        merged = {**(defaults or {}), **data}
+        unknown = set(merged) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"Unknown truck visit fields: {', '.join(sorted(unknown))}")
+        return cls(**merged)
+
+
+class Scenario:
+    """A declarative lane script: trucks arriving, (loading,) settling and leaving.
+
+    JSON layout:
+        {"name": "...", "noise": 0.5, "resolution": 0.02, "repeat": 1,
+         "defaults": {"drive_on_s": 8, ...},
+         "trucks": [{"unit_id": "T-101", "tare": 12000, "gross": 38000, "arrive_at": 0}, ...]}
+    """
+    def __init__(self, trucks: list[TruckVisit], name: str = "scenario", noise: float = 0.5,
+                 resolution: float = 0.02, repeat: int = 1, vibration_hz: float = 1.5, settle_tau_s: float = 0.8):
+        if not trucks:
+            raise ValueError("A scenario needs at least one truck.")
+        self.trucks = trucks
+        self.name = name
+        self.noise = noise
+        self.resolution = resolution
+        self.repeat = max(1, repeat)
+        self.vibration_hz = vibration_hz
+        self.settle_tau_s = settle_tau_s
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Scenario':
+        defaults = data.get("defaults", {})
+        trucks = [TruckVisit.from_dict(t, defaults) for t in data.get("trucks", [])]
+        options = {k: data[k] for k in ("name", "noise", "resolution", "repeat", "vibration_hz", "settle_tau_s") if k in data}
+        return cls(trucks, **options)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Scenario':
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+class CompiledScenario:
+    """A Scenario flattened into breakpoints, vibration events and motion intervals."""
+    def __init__(self, scenario: Scenario):
+        self.scenario = scenario
+        self.bp_t = [0.0]
+        self.bp_w = [0.0]
+        self.vibrations: list[tuple[float, float]] = []     # (start time, amplitude)
+        self.motion: list[tuple[float, float]] = []         # [start, end) unstable intervals
+        self.visits: list[tuple[TruckVisit, float, float]] = [] # (visit, dwell start, dwell end)
+
+        t = 0.0
+        for _ in range(scenario.repeat):
+            for visit in scenario.trucks:
+                if visit.arrive_at is not None and scenario.repeat == 1:
+                    t = max(t, visit.arrive_at)
+                else:
+                    t += visit.gap_s
+                self._point(t, 0.0)
+                first_load = visit.tare if visit.load_s > 0 else visit.gross
+                t = self._move(t, visit.drive_on_s, first_load, visit)
+                if visit.load_s > 0:
+                    t = self._move(t, visit.load_s, visit.gross, visit)
+                self.visits.append((visit, t, t + visit.dwell_s))
+                t += visit.dwell_s
+                self._point(t, visit.gross)
+                t = self._move(t, visit.drive_off_s, 0.0, visit, settle=False)
+                self.motion.append((t - visit.drive_off_s, t))
+        self.duration = t
+        self._motion_starts = [start for start, _ in self.motion]
+
+    def _point(self, t: float, weight: float):
+        if t > self.bp_t[-1]:
+            self.bp_t.append(t)
+            self.bp_w.append(weight)
+
+    def _move(self, t: float, duration: float, target: float, visit: TruckVisit, settle: bool = True) -> float:
+        end = t + duration
+        self._point(end, target)
+        if not settle:
+            return end
+        self.vibrations.append((end, visit.vibration))
+        self.motion.append((t, end + visit.settle_s))
+        self._point(end + visit.settle_s, target)
+        return end + visit.settle_s
+
+    def is_stable(self, t: float) -> bool:
+        i = bisect.bisect_right(self._motion_starts, t) - 1
+        while i >= 0:
+            start, end = self.motion[i]
+            if end > t:
+                return False
+            if end < t - 60: # Intervals are short; no need to look further back
+                break
+            i -= 1
+        return True
+
+    def weight_at(self, t: float, rng: random.Random | None = None) -> float:
+        """Envelope + damped vibration + noise at scenario time t (seconds)."""
+        i = bisect.bisect_right(self.bp_t, t)
+        if i >= len(self.bp_t):
+            weight = self.bp_w[-1]
+        else:
+            t0, t1 = self.bp_t[i - 1], self.bp_t[i]
+            w0, w1 = self.bp_w[i - 1], self.bp_w[i]
+            weight = w0 + (w1 - w0) * (t - t0) / (t1 - t0)
+        sc = self.scenario
+        for start, amplitude in self.vibrations:
+            dt = t - start
+            if 0 <= dt < 6 * sc.settle_tau_s:
+                weight += amplitude * math.exp(-dt / sc.settle_tau_s) * math.sin(2 * math.pi * sc.vibration_hz * dt)
+        weight += (rng or random).gauss(0.0, sc.noise)
+        return max(round(weight / sc.resolution) * sc.resolution, 0.0)
+
+    def render(self, sample_rate: float = 10.0, seed: int | None = None):
+        """Whole scenario as a SimulatedTrace (vectorised), e.g. for encode_trace()."""
+        from .scale_emulator import SimulatedTrace
+        sc = self.scenario
+        rng = np.random.default_rng(seed)
+        timestamps = np.arange(int(self.duration * sample_rate), dtype=np.float64) / sample_rate
+        weights = np.interp(timestamps, self.bp_t, self.bp_w)
+        for start, amplitude in self.vibrations:
+            lo, hi = np.searchsorted(timestamps, [start, start + 6 * sc.settle_tau_s])
+            dt = timestamps[lo:hi] - start
+            weights[lo:hi] += amplitude * np.exp(-dt / sc.settle_tau_s) * np.sin(2 * np.pi * sc.vibration_hz * dt)
+        weights += rng.normal(0.0, sc.noise, size=len(timestamps))
+        weights = np.maximum(np.rint(weights / sc.resolution) * sc.resolution, 0.0)
+        stable = np.ones(len(timestamps), dtype=bool)
+        for start, end in self.motion:
+            lo, hi = np.searchsorted(timestamps, [start, end])
+            stable[lo:hi] = False
+        return SimulatedTrace(timestamps, weights, stable)
+
+
+def measure_lane_throughput(scenario: Scenario, time_scale: float = 60.0, frame_rate: float = 50.0,
+                            tolerance: float = 50.0) -> dict:
+    """Replays a scenario through a PTY into a real ScaleReader and counts captured trucks.
+
+    A truck counts as captured when the reader's stability detector reports a stable
+    load within tolerance of its gross weight. Scenario time runs time_scale times
+    faster than wall time, so the detector window is compressed by the same factor.
+    Returns expected vs captured trucks and the lane rate the software kept up with.
+    """
+    import time
+    from .scale_emulator import ScaleEmulator
+    from .serial_reader import ScaleReader
+    from .stability import EVENT_STABLE
+
+    emulator = ScaleEmulator()
+    compiled = emulator.load_scenario(scenario, time_scale=time_scale)
+    port = emulator.open_pty(frame_rate=frame_rate, baudrate=115200)
+    reader = ScaleReader(port=port.port, baudrate=115200, timeout=0.1, background=True)
+    reader.stability.window_s = max(1.5 / time_scale, 4 / frame_rate)
+    reader.stability.tolerance = max(2.0, 4 * scenario.noise)
+    reader.stability.min_samples = 3
+
+    expected = [visit.gross for visit, _, _ in compiled.visits]
+    captured = [False] * len(expected)
+
+    def on_event(event, stats):
+        if event != EVENT_STABLE or stats.mean is None:
+            return
+        for i, gross in enumerate(expected):
+            if not captured[i] and abs(stats.mean - gross) <= tolerance:
+                captured[i] = True
+                break
+
+    reader.stability.add_listener(on_event)
+    started = time.monotonic()
+    reader.connect()
+    emulator.restart_scenario() # Start the scenario clock once the reader is listening
+    time.sleep(compiled.duration / time_scale + 0.5)
+    wall_s = time.monotonic() - started
+    reader.disconnect()
+    port.stop()
+
+    hours = compiled.duration / 3600
+    return {
+        "scenario": scenario.name,
+        "trucks_expected": len(expected),
+        "trucks_captured": sum(captured),
+        "scenario_hours": hours,
+        "wall_seconds": wall_s,
+        "trucks_per_hour": sum(captured) / hours if hours else 0.0,
+        "frames_sent": port.frames_sent,
+        "samples_recorded": reader.buffer.total_count,
+    }
+
+
+if __name__ == '__main__':
+    import os
+    example = os.path.join(os.path.dirname(__file__), '..', '..', 'scenarios', 'example_lane.json')
+    scenario = Scenario.from_file(example)
+    compiled = CompiledScenario(scenario)
+    print(f"Scenario '{scenario.name}': {len(compiled.visits)} trucks over {compiled.duration / 60:.1f} min")
+    print("Replaying at increasing time compression to find where capture starts to fail...")
+    for time_scale in (30.0, 120.0, 480.0):
+        result = measure_lane_throughput(scenario, time_scale=time_scale, frame_rate=200.0)
+        print(f"  x{time_scale:>5.0f}: captured {result['trucks_captured']}/{result['trucks_expected']} trucks "
+              f"in {result['wall_seconds']:.1f} s wall ({result['samples_recorded']} samples)")
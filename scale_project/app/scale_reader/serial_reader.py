@@ -1,16 +1,61 @@
 import serial
 import time
-import re
+import threading
+from collections import deque
 from .scale_emulator import ScaleEmulator
+from .ring_buffer import (SampleRingBuffer, WeightSample, STATUS_OK, STATUS_NO_DATA, STATUS_PARSE_ERROR,
+                          STATUS_IO_ERROR, STATUS_MOTION, STATUS_NET, STATUS_OVERLOAD, STATUS_STABLE)
+from .protocols import ScaleReading, get_protocol, cached_parser, DEFAULT_PROTOCOL, CMD_POLL, CMD_PRINT, CMD_ZERO, CMD_TARE
+from .commands import CommandChannel, CommandResponse
+from .weight_stream import WeightStream
+from .framing import FrameSplitter
+from .stability import StabilityDetector
+from .connection import ConnectionSupervisor, STATE_CONNECTED
+from .metrics import ScaleMetrics
 
 class ScaleReader:
-    def __init__(self, port=None, baudrate=9600, timeout=1, use_emulator=False):
+    def __init__(self, port=None, baudrate=9600, timeout=1, use_emulator=False,
+                 background=False, buffer_size=256, emulator_interval=0.1, protocol=DEFAULT_PROTOCOL,
+                 recorder=None, port_factory=None, poll_rate_hz=None, pipeline_depth=4, command_timeout_s=0.5,
+                 serial_options=None):
         self.port = port
         self.baudrate = baudrate
+        self.serial_options = serial_options or {} # Extra port settings, e.g. {'bytesize': 7, 'parity': 'E'}
         self.timeout = timeout
         self.use_emulator = use_emulator
         self.ser = None
         self.emulator = None
+        self.protocol = get_protocol(protocol) # Raises ValueError for an unknown protocol name
+        self._parse = cached_parser(self.protocol.parse)
+        # Indicators that answer commands: zero()/tare()/print_weight()/send_command(), and
+        # with poll_rate_hz the poll command is sent that often, up to pipeline_depth unanswered
+        self.commands = (CommandChannel(self.protocol, self._write, pipeline_depth, command_timeout_s)
+                         if self.protocol.commands else None)
+        self.poll_rate_hz = poll_rate_hz
+        if poll_rate_hz and CMD_POLL not in self.protocol.commands:
+            raise ValueError(f"Protocol '{self.protocol.name}' has no poll command; it can't be polled.")
+        self._next_poll = 0.0
+        self._timeouts_seen = 0
+        self._emulator_replies = deque() # Emulator answers to commands, fed in by _fill
+        self._seq = 0 # Sequence number of the last recorded sample
+
+        # Background acquisition: a reader thread drains the port into self.buffer and
+        # read_weight()/latest() answer from memory instead of blocking on the port.
+        self.background = background
+        self.buffer = SampleRingBuffer(buffer_size)
+        self.stream = WeightStream() # Every acquired sample is published here for subscribers
+        self._splitter = FrameSplitter(self.protocol.terminator) # Reusable receive buffer for bulk reads
+        self.stability = StabilityDetector() # Fed from the stream; captures consult it
+        self.stability.attach(self.stream)
+        self.emulator_interval = emulator_interval # Emulator has no I/O to pace it
+        self.recorder = recorder # Optional FrameRecorder: every raw frame is appended to disk
+        self.port_factory = port_factory or serial.Serial # e.g. replay_port_factory() to replay recordings
+        self._acquisition_thread = None
+        self._stop_event = threading.Event()
+        # Connecting and reconnecting happen on the supervisor's thread, never in a caller
+        self.supervisor = ConnectionSupervisor(self._open_serial, name=f"serial port {port}")
+        self.metrics = ScaleMetrics() # Counters/histograms; see metrics.MetricsExporter to publish them
+        self.supervisor.add_listener(self._on_connection_state)
 
         if self.use_emulator:
             self.emulator = ScaleEmulator()
@@ -18,77 +63,362 @@ class ScaleReader:
         elif self.port is None:
             raise ValueError("Serial port must be specified if not using emulator.")
         
-    def connect(self) -> bool:
+    def connect(self, wait_s: float | None = None) -> bool:
+        """Starts connecting and waits up to wait_s (default self.timeout) for the port.
+
+        Returns whether the port is open. If it is not, the supervisor keeps retrying
+        in the background with exponential backoff.
+        """
         if self.use_emulator:
             print("Emulator connected (simulated).")
-            return True
-        
-        if self.ser is not None and self.ser.is_open:
-            print("Already connected.")
-            return True
-            
-        try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
-            print(f"Connected to serial port: {self.port}")
-            return True
-        except serial.SerialException as e:
-            print(f"Error connecting to serial port {self.port}: {e}")
-            self.ser = None
-            return False
+            connected = True
+            self.metrics.connected = True
+        else:
+            self.supervisor.start()
+            connected = self.supervisor.wait_connected(self.timeout if wait_s is None else wait_s)
+        if self.background:
+            self.start()
+        return connected
+
+    def _open_serial(self):
+        # Runs on the supervisor thread; raises on failure
+        timeout = self.timeout
+        if self.poll_rate_hz:
+            timeout = min(timeout, 1.0 / self.poll_rate_hz) # A blocking read must not hold up the next poll
+        self.ser = self.port_factory(self.port, self.baudrate, timeout=timeout, **self.serial_options)
+        self._splitter.clear() # Don't glue a partial frame from the old connection to the new one
+
+    def _on_connection_state(self, state: str, error: str | None):
+        self.metrics.connected = state == STATE_CONNECTED
+        if state == STATE_CONNECTED:
+            self.metrics.connections += 1
+
+    def _close_serial(self):
+        ser, self.ser = self.ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    @property
+    def is_connected(self) -> bool:
+        return self.use_emulator or (self.supervisor.is_connected and self.ser is not None)
+
+    @property
+    def connection_state(self) -> str:
+        return STATE_CONNECTED if self.use_emulator else self.supervisor.state
+
+    @property
+    def last_error(self) -> str | None:
+        return None if self.use_emulator else self.supervisor.last_error
+
+    def start(self):
+        """Starts the background acquisition thread (idempotent)."""
+        if self.is_acquiring:
+            return
+        self._stop_event.clear()
+        self._acquisition_thread = threading.Thread(target=self._acquisition_loop, name="ScaleReaderAcquisition", daemon=True)
+        self._acquisition_thread.start()
+
+    def stop(self):
+        if self._acquisition_thread is None:
+            return
+        self._stop_event.set()
+        self._acquisition_thread.join(timeout=self.timeout + 1)
+        self._acquisition_thread = None
+
+    @property
+    def is_acquiring(self) -> bool:
+        return self._acquisition_thread is not None and self._acquisition_thread.is_alive()
+
+    def _acquisition_loop(self):
+        metrics = self.metrics
+        while not self._stop_event.is_set():
+            samples = self._acquire_samples()
+            self._record_samples(samples)
+            if samples and samples[-1].ok:
+                metrics.read_to_publish.observe(time.monotonic() - samples[-1].timestamp)
+            if self.use_emulator:
+                self._stop_event.wait(self.emulator_interval)
+            elif samples and samples[-1].status & STATUS_IO_ERROR:
+                self.supervisor.wait_connected(0.5) # Port is down; the supervisor is reconnecting
 
     def disconnect(self):
+        self.stop()
+        if self.recorder is not None:
+            self.recorder.flush()
         if self.use_emulator:
             print("Emulator disconnected (simulated).")
             return
 
+        self.supervisor.stop()
         if self.ser and self.ser.is_open:
-            self.ser.close()
+            self._close_serial()
             print(f"Disconnected from serial port: {self.port}")
         else:
             print("Not connected to any serial port.")
 
+    def parse_frame(self, frame: bytes) -> ScaleReading | None:
+        """Parses one raw frame (without terminator) with this reader's protocol."""
+        return self._parse(frame)
+
     def parse_weight_data(self, data_string: str) -> float | None:
-        # Expected format: "ST,GS,+00123.45kg\r\n"
-        # Regex to capture the signed float value
-        match = re.search(r"([+-]\d+\.\d+)", data_string)
-        if match:
-            try:
-                weight = float(match.group(1))
-                return weight
-            except ValueError:
-                print(f"Error converting weight to float from: {match.group(1)}")
-                return None
-        else:
-            # print(f"Could not parse weight from data: '{data_string.strip()}'") # Too verbose for normal operation
-            return None
+        # Kept for callers that still hold decoded lines, e.g. "ST,GS,+00123.45kg\r\n"
+        reading = self._parse(data_string.strip('\r\n').encode('ascii', errors='ignore'))
+        return reading.weight if reading is not None else None
+
+    def latest(self) -> WeightSample | None:
+        """Most recent sample from memory. Never touches the port."""
+        return self.buffer.latest()
+
+    def send_command(self, name: str, timeout_s: float | None = None) -> CommandResponse:
+        """Sends one of the protocol's commands (see protocols.ScaleCommand) and waits for the answer.
+
+        Raises ValueError if the protocol has no such command, CommandTimeout if
+        nothing answered in time, ScaleCommandError if the indicator refused it and
+        ConnectionError if the port is down. Weight frames that answer a command are
+        published like any other sample.
+        """
+        if self.commands is None:
+            raise ValueError(f"Protocol '{self.protocol.name}' is output-only; it takes no commands.")
+        future = self.commands.submit(name, timeout_s)
+        if self.is_acquiring: # The acquisition thread matches the response
+            wait = (self.commands.timeout_s if timeout_s is None else timeout_s) + self.timeout + 1.0
+            return future.result(wait)
+        while not future.done(): # Each pass blocks for up to the port's read timeout
+            samples = self._acquire_samples()
+            for sample in samples:
+                self._record_sample(sample)
+            if not future.done() and any(sample.status & STATUS_IO_ERROR for sample in samples):
+                # Port down: no answer can come, so don't spin on it until the command times out
+                self.commands.fail_all(ConnectionError(f"Scale port unavailable: {self.last_error or 'not connected'}"))
+        return future.result()
+
+    def zero(self, timeout_s: float | None = None) -> CommandResponse:
+        return self.send_command(CMD_ZERO, timeout_s)
+
+    def tare(self, timeout_s: float | None = None) -> CommandResponse:
+        return self.send_command(CMD_TARE, timeout_s)
+
+    def print_weight(self, timeout_s: float | None = None) -> float | None:
+        """Asks the indicator for a (stable, where the protocol distinguishes it) weight."""
+        reading = self.send_command(CMD_PRINT, timeout_s).reading
+        return reading.weight if reading is not None else None
 
     def read_weight(self) -> float | None:
+        if self.is_acquiring:
+            sample = self.buffer.latest()
+            return sample.weight if sample is not None and sample.ok else None
+
+        # Drain everything buffered and use only the freshest frame, so a slow poller
+        # never falls behind a scale that emits faster than it is read.
+        deadline = time.monotonic() + (self.timeout or 0)
+        while True:
+            samples = self._acquire_samples(latest_only=True)
+            if samples or time.monotonic() >= deadline:
+                break
+        sample = samples[-1] if samples else WeightSample(time.monotonic(), None, STATUS_NO_DATA)
+        self._record_sample(sample)
+        if sample.ok:
+            self.metrics.read_to_publish.observe(time.monotonic() - sample.timestamp)
+        return sample.weight if sample.ok else None
+
+    def read_frames(self) -> list[bytes]:
+        """All complete raw frames received since the last call, oldest first. Non-blocking."""
+        self._check_direct_access()
+        self._poll_port()
+        return self._splitter.frames()
+
+    def read_latest_frame(self) -> bytes | None:
+        """Freshest complete raw frame; older buffered frames are discarded. Non-blocking."""
+        self._check_direct_access()
+        self._poll_port()
+        return self._splitter.latest_frame()
+
+    def _check_direct_access(self):
+        if self.is_acquiring:
+            raise RuntimeError("Raw frame access is not available while background acquisition is running; "
+                               "subscribe to ScaleReader.stream instead.")
+
+    def _poll_port(self):
+        if not self.use_emulator and not self.is_connected:
+            self.supervisor.start()
+            return
+        try:
+            self._fill(block=False)
+        except Exception as e:
+            self._close_serial()
+            self.supervisor.report_failure(e)
+
+    def _write(self, data: bytes):
+        # Called by self.commands, serialised by its lock
+        if self.use_emulator:
+            self._emulator_replies.append(self.emulator.respond(data))
+            return
+        ser = self.ser
+        if ser is None:
+            raise serial.SerialException(f"Serial port {self.port} is not open")
+        ser.write(data)
+
+    def _service_commands(self):
+        """Sends a poll when one is due, times out overdue requests and refills the pipeline."""
+        commands = self.commands
+        if commands is None:
+            return
+        now = time.monotonic()
+        if self.poll_rate_hz and now >= self._next_poll:
+            if commands.polls_outstanding() < commands.pipeline_depth:
+                commands.submit(CMD_POLL) # A write error lands in the future, which nobody waits on
+            self._next_poll = max(self._next_poll + 1.0 / self.poll_rate_hz, now) # No catch-up bursts
+        commands.service(now)
+
+    def _record_sample(self, sample: WeightSample):
+        self._seq += 1
+        sample = WeightSample(sample.timestamp, sample.weight, sample.status, self._seq)
+        self.buffer.append(*sample)
+        self.stream.publish(sample)
+
+    def _record_samples(self, samples: list[WeightSample]):
+        # One bulk read: published together so subscriber filters can process the batch at once
+        recorded = []
+        for sample in samples:
+            self._seq += 1
+            sample = WeightSample(sample.timestamp, sample.weight, sample.status, self._seq)
+            self.buffer.append(*sample)
+            recorded.append(sample)
+        self.stream.publish_batch(recorded)
+
+    def _fill(self, block: bool = True) -> int:
+        """Moves everything the port has buffered into the frame splitter in bulk.
+
+        With block=True waits up to self.timeout for the first byte. Returns the
+        number of bytes read. Raises serial.SerialException on port errors.
+        """
         if self.use_emulator:
-            if self.emulator:
-                simulated_data = self.emulator.get_simulated_reading()
-                # print(f"Emulator raw: {simulated_data.strip()}") # for debugging
-                return self.parse_weight_data(simulated_data)
+            if not self.emulator:
+                return 0
+            if self._emulator_replies:
+                data = b''.join(self._emulator_replies.popleft() for _ in range(len(self._emulator_replies)))
+            elif self.poll_rate_hz:
+                return 0 # A polled indicator only talks when asked
             else:
-                print("Emulator not initialized!") # Should not happen if __init__ is correct
-                return None
+                data = self.emulator.get_simulated_reading().encode('ascii')
+            self._splitter.feed(data)
+            self.metrics.bytes_received += len(data)
+            return len(data)
+
+        waiting = self.ser.in_waiting
+        if not waiting and not block:
+            return 0
+        data = self.ser.read(waiting or 1) # read(1) blocks until the first byte or timeout
+        received = len(data)
+        self._splitter.feed(data)
+        if received and not waiting:
+            waiting = self.ser.in_waiting # Rest of the burst that arrived with the first byte
+            if waiting:
+                data = self.ser.read(waiting)
+                received += len(data)
+                self._splitter.feed(data)
+        self.metrics.bytes_received += received
+        return received
+
+    def _acquire_samples(self, latest_only: bool = False) -> list[WeightSample]:
+        """Bulk-reads the emulator or serial port and parses the complete frames.
 
-        if not self.ser or not self.ser.is_open:
-            print("Serial port not connected.")
-            if not self.connect(): # Try to auto-reconnect
-                return None
+        Returns an empty list if only a partial frame has arrived so far.
+        """
+        if self.use_emulator and not self.emulator:
+            print("Emulator not initialized!") # Should not happen if __init__ is correct
+            return [WeightSample(time.monotonic(), None, STATUS_IO_ERROR)]
+
+        if not self.use_emulator and not self.is_connected:
+            self.supervisor.start() # Reconnects in the background; never block the caller on it
+            self.metrics.io_errors += 1
+            if self.commands is not None:
+                self.commands.service() # Still time out commands sent before the port dropped
+            return [WeightSample(time.monotonic(), None, STATUS_IO_ERROR)]
         
         try:
-            line = self.ser.readline().decode('ascii', errors='ignore').strip()
-            if line:
-                # print(f"Serial raw: {line}") # for debugging
-                return self.parse_weight_data(line)
-            return None
-        except serial.SerialException as e:
-            print(f"Error reading from serial port: {e}")
-            return None
-        except Exception as e:
-            print(f"An unexpected error occurred during serial read: {e}")
-            return None
+            self._service_commands()
+            if not self._fill(block=True):
+                if self.poll_rate_hz and not self._poll_timed_out():
+                    return [] # Between polls silence is expected
+                self.metrics.read_timeouts += 1
+                return [WeightSample(time.monotonic(), None, STATUS_NO_DATA)]
+        except Exception as e: # SerialException, OSError on unplug, TypeError from a closed handle
+            self._close_serial()
+            self.supervisor.report_failure(e)
+            self.metrics.io_errors += 1
+            if self.commands is not None:
+                self.commands.fail_all(e)
+            return [WeightSample(time.monotonic(), None, STATUS_IO_ERROR)]
+
+        timestamp = time.monotonic()
+        if self.recorder is not None or self.commands is not None:
+            frames = self._splitter.frames() # Every frame: recorded, or checked for command responses
+            if self.recorder is not None:
+                for frame in frames:
+                    self.recorder.record(frame, timestamp)
+            self.metrics.frames_received += len(frames)
+            if self.commands is not None:
+                samples = self._samples_from_responses(frames, timestamp)
+                return samples[-1:] if latest_only else samples
+            if latest_only:
+                frames = frames[-1:]
+            return [self._sample_from_frame(frame, timestamp) for frame in frames]
+        if latest_only:
+            skipped = self._splitter.frames_skipped
+            frame = self._splitter.latest_frame()
+            self.metrics.frames_received += self._splitter.frames_skipped - skipped + (frame is not None)
+            return [self._sample_from_frame(frame, timestamp)] if frame is not None else []
+        frames = self._splitter.frames()
+        self.metrics.frames_received += len(frames)
+        return [self._sample_from_frame(frame, timestamp) for frame in frames]
+
+    def _samples_from_responses(self, frames: list[bytes], timestamp: float) -> list[WeightSample]:
+        commands = self.commands
+        samples = []
+        for frame in frames:
+            reading = self._parse(frame)
+            response = commands.on_frame(frame, reading, timestamp)
+            if response is not None:
+                self.metrics.command_round_trip.observe(response.round_trip_s)
+                if reading is None:
+                    continue # An acknowledgement or error reply (e.g. SICS "Z A"), not a weight
+            elif reading is None:
+                self.metrics.parse_failures += 1
+            samples.append(reading_to_sample(reading, timestamp))
+        return samples
+
+    def _poll_timed_out(self) -> bool:
+        """Whether a request timed out since the last check."""
+        self.commands.service()
+        timeouts = self.commands.timeouts
+        self.metrics.command_timeouts = timeouts
+        if timeouts == self._timeouts_seen:
+            return False
+        self._timeouts_seen = timeouts
+        return True
+
+    def _sample_from_frame(self, frame: bytes, timestamp: float) -> WeightSample:
+        reading = self._parse(frame)
+        if reading is None:
+            self.metrics.parse_failures += 1
+        return reading_to_sample(reading, timestamp)
+
+def reading_to_sample(reading: ScaleReading | None, timestamp: float) -> WeightSample:
+    """Maps a parsed reading (None = unparseable frame) onto a sample with status bits."""
+    if reading is None:
+        return WeightSample(timestamp, None, STATUS_PARSE_ERROR)
+    status = STATUS_OK
+    if reading.stable is not None:
+        status |= STATUS_STABLE if reading.stable else STATUS_MOTION
+    if reading.net:
+        status |= STATUS_NET
+    if reading.overload:
+        status |= STATUS_OVERLOAD
+    return WeightSample(timestamp, reading.weight, status)
 
 if __name__ == '__main__':
     print("Testing ScaleReader with Emulator...")
@@ -104,6 +434,19 @@ if __name__ == '__main__':
             time.sleep(0.5)
         reader_emulator.disconnect()
 
+    print("\nTesting ScaleReader background acquisition with Emulator...")
+    reader_bg = ScaleReader(use_emulator=True, background=True, emulator_interval=0.05)
+    if reader_bg.connect():
+        time.sleep(0.3)
+        for i in range(5):
+            start = time.perf_counter()
+            sample = reader_bg.latest()
+            elapsed_us = (time.perf_counter() - start) * 1e6
+            print(f"Background Reading {i+1}: {sample.weight:.2f} kg (status {sample.status}, latest() took {elapsed_us:.1f} us)")
+            time.sleep(0.2)
+        print(f"Samples acquired: {reader_bg.buffer.total_count}")
+        reader_bg.disconnect()
+
     print("\nTesting ScaleReader with Serial Port (requires a loopback or actual device)...")
     # Test with a real serial port - replace 'COM_PORT' or '/dev/ttyUSB0' with your actual port
     # For automated testing without a real device, this part might be tricky.
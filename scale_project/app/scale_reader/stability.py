@@ -0,0 +1,194 @@
+import math
+import threading
+from array import array
+from typing import Callable, NamedTuple
+from .ring_buffer import WeightSample, STATUS_STABLE, STATUS_MOTION
+from .weight_stream import WeightStream, Subscription
+
+EVENT_STABLE = 'stable'
+EVENT_MOTION = 'motion'
+
+
+class StabilityStats(NamedTuple):
+    count: int
+    mean: float | None
+    stddev: float | None
+    minimum: float | None
+    maximum: float | None
+    span_s: float        # Time covered by the samples in the window
+    stable: bool
+    stable_since: float | None # Monotonic timestamp of the last motion -> stable transition
+
+
+class StabilityDetector:
+    """Decides whether the load on the deck is stable from the live sample stream.
+
+    Keeps rolling mean/variance/min/max over the last window_s seconds in O(1) per
+    sample: samples live in fixed arrays, sums are updated on append/evict, and
+    min/max come from monotonic index queues stored in arrays of the same size.
+
+    The load is stable when the window covers at least window_s * min_coverage
+    seconds, holds min_samples valid samples and (max - min) <= tolerance. A motion
+    flag from the indicator always vetoes stability; with trust_indicator=True an
+    explicit stable flag is accepted without the statistical check.
+    """
+    def __init__(self, window_s: float = 1.5, tolerance: float = 2.0, min_samples: int = 5,
+                 capacity: int = 512, min_coverage: float = 0.8, trust_indicator: bool = False):
+        self.window_s = window_s
+        self.tolerance = tolerance
+        self.min_samples = min_samples
+        self.capacity = capacity
+        self.min_coverage = min_coverage
+        self.trust_indicator = trust_indicator
+
+        self._timestamps = array('d', [0.0]) * capacity
+        self._weights = array('d', [0.0]) * capacity
+        self._min_queue = array('q', [0]) * capacity # Sample numbers with increasing weights
+        self._max_queue = array('q', [0]) * capacity # Sample numbers with decreasing weights
+        self._listeners: list[Callable[[str, StabilityStats], None]] = []
+        self._subscription: Subscription | None = None
+        self._lock = threading.Lock()
+        self._reset()
+        self.stable = False
+        self.stable_since: float | None = None
+
+    def _reset(self):
+        self._first = 0 # Sample number of the oldest sample in the window
+        self._next = 0  # Sample number the next sample will get
+        self._min_head = self._min_tail = 0
+        self._max_head = self._max_tail = 0
+        self._shift = 0.0 # Sums are kept relative to a shift to avoid catastrophic cancellation
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    # --- Wiring ---
+    def attach(self, stream: WeightStream):
+        """Feeds the detector from every sample published on stream (on the producer thread)."""
+        self.detach()
+        self._subscription = stream.subscribe(callback=self.add_sample)
+
+    def detach(self):
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def add_listener(self, callback: Callable[[str, StabilityStats], None]):
+        """callback(event, stats) is called on every stable/motion transition."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, StabilityStats], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    # --- Rolling window ---
+    def _evict_oldest(self):
+        cap = self.capacity
+        idx = self._first % cap
+        d = self._weights[idx] - self._shift
+        self._sum -= d
+        self._sum_sq -= d * d
+        if self._min_head < self._min_tail and self._min_queue[self._min_head % cap] == self._first:
+            self._min_head += 1
+        if self._max_head < self._max_tail and self._max_queue[self._max_head % cap] == self._first:
+            self._max_head += 1
+        self._first += 1
+
+    def _push(self, timestamp: float, weight: float):
+        cap = self.capacity
+        if self._first == self._next:
+            self._shift = weight
+            self._sum = self._sum_sq = 0.0
+        n = self._next
+        idx = n % cap
+        self._timestamps[idx] = timestamp
+        self._weights[idx] = weight
+        d = weight - self._shift
+        self._sum += d
+        self._sum_sq += d * d
+
+        weights = self._weights
+        while self._min_tail > self._min_head and weights[self._min_queue[(self._min_tail - 1) % cap] % cap] >= weight:
+            self._min_tail -= 1
+        self._min_queue[self._min_tail % cap] = n
+        self._min_tail += 1
+        while self._max_tail > self._max_head and weights[self._max_queue[(self._max_tail - 1) % cap] % cap] <= weight:
+            self._max_tail -= 1
+        self._max_queue[self._max_tail % cap] = n
+        self._max_tail += 1
+        self._next += 1
+
+    def add_sample(self, sample: WeightSample):
+        with self._lock:
+            if not sample.ok:
+                self._reset() # A gap in valid data restarts the window
+                stable = False
+            else:
+                if self._next - self._first == self.capacity:
+                    self._evict_oldest()
+                horizon = sample.timestamp - self.window_s
+                while self._first < self._next and self._timestamps[self._first % self.capacity] < horizon:
+                    self._evict_oldest()
+                self._push(sample.timestamp, sample.weight)
+                stable = self._is_stable(sample.status)
+
+            event = None
+            if stable != self.stable:
+                self.stable = stable
+                self.stable_since = sample.timestamp if stable else None
+                event = EVENT_STABLE if stable else EVENT_MOTION
+                stats = self._stats()
+        if event is not None:
+            for callback in list(self._listeners):
+                try:
+                    callback(event, stats)
+                except Exception as e:
+                    print(f"Error in stability listener: {e}")
+
+    def _is_stable(self, status: int) -> bool:
+        if status & STATUS_MOTION:
+            return False
+        if self.trust_indicator and status & STATUS_STABLE:
+            return True
+        count = self._next - self._first
+        if count < self.min_samples:
+            return False
+        cap = self.capacity
+        span = self._timestamps[(self._next - 1) % cap] - self._timestamps[self._first % cap]
+        if span < self.window_s * self.min_coverage:
+            return False
+        spread = self._weights[self._max_queue[self._max_head % cap] % cap] - self._weights[self._min_queue[self._min_head % cap] % cap]
+        return spread <= self.tolerance
+
+    # --- Queries ---
+    def _stats(self) -> StabilityStats:
+        count = self._next - self._first
+        if count == 0:
+            return StabilityStats(0, None, None, None, None, 0.0, self.stable, self.stable_since)
+        cap = self.capacity
+        mean_d = self._sum / count
+        variance = max(self._sum_sq / count - mean_d * mean_d, 0.0)
+        return StabilityStats(
+            count, self._shift + mean_d, math.sqrt(variance),
+            self._weights[self._min_queue[self._min_head % cap] % cap],
+            self._weights[self._max_queue[self._max_head % cap] % cap],
+            self._timestamps[(self._next - 1) % cap] - self._timestamps[self._first % cap],
+            self.stable, self.stable_since,
+        )
+
+    def stats(self) -> StabilityStats:
+        with self._lock:
+            return self._stats()
+
+
+if __name__ == '__main__':
+    import random
+    print("Testing StabilityDetector with a simulated load/settle trace...")
+    detector = StabilityDetector(window_s=1.0, tolerance=1.0)
+    detector.add_listener(lambda event, stats: print(f"  {event.upper()} at mean {stats.mean:.2f} kg (n={stats.count})"))
+    t, weight = 0.0, 0.0
+    for i in range(200):
+        if i < 60:
+            weight += 50.0 # Truck driving on
+        t += 0.05
+        detector.add_sample(WeightSample(t, weight + random.uniform(-0.3, 0.3), 0))
+    print(f"Final: {detector.stats()}")
@@ -0,0 +1,44 @@
+from typing import Callable
+from .ring_buffer import WeightSample
+from .weight_stream import WeightStream, POLICY_LATEST
+
+
+class TkStreamBridge:
+    """Delivers samples from a WeightStream produced on another thread to Tk's main thread.
+
+    Tk must only be touched from its own thread, so the producer side just updates a
+    latest-only subscription and the Tk side polls it with widget.after(). The callback
+    runs on the Tk thread and only when a new sample has arrived.
+    """
+    def __init__(self, widget, stream: WeightStream, callback: Callable[[WeightSample], None], interval_ms: int = 100):
+        self.widget = widget
+        self.callback = callback
+        self.interval_ms = interval_ms
+        self.subscription = stream.subscribe(POLICY_LATEST)
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._pump)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self.subscription.close()
+
+    def _pump(self):
+        self._after_id = None
+        sample = self.subscription.poll()
+        if sample is not None:
+            try:
+                self.callback(sample)
+            except Exception as e:
+                print(f"Error in Tk stream bridge callback: {e}")
+        try:
+            self._after_id = self.widget.after(self.interval_ms, self._pump)
+        except Exception: # Widget destroyed
+            self._after_id = None
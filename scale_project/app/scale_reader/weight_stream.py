@@ -0,0 +1,139 @@
+import threading
+from collections import deque
+from typing import Callable
+from .ring_buffer import WeightSample
+from .filters import WeightFilter
+
+# Backpressure policies for subscribers
+POLICY_LATEST = 'latest'     # Keep only the most recent sample (UI displays)
+POLICY_EVERY = 'every'       # Queue every sample, drop oldest when the queue is full (loggers)
+POLICY_DECIMATE = 'decimate' # Queue every Nth sample (trend plots, slow automations)
+POLICIES = (POLICY_LATEST, POLICY_EVERY, POLICY_DECIMATE)
+
+
+class Subscription:
+    """One consumer's view of a WeightStream.
+
+    Samples are delivered on the producer thread; the consumer reads them at its own
+    rate with latest()/poll()/drain(). With a callback, samples are handed straight
+    to the callback on the producer thread instead of being queued. With a filter
+    (see filters.create_filter), valid weights are smoothed before delivery; every
+    sample goes through the filter, even ones decimation then skips. Samples published
+    together (one bulk read, one ring-buffer window) are filtered as one batch.
+    """
+    def __init__(self, stream: 'WeightStream', policy: str = POLICY_LATEST, maxlen: int = 256,
+                 decimation: int = 1, callback: Callable[[WeightSample], None] | None = None,
+                 weight_filter: WeightFilter | None = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown subscription policy '{policy}'. Expected one of {POLICIES}.")
+        if decimation < 1:
+            raise ValueError("Decimation must be at least 1.")
+        self.stream = stream
+        self.policy = policy
+        self.decimation = decimation if policy == POLICY_DECIMATE else 1
+        self.callback = callback
+        self.weight_filter = weight_filter
+        self.dropped = 0 # Samples lost because the queue was full
+        self._queue = deque(maxlen=maxlen) if policy != POLICY_LATEST else None
+        self._latest: WeightSample | None = None
+        self._has_new = False
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def _deliver(self, sample: WeightSample):
+        if self.weight_filter is not None and sample.ok:
+            sample = sample._replace(weight=self.weight_filter.update(sample.weight))
+        self._accept(sample)
+
+    def _deliver_batch(self, samples: list[WeightSample]):
+        if self.weight_filter is not None:
+            ok = [i for i, sample in enumerate(samples) if sample.ok]
+            if ok:
+                filtered = self.weight_filter.filter_batch([samples[i].weight for i in ok])
+                samples = list(samples)
+                for i, weight in zip(ok, filtered):
+                    samples[i] = samples[i]._replace(weight=weight)
+        for sample in samples:
+            self._accept(sample)
+
+    def _accept(self, sample: WeightSample):
+        self._seen += 1
+        if (self._seen - 1) % self.decimation:
+            return
+        if self.callback is not None:
+            try:
+                self.callback(sample)
+            except Exception as e:
+                print(f"Error in weight stream subscriber callback: {e}")
+            return
+        with self._lock:
+            self._latest = sample
+            self._has_new = True
+            if self._queue is not None:
+                if len(self._queue) == self._queue.maxlen:
+                    self.dropped += 1
+                self._queue.append(sample)
+
+    def latest(self) -> WeightSample | None:
+        """Most recent sample delivered to this subscriber (may have been seen before)."""
+        return self._latest
+
+    def poll(self) -> WeightSample | None:
+        """Most recent sample if one arrived since the last poll/drain, else None."""
+        with self._lock:
+            if not self._has_new:
+                return None
+            self._has_new = False
+            if self._queue is not None:
+                self._queue.clear()
+            return self._latest
+
+    def drain(self) -> list[WeightSample]:
+        """All queued samples since the last drain, oldest first."""
+        with self._lock:
+            self._has_new = False
+            if self._queue is None:
+                return [self._latest] if self._latest is not None else []
+            samples = list(self._queue)
+            self._queue.clear()
+            return samples
+
+    def close(self):
+        self.stream.unsubscribe(self)
+
+
+class WeightStream:
+    """Single-producer, multi-subscriber fan-out of weight samples."""
+    def __init__(self):
+        self._subscribers: tuple[Subscription, ...] = () # Copy-on-write so publish() needs no lock
+        self._lock = threading.Lock()
+        self.latest: WeightSample | None = None
+
+    def subscribe(self, policy: str = POLICY_LATEST, maxlen: int = 256, decimation: int = 1,
+                  callback: Callable[[WeightSample], None] | None = None,
+                  weight_filter: WeightFilter | None = None) -> Subscription:
+        subscription = Subscription(self, policy, maxlen, decimation, callback, weight_filter)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, sample: WeightSample):
+        self.latest = sample
+        for subscription in self._subscribers:
+            subscription._deliver(sample)
+
+    def publish_batch(self, samples: list[WeightSample]):
+        """Publishes consecutive samples at once, so subscriber filters can process them together."""
+        if not samples:
+            return
+        self.latest = samples[-1]
+        for subscription in self._subscribers:
+            subscription._deliver_batch(samples)
@@ -1,14 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, Menu
-from app.scale_reader import ScaleReader
+from app.scale_reader import ScaleReader, ProcessScaleReader, POLICY_LATEST, create_filter, MetricsExporter, WeightBroadcastServer
 from .truck_add_window import AddTruckWindow
 from .truck_list_window import TruckListWindow
 from .aggregate_type_add_window import AddAggregateTypeWindow
 from .aggregate_type_list_window import AggregateTypeListWindow
 from .delivery_location_add_window import AddDeliveryLocationWindow
 from .delivery_location_list_window import DeliveryLocationListWindow
-from .weighing_window import WeighingWindow # New import
-from app.db.database import create_db_and_tables 
+from .weighing_window import WeighingWindow, DISPLAY_FILTER # New import
+from app.db.database import create_db_and_tables, set_audit_sink
+from app.db.audit_writer import AuditWriter, DURABILITY_JOURNAL
+
+METRICS_FILE = None      # e.g. "/var/lib/node_exporter/scale_metrics.prom" to export scale metrics for a textfile collector
+METRICS_HTTP_PORT = None # e.g. 9464 to serve http://127.0.0.1:9464/metrics
+BROADCAST_PORT = None    # e.g. 8765 to stream the live weight to scoreboards on localhost TCP
+BROADCAST_UNIX_PATH = None
+ACQUISITION_PROCESS = False # Read the scale in a separate process so UI stalls can't stop acquisition
+AUDIT_WRITE_BEHIND = False  # Write audit rows in batches on a background thread instead of with each change
+AUDIT_DURABILITY = DURABILITY_JOURNAL # Journal queued audit rows so a crash doesn't lose them
 
 class MainApplicationWindow(tk.Tk):
     def __init__(self, update_interval_ms=500):
@@ -25,10 +34,34 @@ class MainApplicationWindow(tk.Tk):
 
         create_db_and_tables() 
         print("Database tables ensured to be created if they didn't exist.")
-
-        self.scale_reader = ScaleReader(use_emulator=True) # This is passed to WeighingWindow
+        self.audit_writer = None
+        if AUDIT_WRITE_BEHIND:
+            self.audit_writer = AuditWriter(durability=AUDIT_DURABILITY)
+            self.audit_writer.start()
+            set_audit_sink(self.audit_writer)
+
+        # Background acquisition keeps serial I/O off the Tk thread; read_weight() answers from memory
+        # 4096 samples keep a whole truck visit (~7 min at 10 Hz) for the per-ticket weight trace
+        if ACQUISITION_PROCESS:
+            self.scale_reader = ProcessScaleReader(use_emulator=True, buffer_size=4096)
+        else:
+            self.scale_reader = ScaleReader(use_emulator=True, background=True, buffer_size=4096) # This is passed to WeighingWindow
         if not self.scale_reader.connect():
             print("Failed to connect to scale emulator.")
+        # Windows subscribe to the reader's stream instead of each pulling their own frames
+        self.weight_subscription = self.scale_reader.stream.subscribe(POLICY_LATEST, weight_filter=create_filter(DISPLAY_FILTER))
+        self._shown_seq: int | None = None
+        # Scale I/O counters and latency histograms, exported every 10 s when METRICS_FILE/METRICS_HTTP_PORT is set
+        self.metrics_exporter = None
+        if METRICS_FILE or METRICS_HTTP_PORT is not None:
+            self.metrics_exporter = MetricsExporter({"main": self.scale_reader.metrics}, path=METRICS_FILE,
+                                                    http_port=METRICS_HTTP_PORT, interval_s=10.0)
+            self.metrics_exporter.start()
+        self.broadcast_server = None
+        if BROADCAST_PORT is not None or BROADCAST_UNIX_PATH:
+            self.broadcast_server = WeightBroadcastServer(self.scale_reader.stream, port=BROADCAST_PORT,
+                                                          unix_path=BROADCAST_UNIX_PATH)
+            self.broadcast_server.start()
 
         menubar = Menu(self)
         self.config(menu=menubar)
@@ -89,9 +122,13 @@ class MainApplicationWindow(tk.Tk):
         self.update_weight_display()
 
     def update_weight_display(self):
-        weight = self.scale_reader.read_weight()
+        sample = self.weight_subscription.latest()
+        weight = sample.weight if sample is not None and sample.ok else None
         if weight is not None:
             self.weight_value_var.set(f"{weight:0=+8.2f} kg")
+            if sample.seq != self._shown_seq: # A sample shown on several refreshes is measured once
+                self._shown_seq = sample.seq
+                self.scale_reader.metrics.observe_display(sample.timestamp)
         else:
             self.weight_value_var.set("N/A")
             # self.status_var.set("Error reading scale / No data") # Avoid overriding other status
@@ -181,6 +218,10 @@ class MainApplicationWindow(tk.Tk):
         print("Closing application...")
         if self.scale_reader:
             self.scale_reader.disconnect()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        if self.broadcast_server:
+            self.broadcast_server.stop()
         
         # Explicitly destroy any open Toplevel windows
         if self.active_weighing_window and self.active_weighing_window.winfo_exists():
@@ -197,6 +238,9 @@ class MainApplicationWindow(tk.Tk):
         for child in self.winfo_children():
             if isinstance(child, tk.Toplevel) and child.winfo_exists():
                 child.destroy()
+        if self.audit_writer:
+            set_audit_sink(None)
+            self.audit_writer.stop() # Writes out the queued audit rows before exit
         self.destroy()
 
 if __name__ == '__main__':
@@ -1,16 +1,37 @@
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 from app.db.database import (get_all_trucks_mru_ordered, search_trucks, # Use new truck functions
                              get_all_aggregate_types, get_all_delivery_locations,
-                             add_weight_ticket, add_audit_log_entry, get_db, get_truck_by_id)
+                             add_weight_ticket, get_db, get_truck_by_id)
 from app.db.models import Truck, AggregateType, DeliveryLocation 
+from app.scale_reader import POLICY_LATEST, create_filter
+
+# How "Capture Gross" treats an unstable scale
+CAPTURE_ANY = 'any'         # Capture whatever is on the scale (no stability check)
+CAPTURE_WAIT = 'wait'       # Wait up to stable_wait_ms for the load to settle, then reject
+CAPTURE_REQUIRE = 'require' # Reject immediately unless the load is stable
+DISPLAY_FILTER = 'median'   # Smooths the live weight shown; captures use the raw sample. See app.scale_reader.filters
+TRACE_EMPTY_KG = 100.0      # Below this the deck counts as empty; the stored trace starts at drive-on
+MAX_WEIGHT_AGE_S = 2.0      # Capture rejects a weight older than this (the scale stopped sending)
 
 class WeighingWindow(tk.Toplevel):
-    def __init__(self, parent, scale_reader, update_interval_ms=500):
+    def __init__(self, parent, scale_reader, update_interval_ms=500, capture_mode=CAPTURE_WAIT, stable_wait_ms=5000,
+                 measure_latency=True):
         super().__init__(parent)
         self.parent = parent
         self.scale_reader = scale_reader
         self.update_interval_ms = update_interval_ms
+        self.capture_mode = capture_mode
+        self.stable_wait_ms = stable_wait_ms
+        self._capture_deadline: float | None = None
+        # Byte arrival -> live weight StringVar updated, into the reader's arrival_to_display histogram
+        self.latency_metrics = getattr(scale_reader, 'metrics', None) if measure_latency else None
+        self._shown_seq: int | None = None
+        # Shares the reader's single stream with the main window instead of reading frames itself
+        self.weight_subscription = self.scale_reader.stream.subscribe(POLICY_LATEST, weight_filter=create_filter(DISPLAY_FILTER))
+        # Unfiltered: the ticket records the sample the scale sent, matching its weight_seq/weight_age_ms
+        self.capture_subscription = self.scale_reader.stream.subscribe(POLICY_LATEST)
 
         self.title("New Weighing Ticket")
         self.geometry("700x600") # Increased size for search
@@ -21,6 +42,9 @@ class WeighingWindow(tk.Toplevel):
 
         self.selected_truck_obj: Truck | None = None
         self.current_scale_weight: float | None = None
+        self.captured_trace: list | None = None # Samples from drive-on to the last capture
+        self.captured_sample = None # WeightSample the gross weight was captured from
+        self.captured_age_ms: float | None = None
         self.trucks_map = {} # Will be populated by load_trucks_into_combobox
 
         self.db_session = next(get_db())
@@ -37,6 +61,8 @@ class WeighingWindow(tk.Toplevel):
         ttk.Label(live_weight_frame, text="Current Scale Weight:").pack(side=tk.LEFT, padx=5)
         self.live_weight_var = tk.StringVar(value="--.-- kg")
         ttk.Label(live_weight_frame, textvariable=self.live_weight_var, font=('Helvetica', 14, 'bold')).pack(side=tk.LEFT, padx=5)
+        self.stability_var = tk.StringVar(value="")
+        ttk.Label(live_weight_frame, textvariable=self.stability_var, font=('Helvetica', 10, 'bold')).pack(side=tk.LEFT, padx=10)
 
         # --- Truck Selection & Search ---
         truck_frame = ttk.LabelFrame(main_frame, text="Truck Details", padding="10")
@@ -85,7 +111,8 @@ class WeighingWindow(tk.Toplevel):
         self.gross_weight_entry.grid(row=0, column=1, sticky="ew", pady=2, padx=5)
         self.gross_weight_var.trace_add("write", lambda *_: self.recalculate_net_weight())
 
-        ttk.Button(weights_frame, text="Capture Gross", command=self.capture_gross_weight).grid(row=0, column=2, pady=2, padx=5)
+        self.capture_button = ttk.Button(weights_frame, text="Capture Gross", command=self.capture_gross_weight)
+        self.capture_button.grid(row=0, column=2, pady=2, padx=5)
         
         ttk.Label(weights_frame, text="Net Weight (kg):").grid(row=1, column=0, sticky="w", pady=2)
         self.net_weight_var = tk.StringVar(value="--.-- kg")
@@ -152,14 +179,19 @@ class WeighingWindow(tk.Toplevel):
 
 
     def update_live_weight_display(self):
-        # ... (same as before)
-        weight = self.scale_reader.read_weight()
+        sample = self.weight_subscription.latest()
+        weight = sample.weight if sample is not None and sample.ok else None
         if weight is not None:
             self.current_scale_weight = weight
             self.live_weight_var.set(f"{weight:0=+8.2f} kg")
+            if self.latency_metrics is not None and sample.seq != self._shown_seq: # Each sample counted once
+                self._shown_seq = sample.seq
+                self.latency_metrics.observe_display(sample.timestamp)
         else:
             self.current_scale_weight = None
             self.live_weight_var.set("N/A")
+        if self._capture_deadline is None: # While waiting for a capture the label shows that instead
+            self.stability_var.set("STABLE" if self.is_scale_stable() else "MOTION")
         self.after(self.update_interval_ms, self.update_live_weight_display)
 
     def on_truck_selected(self, event=None):
@@ -172,13 +204,65 @@ class WeighingWindow(tk.Toplevel):
             self.tare_weight_var.set("--.-- kg")
         self.recalculate_net_weight()
 
+    def is_scale_stable(self) -> bool:
+        stability = getattr(self.scale_reader, 'stability', None)
+        return stability is None or stability.stable # Readers without a detector can't veto
+
     def capture_gross_weight(self):
-        # ... (same as before)
-        if self.current_scale_weight is not None:
-            self.gross_weight_var.set(f"{self.current_scale_weight:.2f}")
+        if self.capture_mode == CAPTURE_ANY or self.is_scale_stable():
+            self._apply_captured_weight()
+        elif self.capture_mode == CAPTURE_REQUIRE:
+            messagebox.showwarning("Scale Not Stable", "The weight is not stable. Wait for the load to settle and capture again.", parent=self)
+        elif self._capture_deadline is None: # CAPTURE_WAIT, unless a wait is already running
+            self._capture_deadline = time.monotonic() + self.stable_wait_ms / 1000
+            self.capture_button.config(state=tk.DISABLED)
+            self.stability_var.set("Waiting for stable weight...")
+            self._wait_for_stable_capture()
+
+    def _wait_for_stable_capture(self):
+        if not self.winfo_exists():
+            return
+        if self.is_scale_stable():
+            self._end_capture_wait()
+            self._apply_captured_weight()
+        elif time.monotonic() >= self._capture_deadline:
+            self._end_capture_wait()
+            messagebox.showwarning("Scale Not Stable", f"The weight did not settle within {self.stable_wait_ms / 1000:.0f} s. Capture rejected.", parent=self)
         else:
-            messagebox.showwarning("Scale Error", "Could not read weight from scale.", parent=self)
+            self.after(100, self._wait_for_stable_capture)
+
+    def _end_capture_wait(self):
+        self._capture_deadline = None
+        self.capture_button.config(state=tk.NORMAL)
+
+    def _collect_weight_trace(self) -> list | None:
+        buffer = getattr(self.scale_reader, 'buffer', None)
+        if buffer is None:
+            return None
+        samples = buffer.last(buffer.capacity)
+        start = 0
+        for i in range(len(samples) - 1, -1, -1): # Walk back to the last moment the deck was empty
+            weight = samples[i].weight
+            if weight is not None and weight < TRACE_EMPTY_KG:
+                start = i
+                break
+        return samples[start:] or None
+
+    def _apply_captured_weight(self):
+        # The freshest raw sample, not the smoothed one last displayed (up to update_interval_ms older)
+        sample = self.capture_subscription.latest()
+        age_s = time.monotonic() - sample.timestamp if sample is not None else None
+        if sample is not None and sample.ok and age_s <= MAX_WEIGHT_AGE_S:
+            self.current_scale_weight = sample.weight
+            self.gross_weight_var.set(f"{sample.weight:.2f}")
+            self.captured_trace = self._collect_weight_trace()
+            self.captured_sample = sample
+            self.captured_age_ms = age_s * 1000
+        else:
+            reason = f"The last weight is {age_s:.1f} s old." if sample is not None and sample.ok else "Could not read weight from scale."
+            messagebox.showwarning("Scale Error", reason, parent=self)
             self.gross_weight_var.set("")
+            self.captured_sample = self.captured_age_ms = None
         self.recalculate_net_weight()
 
     def recalculate_net_weight(self):
@@ -226,8 +310,11 @@ class WeighingWindow(tk.Toplevel):
                                        parent=self): return
 
         operator_name = self.operator_name_var.get().strip() or None
+        captured = self.captured_sample
+        if captured is not None and f"{captured.weight:.2f}" != self.gross_weight_var.get().strip():
+            captured = None # Gross weight was typed over; it no longer comes from the scale
 
-        ticket = add_weight_ticket( # This function now updates truck's last_used_timestamp
+        ticket = add_weight_ticket( # Also updates the truck's last_used_timestamp and writes the audit row
             db_session=self.db_session,
             truck_id=self.selected_truck_obj.id,
             aggregate_type_id=selected_agg_obj.id,
@@ -236,14 +323,13 @@ class WeighingWindow(tk.Toplevel):
             tare_weight_at_weighing=tare_weight_at_weighing,
             net_weight=net_weight,
             operator_name=operator_name,
-            ticket_printed=False
+            ticket_printed=False,
+            trace=self.captured_trace,
+            weight_seq=captured.seq if captured is not None else None,
+            weight_age_ms=self.captured_age_ms if captured is not None else None
         )
 
         if ticket:
-            add_audit_log_entry(
-                db_session=self.db_session, table_name="WeightTickets", record_id=ticket.id,
-                action="INSERT", changed_by=operator_name, new_values=ticket
-            )
             messagebox.showinfo("Success", f"Weight Ticket #{ticket.id} saved successfully!", parent=self)
             
             # Refresh truck list in combobox to reflect MRU change (optional, but good UX)
@@ -271,27 +357,23 @@ class WeighingWindow(tk.Toplevel):
         self.tare_weight_var.set("--.-- kg")
         self.net_weight_var.set("--.-- kg")
         self.selected_truck_obj = None
+        self.captured_trace = None
+        self.captured_sample = self.captured_age_ms = None
         # self.truck_combo.focus_set() # Focus might be better on search entry after save
 
     def on_closing(self):
-        # ... (same as before)
+        self.weight_subscription.close()
+        self.capture_subscription.close()
         if self.db_session:
             self.db_session.close(); print("WeighingWindow: DB session closed.")
         self.destroy()
 
 if __name__ == '__main__':
     # ... (Test setup largely same as before, ensure migrate_and_create_db_and_tables is called)
-    import random
     # from app.db.database import migrate_and_create_db_and_tables as create_db_and_tables
     # Using the aliased version from database.py for consistency
     from app.db.database import create_db_and_tables 
-
-
-    class MockScaleReader:
-        def __init__(self): self.weight = 1234.56
-        def read_weight(self): self.weight += random.uniform(-5, 5); return self.weight
-        def connect(self): return True
-        def disconnect(self): pass
+    from app.scale_reader import ScaleReader
 
     root = tk.Tk()
     root.title("Main App (dummy for WeighingWindow)")
@@ -313,10 +395,11 @@ if __name__ == '__main__':
     finally:
         db.close()
 
-    mock_reader = MockScaleReader()
+    emulated_reader = ScaleReader(use_emulator=True, background=True)
+    emulated_reader.connect()
     
     def open_weighing_dialog():
-        dialog = WeighingWindow(root, mock_reader)
+        dialog = WeighingWindow(root, emulated_reader)
 
     ttk.Button(root, text="Open Weighing Window", command=open_weighing_dialog).pack(pady=20)
     root.mainloop()
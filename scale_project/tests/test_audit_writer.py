@@ -0,0 +1,72 @@
+import threading
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Base, AuditLog
+from app.db.audit_writer import AuditWriter, DURABILITY_JOURNAL
+
+
+class WriterKilled(BaseException):
+    """Not an Exception, so the writer's retry loop can't catch it: the thread just dies."""
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def record_ids(session_factory) -> list[int]:
+    with session_factory() as session:
+        return sorted(session.scalars(select(AuditLog.record_id)))
+
+
+def test_recovery_replays_only_unmarked_rows(session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(threading, "excepthook", lambda args: None) # The killed thread's traceback is expected
+    gate, calls = threading.Event(), []
+
+    def crashing_sessions():
+        calls.append(1)
+        gate.wait(5.0) # Hold the first batch until everything is queued, so the journal isn't compacted
+        if len(calls) == 3:
+            raise WriterKilled() # Process dies in the middle of the third batch
+        return session_factory()
+
+    journal_path = str(tmp_path / "audit_journal.jsonl")
+    writer = AuditWriter(crashing_sessions, batch_size=3, durability=DURABILITY_JOURNAL, journal_path=journal_path)
+    writer.start()
+    for i in range(10):
+        writer.submit("Trucks", i, "UPDATE")
+    gate.set()
+    writer._thread.join(5.0)
+    assert not writer.is_running
+    writer._journal.close() # Whatever the dead process had written is all the journal holds
+    before = record_ids(session_factory)
+    assert 0 < len(before) < 10
+
+    recovered = AuditWriter(session_factory, durability=DURABILITY_JOURNAL, journal_path=journal_path)
+    recovered.start()
+    assert recovered.flush(5.0)
+    recovered.stop()
+    assert recovered.written == 10 - len(before) # Batches with a commit mark are not written again
+    assert record_ids(session_factory) == list(range(10))
+
+
+def test_dead_letters_are_kept_and_replayed(session_factory, tmp_path):
+    journal_path = str(tmp_path / "audit_journal.jsonl")
+    writer = AuditWriter(session_factory, durability=DURABILITY_JOURNAL, journal_path=journal_path, max_retries=1)
+    writer.start()
+    writer.submit(None, 1, "INSERT") # NOT NULL table_name: the batch can never be written
+    assert writer.flush(5.0)
+    writer.submit("Trucks", 2, "INSERT")
+    assert writer.flush(5.0)
+    writer.stop()
+    assert writer.dead_letters == 1 and record_ids(session_factory) == [2]
+
+    again = AuditWriter(session_factory, durability=DURABILITY_JOURNAL, journal_path=journal_path, max_retries=1)
+    again.start()
+    assert again.flush(5.0)
+    again.stop()
+    assert again.dead_letters == 1 # Replayed, and still kept rather than lost
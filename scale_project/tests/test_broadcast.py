@@ -0,0 +1,34 @@
+import threading
+import time
+import pytest
+from app.scale_reader.broadcast import WeightBroadcastServer, iter_broadcast, FORMAT_TEXT, FORMAT_BINARY
+from app.scale_reader.ring_buffer import WeightSample, STATUS_STABLE, STATUS_IO_ERROR
+from app.scale_reader.weight_stream import WeightStream
+
+
+@pytest.mark.parametrize("wire_format", [FORMAT_TEXT, FORMAT_BINARY])
+def test_frames_carry_the_reader_seq(wire_format):
+    stream = WeightStream()
+    server = WeightBroadcastServer(stream, port=0, wire_format=wire_format)
+    server.start()
+    received = []
+
+    def listen():
+        for record in iter_broadcast(port=server.port, wire_format=wire_format, timeout=5.0):
+            received.append(record)
+            if len(received) == 3:
+                return
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    deadline = time.monotonic() + 5.0
+    while server.client_count == 0 and time.monotonic() < deadline: # Nothing published before it joins reaches it
+        time.sleep(0.01)
+    try:
+        for sample in (WeightSample(1.0, 100.0, STATUS_STABLE, 2**32 + 7), WeightSample(1.1, 101.5, STATUS_STABLE, 2**32 + 8),
+                       WeightSample(1.2, None, STATUS_IO_ERROR, 2**32 + 11)): # 9 and 10 never reached this stream
+            stream.publish(sample)
+        listener.join(5.0)
+    finally:
+        server.stop()
+    assert received == [(2**32 + 7, 100.0, STATUS_STABLE), (2**32 + 8, 101.5, STATUS_STABLE), (2**32 + 11, None, STATUS_IO_ERROR)]
@@ -0,0 +1,89 @@
+from sqlalchemy import create_engine, inspect
+from app.db.models import Base
+from app.db.migrations import migrate, latest_version, get_schema_version
+
+# Schema written by the application before versioning (user_version 0): no last-used
+# timestamp on trucks, no sample columns on tickets, none of the later tables or indexes
+PRE_VERSIONING_DDL = (
+    "CREATE TABLE trucks (id INTEGER PRIMARY KEY, unit_id VARCHAR NOT NULL UNIQUE, company_name VARCHAR NOT NULL, "
+    "asga_id VARCHAR UNIQUE, tare_weight FLOAT NOT NULL, max_allowed_weight FLOAT NOT NULL, "
+    "created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE aggregate_types (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, description TEXT, "
+    "created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE delivery_locations (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, address TEXT, "
+    "created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE weight_tickets (id INTEGER PRIMARY KEY, truck_id INTEGER NOT NULL REFERENCES trucks (id), "
+    "aggregate_type_id INTEGER NOT NULL REFERENCES aggregate_types (id), "
+    "delivery_location_id INTEGER NOT NULL REFERENCES delivery_locations (id), gross_weight FLOAT NOT NULL, "
+    "tare_weight_at_weighing FLOAT NOT NULL, net_weight FLOAT NOT NULL, timestamp DATETIME, "
+    "operator_name VARCHAR, ticket_printed BOOLEAN)",
+    "CREATE TABLE audit_log (id INTEGER PRIMARY KEY, table_name VARCHAR NOT NULL, record_id INTEGER NOT NULL, "
+    "action VARCHAR NOT NULL, changed_by VARCHAR, changed_at DATETIME, old_values JSON, new_values JSON)",
+    "INSERT INTO trucks (unit_id, company_name, tare_weight, max_allowed_weight) VALUES ('T-1', 'Haulier', 12000, 44000)",
+    "INSERT INTO aggregate_types (name) VALUES ('Gravel')",
+    "INSERT INTO delivery_locations (name) VALUES ('Site A')",
+    "INSERT INTO weight_tickets (truck_id, aggregate_type_id, delivery_location_id, gross_weight, "
+    "tare_weight_at_weighing, net_weight, timestamp) VALUES (1, 1, 1, 38000, 12000, 26000, '2023-05-01 10:00:00')",
+    "INSERT INTO audit_log (table_name, record_id, action) VALUES ('WeightTickets', 1, 'INSERT')",
+)
+
+
+def schema(engine) -> list:
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+
+
+def index_names(engine) -> set[str]:
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        return {index['name'] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+
+def columns(inspector, table: str) -> set[str]:
+    return {c['name'] for c in inspector.get_columns(table)}
+
+
+def test_pre_versioning_database_is_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in PRE_VERSIONING_DDL:
+            connection.exec_driver_sql(statement)
+
+    assert migrate(engine) == 0
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == latest_version()
+        inspector = inspect(connection)
+        assert 'last_used_timestamp' in columns(inspector, 'trucks')
+        assert {'weight_seq', 'weight_age_ms'} <= columns(inspector, 'weight_tickets')
+        assert set(Base.metadata.tables) <= set(inspector.get_table_names())
+        ticket = connection.exec_driver_sql("SELECT net_weight, weight_seq FROM weight_tickets").fetchall()
+        assert ticket == [(26000.0, None)] # Existing rows kept, new columns empty
+    assert {'ix_trucks_mru', 'ix_weight_tickets_timestamp', 'ix_weight_tickets_truck', 'ix_weight_tickets_aggregate',
+            'ix_weight_tickets_location', 'ix_audit_log_record'} <= index_names(engine)
+    fresh = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    migrate(fresh)
+    assert index_names(engine) == index_names(fresh) # Same indexes as a database created from the models
+    fresh.dispose()
+    engine.dispose()
+
+
+def test_migrate_again_is_a_no_op(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in PRE_VERSIONING_DDL:
+            connection.exec_driver_sql(statement)
+    migrate(engine)
+    before = schema(engine)
+    assert migrate(engine) == latest_version()
+    assert schema(engine) == before
+    engine.dispose()
+
+
+def test_new_database_is_created_at_latest_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    assert migrate(engine) == 0
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == latest_version()
+        assert set(Base.metadata.tables) <= set(inspect(connection).get_table_names())
+    assert migrate(engine) == latest_version()
+    engine.dispose()
@@ -0,0 +1,52 @@
+import time
+import pytest
+from app.scale_reader.process_reader import SharedSampleRing, ProcessScaleReader, H_SEQ
+
+
+@pytest.fixture
+def ring():
+    ring = SharedSampleRing(capacity=8, create=True)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def test_views_wrap_and_detect_overwrite(ring):
+    for i in range(10):
+        ring.append(float(i), float(i), 0)
+    count, timestamps, weights, status = ring.read_since(0)
+    assert count == 10 and weights.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0] # capacity - 1 newest
+    view = ring.view_since(8)
+    assert ring.still_valid(view)
+    for i in range(8):
+        ring.append(0.0, 0.0, 0)
+    assert not ring.still_valid(view)
+
+
+def test_writer_dead_mid_append_does_not_hang_readers(ring):
+    ring.append(1.0, 1.0, 0)
+    ring.header[H_SEQ] += 1 # Writer killed between its two sequence bumps
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        ring.view_since(0)
+    assert time.monotonic() - start < 1.0
+    ring.reset_seqlock()
+    assert ring.latest().weight == 1.0
+
+
+def test_child_killed_mid_append_is_restarted():
+    reader = ProcessScaleReader(use_emulator=True, emulator_interval=0.01, background=True)
+    try:
+        assert reader.connect(wait_s=5.0)
+        reader._process.kill()
+        reader._process.join()
+        reader.ring.header[H_SEQ] += 1 # As if it died inside append()
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline and not (reader.restarts and reader.is_connected):
+            time.sleep(0.05)
+        assert reader.restarts >= 1 and reader.is_connected
+        before = reader.ring.count
+        time.sleep(0.3)
+        assert reader.ring.count > before and reader.buffer.latest().seq >= before
+    finally:
+        reader.disconnect()
@@ -0,0 +1,32 @@
+import pytest
+from app.scale_reader.protocols import parse_standard, parse_sics, parse_sma, parse_toledo_continuous
+
+NON_NUMERIC = [b'nan', b'+nan', b'inf', b'-inf', b'+infinity', b'1_000.00', b'1e3', b'0x1F']
+PADDED = [b' 123.45', b'123.45 ', b'12 3.45'] # SMA pads its weight field; SICS splits on spaces
+
+
+def test_valid_frames_parse():
+    assert parse_standard(b'ST,GS,+00123.45kg').weight == 123.45
+    assert parse_sics(b'S S     100.00 kg').weight == 100.0
+    assert parse_sma(b'\n 1GM  001234.500lb ').weight == 1234.5
+    assert parse_toledo_continuous(b'\x02\x34\x31\x20012345000000').weight == 123.45
+
+
+@pytest.mark.parametrize("number", NON_NUMERIC + PADDED)
+def test_standard_rejects_non_numeric_weight(number):
+    assert parse_standard(b'ST,GS,' + number + b'kg') is None
+
+
+@pytest.mark.parametrize("number", NON_NUMERIC)
+def test_sics_rejects_non_numeric_weight(number):
+    assert parse_sics(b'S S ' + number + b' kg') is None
+
+
+@pytest.mark.parametrize("number", NON_NUMERIC)
+def test_sma_rejects_non_numeric_weight(number):
+    assert parse_sma(b'\n 1GM ' + number + b'kg ') is None
+
+
+@pytest.mark.parametrize("digits", [b'+12345', b'1_2345', b' 12345', b'12345 '])
+def test_toledo_rejects_non_digit_weight(digits):
+    assert parse_toledo_continuous(b'\x02\x34\x31\x20' + digits + b'000000') is None
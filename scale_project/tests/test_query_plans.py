@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine
+from app.db.migrations import migrate, latest_version, get_schema_version
+from app.db.query_plans import check_query_plans, seed_plan_data
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    migrate(engine)
+    with engine.begin() as connection:
+        seed_plan_data(connection, trucks=300, tickets=20000) # Trucks, tickets and their audit rows, then ANALYZE
+        assert get_schema_version(connection) == latest_version()
+    assert check_query_plans(engine) == []
+    engine.dispose()
+
+
+def test_dropped_index_is_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    migrate(engine)
+    with engine.begin() as connection:
+        seed_plan_data(connection, trucks=50, tickets=2000)
+        connection.exec_driver_sql("DROP INDEX ix_weight_tickets_timestamp")
+    assert any(problem.query == "tickets_in_range" for problem in check_query_plans(engine))
+    engine.dispose()
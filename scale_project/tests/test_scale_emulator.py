@@ -0,0 +1,31 @@
+import time
+from app.scale_reader.scale_emulator import ScaleEmulator
+from app.scale_reader.scenario import Scenario
+from app.scale_reader.protocols import parse_standard
+
+
+def loaded_emulator() -> ScaleEmulator:
+    """Emulator replaying a noiseless scenario, paused at a moment a truck sits settled on the deck."""
+    emulator = ScaleEmulator(initial_weight=0.0)
+    scenario = Scenario.from_dict({"noise": 0.0, "resolution": 0.01,
+                                   "trucks": [{"unit_id": "T-1", "tare": 12000, "gross": 38000, "arrive_at": 0}]})
+    compiled = emulator.load_scenario(scenario, time_scale=1e-6) # Scenario time all but stands still
+    t = next(t / 10 for t in range(int(compiled.duration * 10)) if compiled.is_stable(t / 10)
+             and compiled.weight_at(t / 10, emulator._rng) > 30000)
+    emulator._scenario_started = time.monotonic() - t / emulator.time_scale
+    return emulator
+
+
+def reading(frame: bytes):
+    return parse_standard(frame.strip())
+
+
+def test_zero_and_tare_use_the_scenario_weight():
+    emulator = loaded_emulator()
+    assert emulator.current_weight == 0.0 # The built-in trend's weight, stale in scenario mode
+    tared = reading(emulator.respond(b'T\r\n'))
+    assert tared.net and abs(tared.weight) < 0.05
+    assert abs(reading(emulator.get_simulated_reading().encode('ascii')).weight) < 0.05
+
+    zeroed = reading(emulator.respond(b'Z\r\n'))
+    assert not zeroed.net and abs(zeroed.weight) < 0.05
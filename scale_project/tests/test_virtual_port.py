@@ -0,0 +1,103 @@
+import itertools
+import sys
+import time
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="VirtualSerialPort needs a POSIX pseudo-terminal")
+
+from app.scale_reader.scale_emulator import VirtualSerialPort
+from app.scale_reader.serial_reader import ScaleReader
+from app.scale_reader.connection import STATE_CONNECTED
+
+
+def counting_frames(start: float = 100.0):
+    """Frame source whose weights go up by 1 kg per frame, so loss, corruption and reordering show."""
+    counter = itertools.count()
+    return lambda: f"ST,GS,{start + next(counter):0=+10.2f}kg\r\n".encode('ascii')
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def ok_weights(reader: ScaleReader) -> list[float]:
+    return [s.weight for s in reader.buffer.last(reader.buffer.capacity) if s.ok]
+
+
+@pytest.fixture
+def open_port():
+    ports, readers = [], []
+
+    def factory(port_kwargs: dict, reader_kwargs: dict | None = None):
+        port = VirtualSerialPort(counting_frames(), **port_kwargs)
+        port.start()
+        ports.append(port)
+        reader = ScaleReader(port=port.port, baudrate=port.baudrate, timeout=0.1, background=True,
+                             buffer_size=4096, **(reader_kwargs or {}))
+        readers.append(reader)
+        assert reader.connect(wait_s=2.0)
+        return port, reader
+
+    yield factory
+    for reader in readers:
+        reader.disconnect()
+    for port in ports:
+        port.stop()
+
+
+def test_clean_stream_parses_every_frame(open_port):
+    port, reader = open_port({"frame_rate": 100.0, "baudrate": 115200, "seed": 1})
+    assert wait_for(lambda: len(ok_weights(reader)) >= 50)
+    weights = ok_weights(reader)
+    # Consecutive frames, none lost or mangled once the reader is attached
+    assert all(b - a == pytest.approx(1.0) for a, b in zip(weights, weights[1:]))
+
+
+def test_garbage_and_split_frames(open_port):
+    port, reader = open_port({"frame_rate": 200.0, "baudrate": 115200, "burst_size": 4,
+                              "garbage_rate": 0.3, "partial_rate": 0.5, "seed": 7})
+    assert wait_for(lambda: port.frames_sent >= 400)
+    time.sleep(0.1)
+    weights = ok_weights(reader)
+    # Line noise costs at most the frame it lands on; split frames are reassembled
+    assert len(weights) >= 0.5 * port.frames_sent
+    assert all(w == int(w) and w >= 100.0 for w in weights) # Nothing parsed out of noise
+    assert all(b > a for a, b in zip(weights, weights[1:]))   # In order, no duplicates
+    assert reader.metrics.parse_failures > 0                  # The noise was seen and rejected
+
+
+def test_drop_and_reconnect(open_port):
+    port, reader = open_port({"frame_rate": 50.0, "baudrate": 115200, "reconnect_delay_s": 0.3, "seed": 3})
+    assert wait_for(lambda: len(ok_weights(reader)) >= 10)
+    before = ok_weights(reader)[-1]
+
+    port.disconnect() # Cable pulled; the PTY comes back under the same path
+    assert wait_for(lambda: reader.supervisor.reconnect_count >= 1, timeout=10.0)
+    assert wait_for(lambda: reader.connection_state == STATE_CONNECTED)
+    assert wait_for(lambda: ok_weights(reader)[-1] > before + 10)
+
+    weights = ok_weights(reader)
+    assert all(b > a for a, b in zip(weights, weights[1:])) # No stale or glued frame across the reconnect
+    assert reader.metrics.connections >= 2
+
+
+def test_command_on_dropped_port_fails_fast():
+    port = VirtualSerialPort(counting_frames(), frame_rate=20.0, baudrate=115200, seed=5)
+    port.start()
+    reader = ScaleReader(port=port.port, baudrate=port.baudrate, timeout=0.1) # Direct mode: no acquisition thread
+    try:
+        assert reader.connect(wait_s=2.0)
+        reader.commands.write = lambda data: reader._close_serial() # The command goes out, then the cable is pulled
+        start = time.monotonic()
+        with pytest.raises(ConnectionError):
+            reader.send_command('print', timeout_s=2.0)
+        assert time.monotonic() - start < 1.0 # Not spinning until the command times out
+        assert reader.metrics.io_errors <= 2
+    finally:
+        reader.disconnect()
+        port.stop()
@@ -0,0 +1,75 @@
+import struct
+import numpy as np
+import pytest
+from app.db.weight_trace import pack_weight_trace, unpack_weight_trace, TRACE_VERSION
+
+
+def assert_round_trip(timestamps, weights, status=None, resolution=0.01):
+    decoded = unpack_weight_trace(pack_weight_trace(timestamps, weights, status, resolution=resolution))
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    np.testing.assert_allclose(decoded.timestamps, timestamps - timestamps[0], atol=0.0005)
+    np.testing.assert_allclose(decoded.weights, weights, atol=resolution / 2)
+    if status is None:
+        assert decoded.status is None
+    else:
+        assert decoded.status.tolist() == list(status)
+    return decoded
+
+
+def test_empty_trace_is_rejected():
+    with pytest.raises(ValueError):
+        pack_weight_trace([], [])
+    with pytest.raises(ValueError):
+        pack_weight_trace([1.0, 2.0], [1.0])
+
+
+def test_single_sample():
+    decoded = assert_round_trip([1234.5], [38000.25], [0x40])
+    assert decoded.timestamps.tolist() == [0.0]
+    assert_round_trip([0.0], [-12.5])
+
+
+def test_gap_left_by_dropped_samples():
+    # IO errors (no weight) are dropped before packing; the time gap they leave must survive
+    timestamps = [10.0, 10.1, 10.2, 10.3, 10.4, 10.5, 10.6]
+    weights = [100.0, 150.0, None, None, None, 300.0, 310.0]
+    kept = [(t, w) for t, w in zip(timestamps, weights) if w is not None]
+    decoded = assert_round_trip([t for t, _ in kept], [w for _, w in kept], [0x40] * len(kept))
+    assert decoded.timestamps[2] == pytest.approx(0.5)
+    with pytest.raises(ValueError):
+        pack_weight_trace(timestamps, [np.nan if w is None else w for w in weights])
+    with pytest.raises(ValueError):
+        pack_weight_trace([0.0, 0.1], [100.0, np.inf])
+
+
+def test_long_trace():
+    rng = np.random.default_rng(1)
+    count = 200000 # Over an hour at 50 Hz
+    timestamps = 5000.0 + np.cumsum(rng.choice([0.02, 0.02, 0.021, 300.0], size=count, p=[0.5, 0.3, 0.1999, 0.0001]))
+    weights = np.round(np.cumsum(rng.normal(0, 200.0, size=count)), 2) # Deltas too wide for int16
+    status = rng.integers(0, 256, size=count, dtype=np.uint8)
+    decoded = assert_round_trip(timestamps, weights, status)
+    assert len(decoded.weights) == count
+
+
+@pytest.fixture
+def blob():
+    return pack_weight_trace([0.0, 0.1, 0.2, 0.3], [0.0, 500.0, 1000.0, 1000.5], [8, 8, 0x40, 0x40])
+
+
+def test_wrong_version_is_rejected(blob):
+    with pytest.raises(ValueError, match="version"):
+        unpack_weight_trace(bytes([TRACE_VERSION + 1]) + blob[1:])
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda blob: blob[:10],                                        # Truncated header
+    lambda blob: blob[:1] + bytes([3]) + blob[2:],                 # Impossible time width
+    lambda blob: blob[:4] + struct.pack('<I', 5) + blob[8:],       # Count disagrees with the data
+    lambda blob: blob[:4] + struct.pack('<I', 0) + blob[8:],       # No samples
+    lambda blob: blob[:-6] + bytes(b ^ 0xFF for b in blob[-6:]),   # Damaged compressed data
+    lambda blob: blob[:-3],                                        # Truncated compressed data
+])
+def test_corrupt_blob_is_rejected(blob, corrupt):
+    with pytest.raises(ValueError):
+        unpack_weight_trace(corrupt(blob))